@@ -54,7 +54,210 @@ def run_benchmark(method, video_path="input.mp4", output_path=None):
         "savings": savings
     }
 
-def main():
+def make_synthetic_clip(path, width, height, frames, fps=30):
+    """Write a clip of moving noise blocks, so codecs have real work to do."""
+    import cv2
+    import numpy as np
+    rng = np.random.default_rng(0)
+    texture = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for i in range(frames):
+        out.write(np.roll(texture, i * 8, axis=1))
+    out.release()
+    return path
+
+def benchmark_allocations(width=3840, height=2160, frames=30):
+    """
+    Per-frame Python-visible allocations (tracemalloc peak) for decode + depth preprocessing,
+    both paths producing the same normalised float32 CHW model input:
+    the original infer_image path (fresh cap.read() arrays, full-resolution colour conversion
+    and float copies) against the frame ring + reused resize, RGB and input buffers.
+    """
+    import tempfile
+    import tracemalloc
+    import cv2
+    import numpy as np
+    import config
+    from utils.frame_buffer import FrameRing
+
+    size = config.DEPTH_INPUT_SIZE
+    scale = max(size / height, size / width)
+    shape = (int(round(height * scale / 14)) * 14, int(round(width * scale / 14)) * 14)
+    mean = np.array([0.485, 0.456, 0.406], dtype=np.float32).reshape(3, 1, 1)
+    std = np.array([0.229, 0.224, 0.225], dtype=np.float32).reshape(3, 1, 1)
+
+    def naive(cap):
+        ret, frame = cap.read()
+        if not ret:
+            return None
+        # What infer_image does: full-res RGB conversion and float64 normalisation before resizing
+        image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) / 255.0
+        image = cv2.resize(image, (shape[1], shape[0]), interpolation=cv2.INTER_CUBIC)
+        image = (image - mean.reshape(1, 1, 3)) / std.reshape(1, 1, 3)
+        return np.ascontiguousarray(image.transpose(2, 0, 1)).astype(np.float32)
+
+    ring = FrameRing(height, width, config.FRAME_RING_SIZE)
+    resized = np.empty((shape[0], shape[1], 3), dtype=np.uint8)
+    rgb = np.empty_like(resized)
+    chw = np.empty((3, shape[0], shape[1]), dtype=np.float32)
+    scaled_mean, scaled_std = mean * 255, std * 255
+
+    def pooled(cap):
+        ret, frame = ring.read(cap)
+        if not ret:
+            return None
+        # What DepthEstimator.get_depth_map does (normalising in place, on the model device there)
+        cv2.resize(frame, (shape[1], shape[0]), dst=resized, interpolation=cv2.INTER_CUBIC)
+        cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=rgb)
+        np.copyto(chw, rgb.transpose(2, 0, 1))
+        np.subtract(chw, scaled_mean, out=chw)
+        np.divide(chw, scaled_std, out=chw)
+        return chw
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = make_synthetic_clip(os.path.join(tmp, "clip.mp4"), width, height, frames)
+        print(f"Allocation benchmark: {frames} frames at {width}x{height}\n")
+        print(f"{'Path':<10} | {'Alloc/frame (MB)':<17} | {'FPS':<8}")
+        print("-" * 42)
+        first = {}
+        for name, step in [("naive", naive), ("pooled", pooled)]:
+            cap = cv2.VideoCapture(clip)
+            first[name] = step(cap).copy()  # Warm up buffers and codec state outside the measurement
+            tracemalloc.start()
+            peaks = []
+            start = time.time()
+            while True:
+                base = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+                if step(cap) is None:
+                    break
+                peaks.append(tracemalloc.get_traced_memory()[1] - base)
+            elapsed = time.time() - start
+            tracemalloc.stop()
+            cap.release()
+            mean_peak = sum(peaks) / len(peaks) / 1e6 if peaks else 0.0
+            print(f"{name:<10} | {mean_peak:<17.2f} | {len(peaks) / elapsed if elapsed else 0:<8.1f}")
+        diff = np.abs(first['naive'] - first['pooled'])
+        # uint8 resizing rounds, and clips cubic overshoot on the noise texture
+        print(f"\nModel-input difference (normalised units): mean {diff.mean():.4f}, max {diff.max():.4f}")
+
+def benchmark_io(width=1920, height=1080, frames=120, work_ms=10):
+    """
+    Decode and encode throughput per backend on a synthetic clip:
+    OpenCV vs PyAV decode (full size and downscaled), and mp4v vs x264 encode,
+    inline vs on the writer thread. Encode runs include `work_ms` of simulated
+    per-frame processing, which is what the writer thread overlaps with.
+    """
+    import tempfile
+    import numpy as np
+    import config
+    from utils import video_io
+    from utils.frame_buffer import FrameRing
+    from utils.video_io import open_reader, open_writer
+
+    backends = ['opencv'] + (['pyav'] if video_io.av is not None else [])
+    encoders = ['mp4v'] + (['x264'] if video_io.av is not None else [])
+    if video_io.av is None:
+        print("PyAV not installed: benchmarking the OpenCV backend only (pip install av)\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = make_synthetic_clip(os.path.join(tmp, "clip.mp4"), width, height, frames)
+        print(f"I/O benchmark: {frames} frames at {width}x{height}, encode with {work_ms} ms/frame of other work\n")
+        print(f"{'Stage':<8} | {'Backend':<22} | {'FPS':<8}")
+        print("-" * 44)
+
+        for backend in backends:
+            for decode_width in [None, width // 2]:
+                reader = open_reader(clip, backend=backend, decode_width=decode_width)
+                ring = FrameRing(reader.height, reader.width, config.FRAME_RING_SIZE)
+                count = 0
+                start = time.time()
+                while ring.read(reader)[0]:
+                    count += 1
+                elapsed = time.time() - start
+                reader.release()
+                label = backend + (f" @{reader.width}w" if decode_width else "")
+                print(f"{'decode':<8} | {label:<22} | {count / elapsed if elapsed else 0:<8.1f}")
+
+        source = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+        for encoder in encoders:
+            for threaded in [False, True]:
+                writer = open_writer(os.path.join(tmp, f"out_{encoder}.mp4"), 30, (width, height),
+                                     encoder=encoder, threaded=threaded)
+                ring = FrameRing(height, width, config.FRAME_RING_SIZE)
+                start = time.time()
+                for i in range(frames):
+                    frame = ring.next()
+                    np.copyto(frame, source)
+                    time.sleep(work_ms / 1000)  # Stand-in for inference on the main thread
+                    writer.write(frame)
+                writer.release()
+                elapsed = time.time() - start
+                label = encoder + (" (threaded)" if threaded else "")
+                print(f"{'encode':<8} | {label:<22} | {frames / elapsed if elapsed else 0:<8.1f}")
+
+def _threads_worker(args):
+    """One stream's synthetic frame loop: conv-net inference + OpenCV preprocessing + drawing."""
+    managed, streams, cores, seconds = args
+    import cv2
+    import numpy as np
+    import torch
+    from utils import thread_budget
+    from utils.visualization import OverlayRenderer
+    if managed:
+        thread_budget.configure(streams=streams, cores=cores)
+    net = torch.nn.Sequential(
+        torch.nn.Conv2d(3, 32, 3, stride=2, padding=1), torch.nn.ReLU(),
+        torch.nn.Conv2d(32, 64, 3, stride=2, padding=1), torch.nn.ReLU(),
+        torch.nn.Conv2d(64, 64, 3, padding=1)).eval()
+    frame = np.random.default_rng(0).integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+    keypoints = np.zeros((17, 3), dtype=np.float32)
+    results = {'persons': {i: {'bbox': [i * 60, 100, i * 60 + 50, 300], 'keypoints': keypoints} for i in range(20)},
+               'interactions': [], 'groups': []}
+    renderer = OverlayRenderer()
+    frames = 0
+    start = time.time()
+    with torch.no_grad():
+        while time.time() - start < seconds:
+            small = cv2.resize(frame, (640, 384), interpolation=cv2.INTER_AREA)
+            x = torch.from_numpy(cv2.cvtColor(small, cv2.COLOR_BGR2RGB)).permute(2, 0, 1)[None].float().div_(255)
+            net(x)
+            renderer.render(frame, results, frames + 1, 30, 'hybrid', 0)
+            frames += 1
+    return frames / (time.time() - start)
+
+def benchmark_threads(seconds=5):
+    """
+    Aggregate throughput of 1..N concurrent streams (processes) on this node,
+    with library default thread counts vs a per-stream ThreadBudget, plus
+    single-stream scaling over 1..N cores.
+    """
+    import multiprocessing
+    from utils.thread_budget import available_cores
+
+    cores = available_cores()
+    counts = sorted({1, 2, 4, cores} | set(range(8, cores + 1, 8)))
+    counts = [c for c in counts if c <= cores]
+    context = multiprocessing.get_context('spawn')
+
+    print(f"Thread benchmark on {cores} cores, {seconds}s per run\n")
+    print(f"{'Cores':<6} | {'Single-stream FPS':<18}")
+    print("-" * 27)
+    for n in counts:
+        with context.Pool(1) as pool:
+            fps = pool.map(_threads_worker, [(True, 1, n, seconds)])[0]
+        print(f"{n:<6} | {fps:<18.1f}")
+
+    print(f"\n{'Streams':<8} | {'Default FPS (sum)':<18} | {'Budgeted FPS (sum)':<18}")
+    print("-" * 51)
+    for streams in counts:
+        totals = []
+        for managed in (False, True):
+            with context.Pool(streams) as pool:
+                totals.append(sum(pool.map(_threads_worker, [(managed, streams, cores, seconds)] * streams)))
+        print(f"{streams:<8} | {totals[0]:<18.1f} | {totals[1]:<18.1f}")
+
+def benchmark_methods():
     video_path = "input.mp4"
     if not os.path.exists(video_path):
         print(f"Error: {video_path} not found.")
@@ -78,5 +281,22 @@ def main():
     for res in results:
         print(f"{res['method']:<10} | {res['total_time']:<10.2f} | {res['fps']:<10.2f} | {res['total_frames']:<10} | {res['savings']:<12.1f}")
 
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Interaction filter benchmarks")
+    parser.add_argument("--suite", type=str, default="methods", choices=['methods', 'allocations', 'io', 'threads'],
+                        help="methods: end-to-end runs of main.py; allocations: per-frame allocations of the frame path; "
+                             "io: decode/encode throughput per video backend; threads: core scaling and multi-stream oversubscription")
+    args = parser.parse_args()
+
+    if args.suite == 'allocations':
+        benchmark_allocations()
+    elif args.suite == 'io':
+        benchmark_io()
+    elif args.suite == 'threads':
+        benchmark_threads()
+    else:
+        benchmark_methods()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+import numpy as np
+import config
+from detectors.depth_prior import build_prior, save_prior
+from utils.cli import ProgressBar, print_info, print_success, print_error, print_warning
+from utils.video_io import open_reader
+
+def sample_indices(total_frames, count):
+    """`count` frame indices spread evenly over the video."""
+    if total_frames <= 0:
+        return list(range(count))
+    return sorted(set(np.linspace(0, total_frames - 1, count).astype(int).tolist()))
+
+def is_empty(person_detector, frame):
+    """True if no one is in the frame (always, without a detector). Samples are far apart, so untracked."""
+    return person_detector is None or person_detector.count(frame) == 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate a per-camera background depth prior for --method prior")
+    parser.add_argument("--video", type=str, required=True, help="Footage from the fixed camera, ideally with stretches of empty scene")
+    parser.add_argument("--output", type=str, default=None, help="Prior .npy path (default: <video>.depth.npy)")
+    parser.add_argument("--frames", type=int, default=config.DEPTH_PRIOR_FRAMES, help="Empty frames to take the per-pixel median over")
+    parser.add_argument("--keep-people", action="store_true", help="Use sampled frames even if people are detected (the median still removes passers-by)")
+    parser.add_argument("--device", type=str, default=None, help="Device override")
+    args = parser.parse_args()
+
+    if args.device:
+        config.DEVICE = args.device
+    if not os.path.exists(args.video):
+        print_error(f"Input video file '{args.video}' not found.")
+        sys.exit(1)
+    output = args.output or os.path.splitext(args.video)[0] + ".depth.npy"
+
+    from detectors.depth_estimator import DepthEstimator
+    depth_estimator = DepthEstimator()
+    person_detector = None
+    if not args.keep_people:
+        from detectors.pose_detector import PersonDetector
+        person_detector = PersonDetector()
+
+    cap = open_reader(args.video)
+    # Over-sample so frames with people can be skipped and still leave enough empty ones
+    candidates = sample_indices(cap.total_frames, args.frames * (1 if args.keep_people else 4))
+    depth_maps = []
+    progress = ProgressBar(len(candidates), prefix="Calibrating")
+    for done, index in enumerate(candidates, 1):
+        if len(depth_maps) >= args.frames:
+            break
+        cap.seek(index)
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if is_empty(person_detector, frame):
+            depth_maps.append(depth_estimator.get_depth_map(frame))
+        progress.update(done, suffix=f"| Empty frames: {len(depth_maps)}")
+    cap.release()
+
+    if not depth_maps:
+        print_error("No empty frames found; retry with --keep-people or footage of the empty scene.")
+        sys.exit(1)
+    if len(depth_maps) < args.frames:
+        print_warning(f"Only {len(depth_maps)} of {args.frames} sampled frames were empty")
+    save_prior(output, build_prior(depth_maps))
+    print_success(f"Depth prior ({depth_maps[0].shape[1]}x{depth_maps[0].shape[0]}, median of {len(depth_maps)} frames) saved to {output}")
+    print_info(f"Use it with: main.py --method prior --depth-prior {output}")
+
+if __name__ == "__main__":
+    main()
@@ -17,9 +17,115 @@ INTERACTION_DURATION_SEC = 1.0  # Seconds of consistent overlap/z-plane to trigg
 Z_PLANE_RATIO_THRESHOLD = 1.3  # Heuristic ratio
 Z_PLANE_DEPTH_DIFF_THRESHOLD = 0.10  # 10% depth difference for MDE
 
+
+# Hysteresis (see InteractionFilter): pairs enter on the thresholds above and
+# only leave once they fail the looser exit thresholds for longer than the miss tolerance
+Z_PLANE_RATIO_EXIT_THRESHOLD = 1.45
+Z_PLANE_DEPTH_DIFF_EXIT_THRESHOLD = 0.15
+INTERACTION_MISS_TOLERANCE = 5  # Frames an active pair may drop out (occlusion, keypoint dip) without ending
+Z_EMA_ALPHA = 0.5  # Per-track z-metric smoothing; 1.0 = raw per-frame values
+MAX_TRACKS = 1024  # Per-track state table capacity (LRU-evicted when full)
+
 # IPD/Head size constants
 CONF_THRESHOLD = 0.5
 
+# Model inputs
+DEPTH_INPUT_SIZE = 518  # DepthAnything short-side input size (multiple of 14)
+DEPTH_STAT = 'median'  # Per-person depth inside the box: 'median' or 'mean' (summed-area table, faster)
+INFERENCE_SHAPE = None  # (h, w) shared by pose and depth, e.g. (448, 896); multiple of 224 fits both models
+# Shape buckets: with SHAPE_BUCKETING (--shape-buckets) each stream's frames are letterboxed into the
+# bucket of closest aspect ratio, so models only ever see these inputs (unless INFERENCE_SHAPE is set)
+SHAPE_BUCKETING = False
+SHAPE_BUCKETS = [(448, 896), (448, 672), (672, 672), (672, 448)]
+WARMUP_PASSES = 2  # Inference passes per input shape before the first frame; 0 = off
+FRAME_RING_SIZE = 4  # Preallocated decode buffers
+POSE_IMGSZ = None  # Pose inference resolution (pixels or a RESOLUTION_TIERS name); None = Ultralytics default (640)
+RESOLUTION_TIERS = {'low': 320, 'medium': 640, 'high': 960, 'ultra': 1280}
+
+# Static-scene depth prior (see detectors/depth_prior.py and calibrate.py)
+DEPTH_PRIOR_PATH = None  # Per-camera background depth .npy for the 'prior' method
+DEPTH_PRIOR_FRAMES = 30  # Frames sampled by calibrate.py; their per-pixel median is the prior
+DEPTH_PRIOR_WINDOW = 4  # Prior pixels around a foot point checked for depth edges
+DEPTH_PRIOR_MAX_VARIATION = 0.15  # Relative depth spread in that window above which live MDE is used
+
 # Model Weights
 YOLO_MODEL_NAME = "yolov8n-pose.pt"
 DEPTH_MODEL_NAME = "depth_anything_v2_vits.pth" # Metric Depth implementation might vary, using small visual transformer
+
+# Detection cache (per-frame pose results on disk, see detectors/detection_cache.py)
+DETECTION_CACHE_MAX_BYTES = 10 * 1024**3  # LRU-evict entries beyond 10 GB
+
+# Memory bounds for long-running streams
+MAX_ACTIVE_PAIRS = 1024  # Interaction pair-state table capacity (LRU-evicted when full)
+MAX_ANNOTATIONS_IN_MEMORY = 10000  # Per method; older annotations are flushed to the annotation log
+
+# Motion gating (skip pose inference on static frames, see detectors/motion_gate.py)
+MOTION_THRESHOLD = 0.002  # Fraction of downsampled pixels that must change to re-run detection
+MOTION_PIXEL_DELTA = 15  # Grey-level difference counted as a change
+MOTION_REFRESH_FRAMES = 30  # Forced detection interval so tracks never go stale
+MOTION_DOWNSAMPLE_WIDTH = 160
+
+# Keyframe mode (pose model every K frames, optical flow in between, see detectors/keyframe_tracker.py)
+KEYFRAME_INTERVAL = 1  # 1 = run the pose model on every frame
+KEYFRAME_MIN_TRACK_CONFIDENCE = 0.5  # Fraction of a person's points that must track reliably
+KEYFRAME_FLOW_MAX_WIDTH = 960  # Optical flow runs on frames downscaled to this width
+KEYFRAME_MAX_PATCH_ERROR = 12  # Mean grey-level difference of a tracked patch before it counts as lost
+
+# Detection cascade (see detectors/cascade.py)
+CASCADE_PERSON_MODEL = "yolov8n.pt"  # Cheap first stage: person boxes only, every frame
+CASCADE_PERSON_IMGSZ = 320
+CASCADE_CROP_MARGIN = 32  # Pixels around a group of overlapping boxes cropped for the pose model
+CASCADE_MIN_IOU = 0.3  # Pose box vs tracked box IoU needed to attach keypoints
+CASCADE_FULL_FRAME_FRACTION = 0.6  # Crops covering more of the frame than this run as one full-frame pass
+
+# Region of interest (see detectors/roi.py)
+ROI_MARGIN = 32  # Pixels added around polygons / activity before cropping
+ROI_REFRESH_FRAMES = 30  # Auto mode: frames between crop updates
+ROI_REMATCH_IOU = 0.5  # Full-frame IoU needed to carry an ID across a crop move
+
+# Video I/O (see utils/video_io.py)
+VIDEO_BACKEND = 'auto'  # 'pyav' (FFmpeg, threaded), 'opencv', or 'auto' = PyAV when installed
+DECODE_THREADS = 0  # PyAV decode threads; 0 = FFmpeg default
+VIDEO_ENCODER = 'mp4v'  # 'mp4v' (OpenCV), 'x264' (PyAV/libx264), or 'none'
+X264_PRESET = 'veryfast'
+X264_CRF = 23
+WRITER_QUEUE_SIZE = FRAME_RING_SIZE - 2  # Encode queue holds ring buffers by reference
+
+# Output overlay (see utils/visualization.OverlayRenderer)
+OVERLAY_EVERY = 1  # Draw detections every N frames (status is drawn on every frame)
+OVERLAY_SCALE = 1.0  # Render and encode the output at this fraction of the input size
+
+# CPU thread budget (see utils/thread_budget.py)
+STREAMS_PER_NODE = 1  # Processes sharing this node's cores; each gets cores // streams
+THREAD_POOL_WORKERS = None  # Shared pool for drawing / depth aggregation; None = cores // 4 (1-4)
+
+# Checkpoints (see core/checkpoint.py)
+CHECKPOINT_INTERVAL = 0  # Frames between checkpoints for --resume; 0 = off (e.g. 5000 for archival runs)
+
+# Trigger clips (see utils/clip_extractor.py)
+# The pre-roll ring holds (CLIP_PRE_SEC * fps + WRITER_QUEUE_SIZE + 3) output frames:
+# about 390 MB at 1080p30 but 1.5 GB at 4K30 (6 MB / 25 MB per raw frame). Past CLIP_PREROLL_MAX_MB
+# the ring stores JPEG-encoded frames instead (roughly 10x smaller, one encode per output frame).
+CLIP_PRE_SEC = 2.0  # Pre-roll kept in memory
+CLIP_POST_SEC = 3.0
+CLIP_PREROLL_MAX_MB = 512  # Raw pre-roll budget; larger rings are JPEG-encoded
+CLIP_JPEG_QUALITY = 90
+
+# Multi-stream scheduling (see core/scheduler.py and multistream.py)
+SCHEDULER_ACTIVE_FPS = 30  # Budget of streams with overlaps or active interactions (capped at the source rate)
+SCHEDULER_IDLE_FPS = 5  # Budget of idle streams
+SCHEDULER_MIN_FPS = 1  # Floor when shedding load
+STREAM_SLO_MS = 500  # A frame must be processed within this time of becoming due, or it is dropped
+SCHEDULER_HEADROOM = 0.9  # Fraction of the measured node capacity handed out as budgets
+SCHEDULER_REBALANCE_SEC = 1.0
+
+# Distributed processing (see core/work_queue.py and distribute.py)
+JOB_MAX_ATTEMPTS = 3  # Claims of a job (failures or expired leases) before it is given up
+JOB_LEASE_SEC = 60.0  # A worker silent for this long loses its job to another worker
+JOB_HEARTBEAT_SEC = 10.0
+JOB_POLL_SEC = 1.0  # Idle workers re-check the queue this often
+SHARD_FRAMES = 0  # Frames per job when splitting videos; 0 = one job per video
+
+# Columnar results store (see core/results_store.py)
+RESULTS_BACKEND = 'auto'  # 'arrow' (Parquet, needs pyarrow), 'numpy' (raw record files) or 'auto'
+RESULTS_BATCH_ROWS = 65536  # Rows per row group when writing, and per batch when aggregating
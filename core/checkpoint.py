@@ -0,0 +1,69 @@
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+CHECKPOINT_VERSION = 3
+
+def checkpoint_path(output_path):
+    """Checkpoint file kept next to the output video."""
+    return output_path + ".ckpt"
+
+def segment_path(output_path, index):
+    """Output segment `index` of a checkpointed run: out.mp4 -> out.part0003.mp4."""
+    stem, ext = os.path.splitext(output_path)
+    return f"{stem}.part{index:04d}{ext}"
+
+def load_checkpoint(path):
+    """Checkpoint state written by Checkpointer.save, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        state = pickle.load(f)
+    if state.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"Checkpoint {path} has version {state.get('version')}, expected {CHECKPOINT_VERSION}")
+    return state
+
+class Checkpointer:
+    """
+    Periodic run checkpoints. The state is pickled on the calling thread, so it
+    is a consistent snapshot at a frame boundary; writing it to disk (temp file,
+    fsync, atomic rename) happens on a background thread.
+    """
+    def __init__(self, path, interval):
+        self.path = path
+        self.interval = interval
+        self.saves = 0
+        self.last_bytes = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
+        self._pending = None
+
+    def due(self, frame_count):
+        return bool(self.interval) and frame_count % self.interval == 0
+
+    def save(self, state):
+        data = pickle.dumps(dict(state, version=CHECKPOINT_VERSION), protocol=pickle.HIGHEST_PROTOCOL)
+        self.wait()  # At most one write in flight; a slow disk delays the run rather than piling up snapshots
+        self._pending = self._executor.submit(self._write, data)
+        self.saves += 1
+        self.last_bytes = len(data)
+
+    def _write(self, data):
+        tmp = f"{self.path}.tmp-{os.getpid()}"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def wait(self):
+        """Block until the last write is on disk (re-raises write errors)."""
+        if self._pending is not None:
+            self._pending.result()
+            self._pending = None
+
+    def close(self, remove=False):
+        """Finish pending writes; `remove` deletes the checkpoint after a completed run."""
+        self.wait()
+        self._executor.shutdown(wait=True)
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,39 +1,228 @@
 import json
+import os
 from collections import defaultdict
+import numpy as np
+
+# Per-frame latency histogram: log-spaced bins from 0.1 ms to 100 s (about 6% wide),
+# so percentiles of arbitrarily long runs take constant memory
+LATENCY_BINS = np.geomspace(1e-4, 100.0, 241)
 
 class Comparator:
-    def __init__(self):
+    def __init__(self, max_annotations=None, annotation_sink=None, clip_lookup=None, on_interaction=None,
+                 append=False, start_frame=0):
+        """
+        max_annotations: per-method cap on annotations kept in memory (None = unbounded).
+        annotation_sink: JSONL path that receives annotations flushed past the cap;
+                         without one, the oldest annotations past the cap are dropped.
+        append: keep what an existing annotation sink holds (resuming from a
+                checkpoint); otherwise it is truncated so a fresh run starts empty.
+        start_frame: first frame of a shard is start_frame + 1; interactions that
+                     ended by start_frame (seen while warming up) belong to the
+                     previous shard and are not logged.
+        clip_lookup: optional callable trigger_frame -> clip path (e.g. ClipExtractor.clip_for);
+                     triggered annotations then carry a 'clip_path'.
+        on_interaction: optional callable (method, annotation) called for every logged
+                        interaction (e.g. ResultsWriter.add_interaction).
+        """
         # Stats per method
         # Structure: { method_name: { 'interactions': 0, 'triggers': 0, 'overlap_frames': 0, 'annotations': [] } }
         self.stats = defaultdict(lambda: {
             'interactions': 0,
             'triggers': 0,
             'overlap_frames': 0,
-            'annotations': []
+            'annotations': [],
+            'flushed_annotations': 0,
+            'dropped_annotations': 0,
+            'evicted_pairs': 0,
+            'dropped_pairs': 0,
+            'merged_gaps': 0
         })
         self.processing_stats = {}
+        self.max_annotations = max_annotations
+        self.annotation_sink = annotation_sink
+        self.clip_lookup = clip_lookup
+        self.on_interaction = on_interaction
+        self.start_frame = start_frame
+        if annotation_sink and not append and os.path.exists(annotation_sink):
+            open(annotation_sink, 'w').close()
+        self.latency_counts = np.zeros(len(LATENCY_BINS) + 1, dtype=np.int64)
+        self.first_latency = None
+        self.max_latency = 0.0
 
     def update(self, method_name, has_overlap, is_interaction, triggered):
         self.stats[method_name]['overlap_frames'] += 1 if has_overlap else 0
         self.stats[method_name]['interactions'] += 1 if is_interaction else 0
         self.stats[method_name]['triggers'] += 1 if triggered else 0
 
-    def log_interaction(self, method_name, start_frame, end_frame, triggered, trigger_frame=None):
-        self.stats[method_name]['annotations'].append({
+    def log_interaction(self, method_name, start_frame, end_frame, triggered, trigger_frame=None, gaps=0):
+        """gaps: short dropouts bridged inside this interaction (fragments it was merged from, minus one)."""
+        if end_frame <= self.start_frame:
+            return
+        annotations = self.stats[method_name]['annotations']
+        annotations.append({
             'start_frame': start_frame,
             'end_frame': end_frame,
             'triggered': triggered,
             'trigger_frame': trigger_frame
         })
+        if gaps:
+            annotations[-1]['gaps'] = gaps
+            self.stats[method_name]['merged_gaps'] += gaps
+        if triggered and trigger_frame is not None and self.clip_lookup is not None:
+            annotations[-1]['clip_path'] = self.clip_lookup(trigger_frame)
+        if self.on_interaction is not None:
+            self.on_interaction(method_name, annotations[-1])
+        if self.max_annotations is not None and len(annotations) > self.max_annotations:
+            self.flush_annotations(method_name)
+
+    def flush_annotations(self, method_name=None):
+        """
+        Move in-memory annotations to the annotation sink. Without a sink, only
+        the oldest ones past max_annotations are dropped.
+        """
+        methods = [method_name] if method_name else list(self.stats)
+        for method in methods:
+            data = self.stats[method]
+            if not data['annotations']:
+                continue
+            if self.annotation_sink:
+                with open(self.annotation_sink, 'a') as f:
+                    for ann in data['annotations']:
+                        f.write(json.dumps({'method': method, **ann}) + '\n')
+                data['flushed_annotations'] += len(data['annotations'])
+                data['annotations'] = []
+            elif self.max_annotations is not None:
+                overflow = len(data['annotations']) - self.max_annotations
+                if overflow > 0:
+                    del data['annotations'][:overflow]
+                    data['dropped_annotations'] += overflow
+
+    def iter_annotations(self, method_name):
+        """All annotations of a method: flushed ones from the sink first, then in-memory."""
+        if self.annotation_sink and self.stats[method_name]['flushed_annotations']:
+            with open(self.annotation_sink) as f:
+                for line in f:
+                    ann = json.loads(line)
+                    if ann.pop('method') == method_name:
+                        yield ann
+        yield from self.stats[method_name]['annotations']
+
+    def total_annotations(self, method_name):
+        data = self.stats[method_name]
+        return len(data['annotations']) + data['flushed_annotations'] + data['dropped_annotations']
+
+    def record_frame(self, method_name, results):
+        """
+        Update counters and log ended interactions from one InteractionFilter.process result.
+        """
+        self.update(
+            method_name,
+            len(results['overlaps']) > 0,
+            len(results['interactions']) > 0,
+            results['triggers'] > 0
+        )
+        self.stats[method_name]['evicted_pairs'] += results.get('evicted_pairs', 0)
+        self.stats[method_name]['dropped_pairs'] += results.get('dropped_pairs', 0)
+        for interaction in results.get('ended_interactions', []):
+            self.log_interaction(
+                method_name,
+                interaction['start_frame'],
+                interaction['end_frame'],
+                interaction['triggered'],
+                interaction.get('trigger_frame'),
+                interaction.get('gaps', 0)
+            )
+
+    def close_interactions(self, method_name, active_interactions, end_frame):
+        """
+        Log interactions still active when the video ends. Pairs inside their
+        miss tolerance end at the last frame they were seen.
+        """
+        for pair, data in active_interactions.items():
+            self.log_interaction(
+                method_name,
+                data['start_frame'],
+                min(end_frame, data['last_seen']) if data.get('misses') else end_frame,
+                data['triggered'],
+                data.get('trigger_frame'),
+                data.get('gaps', 0)
+            )
+
+    def state_dict(self):
+        """
+        Counters and in-memory annotations for checkpoints, plus how much of the
+        annotation sink belongs to this state.
+        """
+        sink_offset = 0
+        if self.annotation_sink and os.path.exists(self.annotation_sink):
+            sink_offset = os.path.getsize(self.annotation_sink)
+        return {
+            'stats': {method: dict(data, annotations=list(data['annotations'])) for method, data in self.stats.items()},
+            'processing_stats': dict(self.processing_stats),
+            'sink_offset': sink_offset,
+            'latency': (self.latency_counts.copy(), self.first_latency, self.max_latency),
+        }
+
+    def load_state_dict(self, state):
+        """
+        Restore checkpointed state. Annotations flushed to the sink after the
+        checkpoint are cut off, since the resumed run logs them again.
+        """
+        self.stats.clear()
+        for method, data in state['stats'].items():
+            self.stats[method].update(data)
+        self.processing_stats.update(state['processing_stats'])
+        if 'latency' in state:
+            counts, self.first_latency, self.max_latency = state['latency']
+            self.latency_counts = counts.copy()
+        if self.annotation_sink and os.path.exists(self.annotation_sink):
+            with open(self.annotation_sink, 'r+') as f:
+                f.truncate(state['sink_offset'])
 
     def set_processing_stats(self, start_time, end_time, duration, fps, total_frames):
-        self.processing_stats = {
+        self.processing_stats.update({
             'start_time': start_time,
             'end_time': end_time,
             'duration_sec': duration,
             'fps': fps,
             'total_frames': total_frames
-        }
+        })
+
+    def set_inference_stats(self, frames, inference_calls):
+        """Pose model invocations versus frames processed (frames skipped by gating are saved calls)."""
+        self.processing_stats['inference_frames'] = frames
+        self.processing_stats['inference_calls'] = inference_calls
+
+    def set_warmup_stats(self, seconds, shapes):
+        """Model warmup before the first frame; kept out of the processing time."""
+        self.processing_stats['warmup_sec'] = seconds
+        self.processing_stats['warmup_shapes'] = shapes
+
+    def record_latency(self, seconds):
+        """Wall time of one frame from decode to the last filter."""
+        if self.first_latency is None:
+            self.first_latency = seconds
+        self.max_latency = max(self.max_latency, seconds)
+        self.latency_counts[np.searchsorted(LATENCY_BINS, seconds)] += 1
+
+    def latency_percentile(self, q):
+        """Frame latency percentile q (0-100) in seconds, to the histogram's resolution; None before any frame."""
+        total = self.latency_counts.sum()
+        if not total:
+            return None
+        i = int(np.searchsorted(np.cumsum(self.latency_counts), q / 100 * total))
+        if i == 0:
+            return LATENCY_BINS[0]
+        if q >= 100 or i >= len(LATENCY_BINS):
+            return self.max_latency
+        return min(float(np.sqrt(LATENCY_BINS[i - 1] * LATENCY_BINS[i])), self.max_latency)
+
+    def cost_reduction(self, method_name):
+        """Percentage of overlapping frames that did not need a VLM call."""
+        data = self.stats[method_name]
+        if data['overlap_frames'] == 0:
+            return 0.0
+        return (1 - (data['triggers'] / data['overlap_frames'])) * 100
 
     def _format_time(self, seconds):
         mins = int(seconds // 60)
@@ -59,11 +248,22 @@ class Comparator:
         self._print_header("EXECUTION REPORT")
         self._print_kv("Processing Time", f"{duration_sec:.2f}s ({self.processing_stats.get('fps', 0):.1f} fps)")
         self._print_kv("Video Duration", f"{self._format_time(video_duration)} ({total_frames} frames)")
+        if 'inference_calls' in self.processing_stats:
+            frames = self.processing_stats['inference_frames']
+            saved = frames - self.processing_stats['inference_calls']
+            saved_pct = (saved / frames) * 100 if frames else 0.0
+            saved_color = "\033[32m" if saved_pct > 50 else "\033[33m"
+            self._print_kv("Pose Inference Calls", f"{self.processing_stats['inference_calls']} / {frames} frames")
+            self._print_kv("Saved Inference Calls", f"{saved_color}{saved} ({saved_pct:.1f}%)\033[0m")
+        if 'warmup_sec' in self.processing_stats:
+            self._print_kv("Warmup", f"{self.processing_stats['warmup_sec']:.2f}s ({self.processing_stats['warmup_shapes']} input shapes, not in processing time)")
+        if self.first_latency is not None:
+            p50, p99 = self.latency_percentile(50), self.latency_percentile(99)
+            self._print_kv("Frame Latency", f"p50 {p50 * 1000:.1f}ms, p99 {p99 * 1000:.1f}ms, max {self.max_latency * 1000:.1f}ms "
+                                            f"(first frame {self.first_latency * 1000:.1f}ms)")
 
         for method, data in self.stats.items():
-            cost_reduction = 0.0
-            if data['overlap_frames'] > 0:
-                cost_reduction = (1 - (data['triggers'] / data['overlap_frames'])) * 100
+            cost_reduction = self.cost_reduction(method)
 
             # 2. Method Metrics
             self._print_header(f"METHOD: {method.upper()}")
@@ -78,10 +278,24 @@ class Comparator:
             savings_color = "\033[32m" if cost_reduction > 80 else ("\033[33m" if cost_reduction > 50 else "\033[31m")
             self._print_kv("VLM Cost Reduction", f"{savings_color}{cost_reduction:.1f}%\033[0m")
 
+            if data['merged_gaps']:
+                self._print_kv("Bridged Gaps", f"{data['merged_gaps']} (fragments merged into {self.total_annotations(method)} interactions)")
+
+            # Memory bounds only show up once they kicked in
+            if data['flushed_annotations']:
+                self._print_kv("Flushed Interactions", f"{data['flushed_annotations']} (-> {self.annotation_sink})")
+            if data['dropped_annotations']:
+                self._print_kv("Dropped Interactions", f"\033[33m{data['dropped_annotations']}\033[0m")
+            if data['evicted_pairs']:
+                self._print_kv("Evicted Pairs", f"\033[33m{data['evicted_pairs']}\033[0m")
+            if data['dropped_pairs']:
+                self._print_kv("Dropped Pairs", f"\033[33m{data['dropped_pairs']}\033[0m")
+
             # 3. Detailed Interaction Log
             if data['annotations']:
                 print(f"\n  \033[1mDETECTED INTERACTIONS\033[0m")
-                for i, ann in enumerate(data['annotations'], 1):
+                first = data['flushed_annotations'] + data['dropped_annotations'] + 1
+                for i, ann in enumerate(data['annotations'], first):
                     start_t = ann['start_frame'] / fps
                     end_t = ann['end_frame'] / fps
                     duration = end_t - start_t
@@ -94,4 +308,12 @@ class Comparator:
 
                     print(f"  {i}. {status_icon} {time_range} ({duration:.1f}s) - {status_text}")
 
+        # 4. Side-by-side comparison when several methods shared one pass
+        if len(self.stats) > 1:
+            self._print_header("METHOD COMPARISON")
+            print(f"  \033[1m{'Method':<10} {'Overlaps':>10} {'Interact.':>10} {'Triggers':>10} {'Events':>8} {'Merged':>8} {'Savings':>9}\033[0m")
+            for method, data in self.stats.items():
+                print(f"  {method:<10} {data['overlap_frames']:>10} {data['interactions']:>10} "
+                      f"{data['triggers']:>10} {self.total_annotations(method):>8} {data['merged_gaps']:>8} {self.cost_reduction(method):>8.1f}%")
+
         print(f"\033[36m{'-' * 60}\033[0m\n")
@@ -0,0 +1,130 @@
+import bisect
+import json
+import os
+
+def load_labels(path, fps=30.0):
+    """
+    Load labelled interaction intervals as a list of (start_frame, end_frame).
+    File format (JSON):
+        { "unit": "frames" | "seconds", "intervals": [[start, end], ...] }
+    A bare list of [start, end] pairs is read as frames.
+    """
+    with open(path) as f:
+        data = json.load(f)
+
+    if isinstance(data, list):
+        data = {'intervals': data}
+    scale = fps if data.get('unit', 'frames') == 'seconds' else 1
+    return [(int(round(start * scale)), int(round(end * scale))) for start, end in data['intervals']]
+
+def triggered_intervals(annotations):
+    """Intervals of the interactions that were sent to the VLM."""
+    return [(ann['start_frame'], ann['end_frame']) for ann in annotations if ann.get('triggered')]
+
+def _covered(intervals, queries):
+    """
+    For each query interval, whether any interval overlaps it (inclusive bounds).
+    Sort by start once, keep a running max of ends, then one binary search per query:
+    O((n + m) log n) instead of the O(n * m) pairwise check.
+    """
+    if not intervals:
+        return [False] * len(queries)
+    ordered = sorted(intervals)
+    starts = [start for start, _ in ordered]
+    max_ends = []
+    running = float('-inf')
+    for _, end in ordered:
+        running = max(running, end)
+        max_ends.append(running)
+
+    covered = []
+    for q_start, q_end in queries:
+        # Intervals starting at or before q_end; the one reaching furthest decides
+        i = bisect.bisect_right(starts, q_end) - 1
+        covered.append(i >= 0 and max_ends[i] >= q_start)
+    return covered
+
+def match_intervals(predicted, labels):
+    """
+    Match predicted intervals against labelled ones.
+    Returns { 'tp': matched predictions, 'fp', 'fn', 'recalled': matched labels,
+              'precision', 'recall' }.
+    """
+    pred_hits = _covered(labels, predicted)
+    label_hits = _covered(predicted, labels)
+    tp = sum(pred_hits)
+    recalled = sum(label_hits)
+    return {
+        'tp': tp,
+        'fp': len(predicted) - tp,
+        'fn': len(labels) - recalled,
+        'recalled': recalled,
+        'precision': tp / len(predicted) if predicted else 0.0,
+        'recall': recalled / len(labels) if labels else 0.0,
+    }
+
+def pareto_front(rows, cost_key='triggers', gain_key='recall'):
+    """
+    Rows not dominated by any other row (lower cost and higher gain are better).
+    Returns the front sorted by ascending cost.
+    """
+    front = []
+    best_gain = float('-inf')
+    for row in sorted(rows, key=lambda r: (r[cost_key], -r[gain_key])):
+        if row[gain_key] > best_gain:
+            front.append(row)
+            best_gain = row[gain_key]
+    return front
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+def discover_dataset(directory):
+    """
+    Labelled videos in a directory: [(video path, label path)] for every video
+    with a `<stem>.json` label file next to it, plus the videos without one.
+    """
+    labelled, unlabelled = [], []
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in VIDEO_EXTENSIONS:
+            continue
+        label_path = os.path.join(directory, stem + '.json')
+        if os.path.exists(label_path):
+            labelled.append((os.path.join(directory, name), label_path))
+        else:
+            unlabelled.append(os.path.join(directory, name))
+    return labelled, unlabelled
+
+def aggregate_runs(runs):
+    """
+    One evaluation table row per method from per-video runs.
+    runs: dicts with 'method', 'frames', 'fps', 'duration_sec', 'triggers' and
+    the match_intervals counts 'tp', 'fp', 'recalled' plus 'labels'.
+    Precision and recall are pooled over all videos (micro-averaged).
+    """
+    totals = {}
+    for run in runs:
+        t = totals.setdefault(run['method'], {'videos': 0, 'frames': 0, 'video_sec': 0.0, 'duration_sec': 0.0,
+                                              'triggers': 0, 'tp': 0, 'fp': 0, 'recalled': 0, 'labels': 0})
+        t['videos'] += 1
+        t['frames'] += run['frames']
+        t['video_sec'] += run['frames'] / run['fps'] if run['fps'] else 0.0
+        for key in ('duration_sec', 'triggers', 'tp', 'fp', 'recalled', 'labels'):
+            t[key] += run[key]
+
+    rows = []
+    for method, t in totals.items():
+        predicted = t['tp'] + t['fp']
+        hours = t['video_sec'] / 3600
+        rows.append(dict(t, method=method,
+                         precision=t['tp'] / predicted if predicted else 0.0,
+                         recall=t['recalled'] / t['labels'] if t['labels'] else 0.0,
+                         triggers_per_hour=t['triggers'] / hours if hours else 0.0,
+                         fps=t['frames'] / t['duration_sec'] if t['duration_sec'] else 0.0))
+    return rows
+
+def recall_regressions(rows, baseline_rows, tolerance=0.0):
+    """Methods whose recall dropped more than `tolerance` below the baseline: [(method, baseline, now)]."""
+    baseline = {row['method']: row['recall'] for row in baseline_rows}
+    return [(row['method'], baseline[row['method']], row['recall']) for row in rows
+            if row['method'] in baseline and row['recall'] < baseline[row['method']] - tolerance]
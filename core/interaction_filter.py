@@ -4,23 +4,62 @@ import networkx as nx
 from collections import defaultdict
 from scipy.spatial import distance
 import config
-from utils.geometry import bboxes_overlap
+from core.pair_state import PairStateTable, TrackStateTable
+from utils.geometry import overlapping_pairs
+
+# Consecutive interacting frames before a VLM trigger (~2s at 30fps)
+DEFAULT_TRIGGER_FRAMES = 60
 
 class InteractionFilter:
-    def __init__(self, method='hybrid', pose_detector=None, depth_estimator=None):
-        self.method = method # 'ipd', 'head', 'hybrid', 'mde'
+    def __init__(self, method='hybrid', pose_detector=None, depth_estimator=None,
+                 ratio_threshold=None, depth_diff_threshold=None, conf_threshold=None, trigger_frames=None,
+                 max_active_pairs=None, depth_prior=None, miss_tolerance=None, ema_alpha=None,
+                 exit_ratio_threshold=None, exit_depth_diff_threshold=None):
+        self.method = method # 'ipd', 'head', 'hybrid', 'mde', 'prior'
         self.pose_detector = pose_detector
         self.depth_estimator = depth_estimator
+        self.depth_prior = depth_prior  # DepthPrior for 'prior'; depth_estimator is its fallback
+        if method == 'prior' and depth_prior is None:
+            raise ValueError("The 'prior' method needs a calibrated depth prior (see calibrate.py)")
+
+        # Thresholds default to config; overridden per instance by parameter sweeps
+        self.ratio_threshold = config.Z_PLANE_RATIO_THRESHOLD if ratio_threshold is None else ratio_threshold
+        self.depth_diff_threshold = config.Z_PLANE_DEPTH_DIFF_THRESHOLD if depth_diff_threshold is None else depth_diff_threshold
+        self.conf_threshold = config.CONF_THRESHOLD if conf_threshold is None else conf_threshold
+        self.trigger_frames = DEFAULT_TRIGGER_FRAMES if trigger_frames is None else trigger_frames
+
+        # Hysteresis: active pairs survive short gaps and are held to looser exit thresholds
+        self.miss_tolerance = int(round(config.INTERACTION_MISS_TOLERANCE if miss_tolerance is None else miss_tolerance))
+        self.ema_alpha = config.Z_EMA_ALPHA if ema_alpha is None else ema_alpha
+        exit_ratio = config.Z_PLANE_RATIO_EXIT_THRESHOLD if exit_ratio_threshold is None else exit_ratio_threshold
+        exit_depth = config.Z_PLANE_DEPTH_DIFF_EXIT_THRESHOLD if exit_depth_diff_threshold is None else exit_depth_diff_threshold
+        # Never tighter than the enter thresholds (sweeps may raise those past the config exit values)
+        self.exit_ratio_threshold = max(exit_ratio, self.ratio_threshold)
+        self.exit_depth_diff_threshold = max(exit_depth, self.depth_diff_threshold)
         
-        # Tracking state
-        self.active_interactions = {} # pair -> {'count': int, 'start_frame': int, 'triggered': bool}
+        # Tracking state: bounded pair -> {'count', 'start_frame', 'triggered'} table
+        self.active_interactions = PairStateTable(max_active_pairs or config.MAX_ACTIVE_PAIRS)
+        # Per-track smoothed z-metrics
+        self.tracks = TrackStateTable(config.MAX_TRACKS)
         self.frame_count = 0
         
+    def state_dict(self):
+        """Temporal state for checkpoints (thresholds come from the constructor)."""
+        return {'frame_count': self.frame_count, 'active_interactions': self.active_interactions.state_dict(),
+                'tracks': self.tracks.state_dict()}
+
+    def load_state_dict(self, state):
+        self.frame_count = state['frame_count']
+        self.active_interactions.load_state_dict(state['active_interactions'])
+        self.tracks.load_state_dict(state['tracks'])
+
     def _get_head_size(self, p, method='hybrid'):
         """
         Compute head size metric from keypoints.
         """
         kp = p['keypoints']
+        if kp is None:  # Cascade detections outside overlaps carry no pose
+            return 0
         conf = p['conf'] # This is average conf, but we need per-point conf. 
         # Recover per-point conf from the [x, y, c] structure in pose_detector
         
@@ -33,121 +72,160 @@ class InteractionFilter:
         # kp[i] = [x, y, conf]
         
         if method in ['ipd', 'hybrid']:
-            if kp[left_eye_idx][2] > config.CONF_THRESHOLD and kp[right_eye_idx][2] > config.CONF_THRESHOLD:
+            if kp[left_eye_idx][2] > self.conf_threshold and kp[right_eye_idx][2] > self.conf_threshold:
                 ipd = distance.euclidean(kp[left_eye_idx][:2], kp[right_eye_idx][:2])
                 if ipd > 0: return ipd
         
         if method == 'ipd': return 0
         
         # Fallback to head width
-        valid_points = [kp[i][0] for i in head_indices if kp[i][2] > config.CONF_THRESHOLD]
+        valid_points = [kp[i][0] for i in head_indices if kp[i][2] > self.conf_threshold]
         if len(valid_points) < 2: return 0
         return max(valid_points) - min(valid_points)
 
-    def _check_z_plane(self, v1, v2):
+    def _check_z_plane(self, v1, v2, active=False):
+        """Same-plane test; `active` pairs use the looser exit thresholds."""
         if v1 == 0 or v2 == 0: return False
 
-        if self.method == 'mde':
+        if self.method in ('mde', 'prior'):
             # Metric or relative check?
             # If standard metric depth: abs(d1 - d2) / max(d1, d2)
             # DepthAnything outputs relative depth (inverse depth usually) for VITS unless calibrated.
             # Assuming relative depth: similar values = similar plane.
             diff_ratio = abs(v1 - v2) / max(abs(v1), abs(v2) + 1e-6)
-            return diff_ratio < config.Z_PLANE_DEPTH_DIFF_THRESHOLD
+            return diff_ratio < (self.exit_depth_diff_threshold if active else self.depth_diff_threshold)
         
         else:
             # Heuristic
             ratio = max(v1/v2, v2/v1)
-            return ratio < config.Z_PLANE_RATIO_THRESHOLD
+            return ratio < (self.exit_ratio_threshold if active else self.ratio_threshold)
 
-    def process(self, frame):
-        self.frame_count += 1
-        persons = self.pose_detector.detect(frame)
+    def process(self, frame, persons=None, shared=None, frame_index=None):
+        """
+        Run one frame through the overlap, z-plane and temporal filters.
+        persons: pre-computed detections (optional). When several filters share
+        one pose pass, the caller detects once and hands the result to each.
+        shared: optional SharedInput so pose and depth reuse one letterboxed input.
+        frame_index: source frame number when the caller skips frames (e.g. a
+        scheduled live stream); dwell and miss tolerance then advance by the
+        source frames elapsed, so they keep their meaning in video time. The
+        tolerance is rounded up to whole samples, so a stride wider than it
+        still bridges one missed sample.
+        """
+        step = 1 if frame_index is None else max(1, frame_index - self.frame_count)
+        self.frame_count += step
+        tolerance = -(-self.miss_tolerance // step) * step
+        if persons is None:
+            persons = self.pose_detector.detect(frame, shared=shared)
         
         ids = list(persons.keys())
-        overlapping_pairs = set()
         interacting_pairs = set()
-        
-        # Pre-calc depth map if needed and if we have people
-        depth_map = None
-        if self.method == 'mde' and len(ids) > 1:
-            depth_map = self.depth_estimator.get_depth_map(frame)
 
-        # Pre-calculate z-metrics (O(N))
+        # Overlap test for all boxes at once; only people in an overlapping pair
+        # need a z-metric (and, for mde, depth)
+        overlap_index = overlapping_pairs(np.array([persons[pid]['bbox'][:4] for pid in ids])) if len(ids) > 1 else []
+        overlapping = set(frozenset([ids[i], ids[j]]) for i, j in overlap_index)
+        involved_ids = set().union(*overlapping)
+        involved = [pid for pid in ids if pid in involved_ids]
+
+        # Pre-calculate z-metrics (O(N) over involved persons)
         z_metrics = {}
-        if len(ids) > 1:
-            for pid in ids:
-                if self.method == 'mde':
-                    if depth_map is not None:
-                        z_metrics[pid] = self.depth_estimator.get_person_depth(depth_map, persons[pid]['bbox'])
-                    else:
-                        z_metrics[pid] = 0
-                else:
-                    z_metrics[pid] = self._get_head_size(persons[pid], self.method)
+        if self.method == 'prior':
+            # Background depth under each person's feet; live MDE only where that lookup is unreliable
+            depths, reliable = self.depth_prior.lookup([persons[pid]['bbox'][:4] for pid in involved], frame.shape)
+            z_metrics.update((pid, float(d)) for pid, d, ok in zip(involved, depths, reliable) if ok)
+            missing = [pid for pid, ok in zip(involved, reliable) if not ok]
+            if missing and self.depth_estimator is not None:
+                depth_map = self.depth_estimator.get_depth_map(frame, shared=shared)
+                scale = self.depth_prior.align(depth_map)
+                depths = self.depth_estimator.get_persons_depth(depth_map, [persons[pid]['bbox'] for pid in missing])
+                z_metrics.update(zip(missing, (float(d) * scale for d in depths)))
+            for pid in missing:
+                z_metrics.setdefault(pid, 0)
+        elif self.method == 'mde':
+            # Persons replayed from the detection cache may already carry a depth
+            for pid in involved:
+                if 'depth' in persons[pid]:
+                    z_metrics[pid] = persons[pid]['depth']
+            missing = [pid for pid in involved if pid not in z_metrics]
+            if missing and self.depth_estimator is not None:
+                depth_map = self.depth_estimator.get_depth_map(frame, shared=shared)
+                depths = self.depth_estimator.get_persons_depth(depth_map, [persons[pid]['bbox'] for pid in missing])
+                z_metrics.update(zip(missing, (float(d) for d in depths)))
+            for pid in missing:
+                z_metrics.setdefault(pid, 0)
+        else:
+            for pid in involved:
+                z_metrics[pid] = self._get_head_size(persons[pid], self.method)
+
+        # Smooth per track; short measurement dropouts reuse the recent value
+        smoothed = {pid: self.tracks.smooth(pid, z, self.frame_count, self.ema_alpha, tolerance + step - 1)
+                    for pid, z in z_metrics.items()}
 
         # Graph for grouping
         G = nx.Graph()
         G.add_nodes_from(ids)
-        
-        # Standard O(N^2) check
-        for i in range(len(ids)):
-            id1 = ids[i]
-            for j in range(i+1, len(ids)):
-                id2 = ids[j]
-                
-                if bboxes_overlap(persons[id1]['bbox'], persons[id2]['bbox']):
-                    pair = frozenset([id1, id2])
-                    overlapping_pairs.add(pair)
-                    
-                    if self._check_z_plane(z_metrics[id1], z_metrics[id2]):
-                        interacting_pairs.add(pair)
-                        G.add_edge(id1, id2)
+
+        for i, j in overlap_index:
+            id1, id2 = ids[i], ids[j]
+            active = frozenset([id1, id2]) in self.active_interactions
+            if self._check_z_plane(smoothed[id1], smoothed[id2], active=active):
+                interacting_pairs.add(frozenset([id1, id2]))
+                G.add_edge(id1, id2)
 
         # Identify groups
         groups = [list(c) for c in nx.connected_components(G) if len(c) > 1]
 
         # Update persistent interaction tracking
-        threshold_frames = int(config.INTERACTION_DURATION_SEC / (config.FRAME_INTERVAL * 0.033)) # Approximate if FPS unknown, usually passed from main
-        # We'll rely on Main to pass FPS or Config to set specific frames. 
-        # Let's use config.INTERACTION_DURATION_SEC assuming 30fps for now or let logic handle it.
-        # Actually proper way: count frames. 2 sec @ 30fps = 60 frames.
-        
         frame_triggers = 0
         
         # Logic update
         current_pairs = interacting_pairs
-        to_remove = []
         ended_interactions = []
+        table = self.active_interactions
         
-        for pair, data in list(self.active_interactions.items()):
+        for pair in table:
+            slot = table.slots[pair]
             if pair in current_pairs:
-                data['count'] += 1
+                # Skipped frames between two interacting ones count toward the dwell
+                table.count[slot] += 1 if table.misses[slot] else step
+                if table.misses[slot]:
+                    # Back within the miss tolerance: one interaction, not two fragments
+                    table.gaps[slot] += 1
+                    table.misses[slot] = 0
+                table.last_seen[slot] = self.frame_count
                 # Trigger logic
-                # 60 frames approx for 2s
-                if data['count'] >= 60 and not data['triggered']:
+                if table.count[slot] >= self.trigger_frames and not table.triggered[slot]:
                     frame_triggers += 1
-                    data['triggered'] = True
-                    data['trigger_frame'] = self.frame_count
+                    table.triggered[slot] = True
+                    table.trigger_frame[slot] = self.frame_count
             else:
-                to_remove.append(pair)
-        
-        for r in to_remove:
-            data = self.active_interactions[r]
-            data['end_frame'] = self.frame_count - 1
-            ended_interactions.append(data)
-            del self.active_interactions[r]
+                table.misses[slot] += step
+                if table.misses[slot] > tolerance:
+                    last_seen = int(table.last_seen[slot])
+                    data = table.remove(pair)
+                    data['end_frame'] = last_seen
+                    ended_interactions.append(data)
             
+        evicted_before, dropped_before = table.evictions, table.dropped
         for pair in current_pairs:
-            if pair not in self.active_interactions:
-                self.active_interactions[pair] = { 'count': 1, 'start_frame': self.frame_count, 'triggered': False }
+            if pair not in table:
+                # A full table evicts its stalest pair; log it as ended rather than lose it.
+                # Pairs interacting in this very frame are kept; the new pair is dropped instead
+                evicted = table.add(pair, self.frame_count)
+                if evicted is not None:
+                    ended_interactions.append(evicted)
                 
         return {
             'persons': persons,
             'interactions': interacting_pairs,
-            'overlaps': overlapping_pairs,
+            'overlaps': overlapping,
             'groups': groups,
             'triggers': frame_triggers,
             'ended_interactions': ended_interactions,
             'active_interactions': self.active_interactions,
-            'z_metrics': z_metrics
+            'evicted_pairs': table.evictions - evicted_before,
+            'dropped_pairs': table.dropped - dropped_before,
+            'z_metrics': z_metrics,
+            'z_smoothed': smoothed
         }
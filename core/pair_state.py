@@ -0,0 +1,172 @@
+import numpy as np
+
+_ARRAYS = ('count', 'start_frame', 'trigger_frame', 'triggered', 'last_seen', 'misses', 'gaps')
+
+class PairStateTable:
+    """
+    Fixed-capacity table of per-pair interaction state.
+    Pairs (frozensets of tracker IDs) are interned to slot indices into
+    preallocated arrays, so memory does not grow with tracker-ID churn.
+    When the table is full the least recently seen pair is evicted; pairs
+    seen in the current frame are never evicted, so a new pair that finds
+    only those is dropped instead.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.count = np.zeros(capacity, dtype=np.int32)
+        self.start_frame = np.zeros(capacity, dtype=np.int64)
+        self.trigger_frame = np.full(capacity, -1, dtype=np.int64)
+        self.triggered = np.zeros(capacity, dtype=bool)
+        self.last_seen = np.zeros(capacity, dtype=np.int64)
+        self.misses = np.zeros(capacity, dtype=np.int32)  # Consecutive frames the pair was not interacting
+        self.gaps = np.zeros(capacity, dtype=np.int32)  # Gaps bridged (fragments merged into this interaction)
+
+        self.slots = {}  # pair -> slot index
+        self.free = list(range(capacity - 1, -1, -1))
+        self.evictions = 0
+        self.dropped = 0  # New pairs turned away because every tracked pair was seen this frame
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, pair):
+        return pair in self.slots
+
+    def __iter__(self):
+        return iter(list(self.slots))
+
+    def add(self, pair, frame):
+        """
+        Start tracking `pair` at `frame`.
+        Returns the evicted pair's record if room had to be made, else None.
+        If every tracked pair was seen at `frame`, `pair` is not added and
+        `dropped` is incremented.
+        """
+        evicted = None
+        if not self.free:
+            oldest = min(self.slots, key=lambda p: self.last_seen[self.slots[p]])
+            if self.last_seen[self.slots[oldest]] >= frame:
+                self.dropped += 1
+                return None
+            last_seen = int(self.last_seen[self.slots[oldest]])
+            evicted = self.remove(oldest)
+            evicted['end_frame'] = last_seen
+            evicted['evicted'] = True
+            self.evictions += 1
+
+        slot = self.free.pop()
+        self.slots[pair] = slot
+        self.count[slot] = 1
+        self.start_frame[slot] = frame
+        self.trigger_frame[slot] = -1
+        self.triggered[slot] = False
+        self.last_seen[slot] = frame
+        self.misses[slot] = 0
+        self.gaps[slot] = 0
+        return evicted
+
+    def record(self, pair):
+        """Snapshot of a pair's state in the dict format InteractionFilter reports."""
+        slot = self.slots[pair]
+        data = {
+            'count': int(self.count[slot]),
+            'start_frame': int(self.start_frame[slot]),
+            'triggered': bool(self.triggered[slot]),
+            'last_seen': int(self.last_seen[slot]),
+        }
+        if self.triggered[slot]:
+            data['trigger_frame'] = int(self.trigger_frame[slot])
+        if self.gaps[slot]:
+            data['gaps'] = int(self.gaps[slot])
+        if self.misses[slot]:
+            data['misses'] = int(self.misses[slot])
+        return data
+
+    def remove(self, pair):
+        """Stop tracking `pair`, returning its final record."""
+        data = self.record(pair)
+        self.free.append(self.slots.pop(pair))
+        return data
+
+    def items(self):
+        return [(pair, self.record(pair)) for pair in self.slots]
+
+    def get(self, pair, default=None):
+        return self.record(pair) if pair in self.slots else default
+
+    def __getitem__(self, pair):
+        return self.record(pair)
+
+    def state_dict(self):
+        """Copy of the table for checkpoints."""
+        return {
+            'capacity': self.capacity,
+            'arrays': {name: getattr(self, name).copy() for name in _ARRAYS},
+            'slots': dict(self.slots),
+            'free': list(self.free),
+            'evictions': self.evictions,
+            'dropped': self.dropped,
+        }
+
+    def load_state_dict(self, state):
+        if state['capacity'] != self.capacity:
+            raise ValueError(f"Checkpointed pair table holds {state['capacity']} pairs, this one {self.capacity}")
+        for name in _ARRAYS:
+            getattr(self, name)[:] = state['arrays'][name]
+        self.slots = dict(state['slots'])
+        self.free = list(state['free'])
+        self.evictions = state['evictions']
+        self.dropped = state.get('dropped', 0)
+
+class TrackStateTable:
+    """
+    Fixed-capacity per-track state: the EMA-smoothed z-metric of each tracker
+    ID and the frame it was last measured. Same slot interning and LRU
+    eviction as PairStateTable.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.ema = np.zeros(capacity, dtype=np.float64)
+        self.last_seen = np.zeros(capacity, dtype=np.int64)
+        self.slots = {}  # track id -> slot index
+        self.free = list(range(capacity - 1, -1, -1))
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, track_id):
+        return track_id in self.slots
+
+    def smooth(self, track_id, value, frame, alpha, max_gap):
+        """
+        Blend a z-metric measurement into the track's EMA and return the smoothed value.
+        A value of 0 (no measurement, e.g. head keypoints under the confidence
+        threshold) returns the EMA if the track was measured within `max_gap` frames, else 0.
+        The EMA restarts after longer gaps.
+        """
+        slot = self.slots.get(track_id)
+        missed = frame - self.last_seen[slot] - 1 if slot is not None else None  # Frames since the last measurement
+        if not value:
+            return float(self.ema[slot]) if missed is not None and missed < max_gap else 0
+        fresh = missed is not None and missed <= max_gap
+        if slot is None:
+            if not self.free:
+                oldest = min(self.slots, key=lambda t: self.last_seen[self.slots[t]])
+                self.free.append(self.slots.pop(oldest))
+            slot = self.slots[track_id] = self.free.pop()
+            fresh = False
+        self.ema[slot] = alpha * value + (1 - alpha) * self.ema[slot] if fresh else value
+        self.last_seen[slot] = frame
+        return float(self.ema[slot])
+
+    def state_dict(self):
+        return {'capacity': self.capacity, 'ema': self.ema.copy(), 'last_seen': self.last_seen.copy(),
+                'slots': dict(self.slots), 'free': list(self.free)}
+
+    def load_state_dict(self, state):
+        if state['capacity'] != self.capacity:
+            raise ValueError(f"Checkpointed track table holds {state['capacity']} tracks, this one {self.capacity}")
+        self.ema[:] = state['ema']
+        self.last_seen[:] = state['last_seen']
+        self.slots = dict(state['slots'])
+        self.free = list(state['free'])
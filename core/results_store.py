@@ -0,0 +1,302 @@
+import json
+import os
+import shutil
+import time
+import numpy as np
+import config
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; raw NumPy record files are the fallback
+    pa = pq = None
+
+STORE_VERSION = 1
+BACKENDS = ['auto', 'arrow', 'numpy']
+
+# One row per processed frame and method. Detection stages are shared by all
+# methods of a frame, so their timings repeat on each of its rows.
+FRAME_DTYPE = np.dtype([
+    ('frame', np.int64),
+    ('method', np.int8),  # Index into the run's meta['methods']
+    ('persons', np.int32),
+    ('overlaps', np.int32),
+    ('interactions', np.int32),
+    ('triggers', np.int32),
+    ('decode_ms', np.float32),
+    ('detect_ms', np.float32),
+    ('filter_ms', np.float32),
+])
+
+# One row per logged interaction (Comparator annotation)
+INTERACTION_DTYPE = np.dtype([
+    ('method', np.int8),
+    ('start_frame', np.int64),
+    ('end_frame', np.int64),
+    ('triggered', np.bool_),
+    ('trigger_frame', np.int64),  # -1 when not triggered
+    ('gaps', np.int32),
+])
+
+TABLES = {'frames': FRAME_DTYPE, 'interactions': INTERACTION_DTYPE}
+STAGES = ('decode_ms', 'detect_ms', 'filter_ms')
+
+# Per-method sums collected by ResultsStore.aggregate
+AGGREGATE_FIELDS = {'runs': 0, 'frames': 0, 'video_sec': 0.0, 'overlap_frames': 0, 'interaction_frames': 0,
+                    'trigger_frames': 0, 'interactions': 0, 'triggered_interactions': 0,
+                    'decode_ms': 0.0, 'detect_ms': 0.0, 'filter_ms': 0.0}
+
+def _resolve_backend(backend):
+    if backend == 'auto':
+        return 'arrow' if pa is not None else 'numpy'
+    if backend == 'arrow' and pa is None:
+        raise ImportError("The 'arrow' results backend needs pyarrow: pip install pyarrow")
+    return backend
+
+class _TableWriter:
+    """
+    Buffers rows of one table and writes them out a row group at a time.
+    Parquet tables are written as parts (`frames.parquet`, `frames.1.parquet`,
+    ...): a checkpoint finishes the current part, since an unclosed Parquet
+    file cannot be read back or appended to.
+    """
+    def __init__(self, path, dtype, backend, batch_rows, state=None):
+        self.dtype = dtype
+        self.backend = backend
+        self.buffer = np.zeros(batch_rows, dtype=dtype)
+        self.size = 0
+        self.rows = 0
+        self.row_groups = 0
+        self.stem = path
+        self.parts = []  # Finished Parquet parts (file names)
+        if state is not None:
+            self.rows, self.row_groups, self.parts = state['rows'], state['row_groups'], list(state['parts'])
+        if backend == 'arrow':
+            if state is not None:
+                # Parts written after the checkpoint are redone
+                directory = os.path.dirname(path)
+                prefix = os.path.basename(path) + '.'
+                for name in os.listdir(directory):
+                    if name.startswith(prefix) and name.endswith('.parquet') and name not in self.parts:
+                        os.remove(os.path.join(directory, name))
+            self._schema = pa.schema([(name, pa.from_numpy_dtype(dtype[name])) for name in dtype.names])
+            self._open_part()
+        else:
+            self.path = path + '.bin'
+            if state is None:
+                self._file = open(self.path, 'wb')
+            else:
+                # Rows written after the checkpoint are redone
+                self._file = open(self.path, 'r+b')
+                self._file.truncate(self.rows * dtype.itemsize)
+                self._file.seek(0, os.SEEK_END)
+
+    def _open_part(self):
+        part = len(self.parts)
+        self.path = f"{self.stem}.parquet" if part == 0 else f"{self.stem}.{part}.parquet"
+        self._file = pq.ParquetWriter(self.path, self._schema)
+
+    def append(self, row):
+        self.buffer[self.size] = row
+        self.size += 1
+        if self.size == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        if not self.size:
+            return
+        batch = self.buffer[:self.size]
+        if self.backend == 'arrow':
+            self._file.write_table(pa.table({name: batch[name] for name in self.dtype.names}))
+        else:
+            self._file.write(batch.tobytes())
+        self.rows += self.size
+        self.row_groups += 1
+        self.size = 0
+
+    def state_dict(self):
+        """Write out buffered rows and return what a resumed writer continues from."""
+        self.flush()
+        if self.backend == 'arrow':
+            self._file.close()
+            self.parts.append(os.path.basename(self.path))
+            self._open_part()
+        else:
+            self._file.flush()
+        return {'rows': self.rows, 'row_groups': self.row_groups, 'parts': list(self.parts)}
+
+    def close(self):
+        self.flush()
+        self._file.close()
+        if self.backend == 'arrow':
+            self.parts.append(os.path.basename(self.path))
+
+class ResultsWriter:
+    """
+    Streams one run's per-frame summary rows and per-interaction rows to a
+    columnar store, in row groups of `batch_rows`. The run only becomes visible
+    to ResultsStore once `close()` renames it into place.
+    state: state_dict() of an interrupted run to continue (resuming from a
+    checkpoint); its run ID, meta and partial tables are reused and rows
+    written after the checkpoint are dropped.
+    """
+    def __init__(self, root, run_id, methods, meta=None, backend=None, batch_rows=None, state=None):
+        if state is not None:
+            run_id, backend, meta = state['meta']['run_id'], state['meta']['backend'], state['meta']
+        self.backend = _resolve_backend(backend or config.RESULTS_BACKEND)
+        self.methods = list(methods)
+        self.final_path = os.path.join(root, run_id)
+        self.tmp_path = state['tmp_path'] if state is not None else f"{self.final_path}.tmp-{os.getpid()}"
+        os.makedirs(self.tmp_path, exist_ok=True)
+        self.meta = dict(meta or {}, run_id=run_id, methods=self.methods, backend=self.backend, version=STORE_VERSION)
+        batch_rows = batch_rows or config.RESULTS_BATCH_ROWS
+        self.tables = {name: _TableWriter(os.path.join(self.tmp_path, name), dtype, self.backend, batch_rows,
+                                          state=state['tables'][name] if state is not None else None)
+                       for name, dtype in TABLES.items()}
+        self._codes = {method: i for i, method in enumerate(self.methods)}
+
+    def add_frame(self, frame, method, results, persons, timings):
+        """
+        One frame's summary for one method.
+        results: InteractionFilter.process result; timings: stage -> seconds
+        ('decode', 'detect', 'filter').
+        """
+        self.tables['frames'].append((frame, self._codes[method], persons, len(results['overlaps']),
+                                      len(results['interactions']), results['triggers'],
+                                      timings.get('decode', 0.0) * 1000, timings.get('detect', 0.0) * 1000,
+                                      timings.get('filter', 0.0) * 1000))
+
+    def add_interaction(self, method, annotation):
+        """One Comparator annotation (usable as Comparator(on_interaction=...))."""
+        trigger_frame = annotation.get('trigger_frame')
+        self.tables['interactions'].append((self._codes[method], annotation['start_frame'], annotation['end_frame'],
+                                            annotation['triggered'], -1 if trigger_frame is None else trigger_frame,
+                                            annotation.get('gaps', 0)))
+
+    def state_dict(self):
+        """Where an interrupted run continues from (see `state`); writes out buffered rows."""
+        return {'meta': dict(self.meta), 'tmp_path': self.tmp_path,
+                'tables': {name: table.state_dict() for name, table in self.tables.items()}}
+
+    def close(self, processing_stats=None):
+        for table in self.tables.values():
+            table.close()
+        self.meta['rows'] = {name: table.rows for name, table in self.tables.items()}
+        if self.backend == 'arrow':
+            self.meta['parts'] = {name: table.parts for name, table in self.tables.items()}
+        self.meta['processing_stats'] = dict(processing_stats or {})
+        self.meta['written'] = time.time()
+        with open(os.path.join(self.tmp_path, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f)
+        if os.path.exists(self.final_path):
+            shutil.rmtree(self.final_path)
+        os.replace(self.tmp_path, self.final_path)
+
+    def abort(self, keep=False):
+        """Drop a partial run (e.g. the run was interrupted); `keep` leaves it for a resume."""
+        for table in self.tables.values():
+            table._file.close()
+        if not keep:
+            shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+class ResultsStore:
+    """
+    Read side of a results directory holding many runs. Tables are read in
+    batches (Parquet row groups or memory-mapped record slices), so
+    aggregates over thousands of runs never hold a whole table in memory.
+    """
+    def __init__(self, root):
+        self.root = root
+
+    def runs(self):
+        """Meta of every finished run, oldest first."""
+        metas = []
+        if not os.path.isdir(self.root):
+            return metas
+        for name in os.listdir(self.root):
+            meta_path = os.path.join(self.root, name, 'meta.json')
+            if '.tmp-' in name or not os.path.exists(meta_path):
+                continue
+            with open(meta_path) as f:
+                metas.append(json.load(f))
+        return sorted(metas, key=lambda meta: meta['written'])
+
+    def _meta(self, run_id):
+        with open(os.path.join(self.root, run_id, 'meta.json')) as f:
+            return json.load(f)
+
+    def iter_table(self, run_id, table, columns=None, batch_rows=None):
+        """Yield {column: array} batches of one run's table ('frames' or 'interactions')."""
+        meta = self._meta(run_id)
+        dtype = TABLES[table]
+        columns = list(columns or dtype.names)
+        batch_rows = batch_rows or config.RESULTS_BATCH_ROWS
+        path = os.path.join(self.root, run_id, table)
+        if meta['backend'] == 'arrow':
+            if pq is None:
+                raise ImportError(f"Run {run_id} is stored as Parquet, which needs pyarrow: pip install pyarrow")
+            for part in meta.get('parts', {}).get(table, [table + '.parquet']):
+                parquet = pq.ParquetFile(os.path.join(self.root, run_id, part))
+                for batch in parquet.iter_batches(batch_size=batch_rows, columns=columns):
+                    yield {name: batch.column(name).to_numpy(zero_copy_only=False) for name in columns}
+            return
+        rows = meta['rows'][table]
+        if rows == 0:
+            return
+        records = np.memmap(path + '.bin', dtype=dtype, mode='r', shape=(rows,))
+        for start in range(0, rows, batch_rows):
+            chunk = records[start:start + batch_rows]
+            yield {name: np.asarray(chunk[name]) for name in columns}
+
+    def read_table(self, run_id, table, columns=None):
+        """A whole table of one run as {column: array} (for a single run; use iter_table for many)."""
+        dtype = TABLES[table]
+        columns = list(columns or dtype.names)
+        batches = list(self.iter_table(run_id, table, columns))
+        return {name: np.concatenate([b[name] for b in batches]) if batches else np.zeros(0, dtype=dtype[name])
+                for name in columns}
+
+    def aggregate(self, run_ids=None, where=None):
+        """
+        Totals per method over runs: frames, overlapping / interaction /
+        triggered frames, interactions, VLM triggers per hour of video, cost
+        reduction and mean stage timings.
+        run_ids: runs to include (default: all); where: optional meta -> bool filter.
+        """
+        totals = {}
+        for meta in self.runs():
+            if run_ids is not None and meta['run_id'] not in run_ids:
+                continue
+            if where is not None and not where(meta):
+                continue
+            fps = meta.get('processing_stats', {}).get('fps') or 30.0
+            methods = meta['methods']
+            for method in methods:
+                totals.setdefault(method, dict(AGGREGATE_FIELDS))['runs'] += 1
+            for batch in self.iter_table(meta['run_id'], 'frames'):
+                for code, method in enumerate(methods):
+                    rows = batch['method'] == code
+                    count = int(rows.sum())
+                    if not count:
+                        continue
+                    t = totals[method]
+                    t['frames'] += count
+                    t['video_sec'] += count / fps
+                    t['overlap_frames'] += int((batch['overlaps'][rows] > 0).sum())
+                    t['interaction_frames'] += int((batch['interactions'][rows] > 0).sum())
+                    t['trigger_frames'] += int((batch['triggers'][rows] > 0).sum())
+                    for stage in STAGES:
+                        t[stage] += float(batch[stage][rows].sum(dtype=np.float64))
+            for batch in self.iter_table(meta['run_id'], 'interactions', columns=['method', 'triggered']):
+                for code, method in enumerate(methods):
+                    rows = batch['method'] == code
+                    totals[method]['interactions'] += int(rows.sum())
+                    totals[method]['triggered_interactions'] += int(batch['triggered'][rows].sum())
+
+        for t in totals.values():
+            hours = t['video_sec'] / 3600
+            t['triggers_per_hour'] = t['trigger_frames'] / hours if hours else 0.0
+            t['cost_reduction'] = (1 - t['trigger_frames'] / t['overlap_frames']) * 100 if t['overlap_frames'] else 0.0
+            for stage in STAGES:
+                t[stage] = t[stage] / t['frames'] if t['frames'] else 0.0
+        return totals
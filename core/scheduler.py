@@ -0,0 +1,185 @@
+import time
+from collections import deque
+import config
+
+RATE_WINDOW_SEC = 2.0  # Effective frame rates are measured over this trailing window
+
+class StreamState:
+    """Scheduling state and metrics of one stream."""
+    def __init__(self, stream_id, source_fps, now):
+        self.stream_id = stream_id
+        self.source_fps = source_fps or 30.0
+        self.budget_fps = self.source_fps
+        self.started = now
+        self.next_due = now
+        self.active = True  # Unknown streams start at full rate until their first result
+        self.latency = None  # EMA of inference seconds per frame
+        self.processed = 0
+        self.dropped = 0  # Frames shed because their deadline had already passed
+        self.slo_misses = 0  # Frames finished after their deadline
+        self.completions = deque()  # Recent completion times, for the effective frame rate
+        self.finished = False
+
+    @property
+    def interval(self):
+        return 1.0 / self.budget_fps
+
+class DeadlineScheduler:
+    """
+    Shares one node's inference capacity between streams.
+
+    Every stream gets a frame-rate budget. Streams with overlapping people or
+    active interactions get `active_fps`, idle streams `idle_fps`; neither
+    exceeds the source rate. A frame is due every 1 / budget seconds and must
+    finish within the latency SLO. Among due streams the earliest deadline runs
+    first (EDF, active streams first on ties). A frame already past its
+    deadline is shed, not processed late, so an overloaded node stays current.
+
+    Budgets are rebalanced against the node capacity, measured as 1 / mean
+    inference time unless given. On overload, idle streams are cut first (down
+    to `min_fps`), then active streams are scaled down proportionally.
+    """
+    def __init__(self, active_fps=None, idle_fps=None, min_fps=None, slo_ms=None, capacity_fps=None,
+                 headroom=None, rebalance_sec=None, clock=time.monotonic):
+        self.active_fps = active_fps or config.SCHEDULER_ACTIVE_FPS
+        self.idle_fps = idle_fps or config.SCHEDULER_IDLE_FPS
+        self.min_fps = min_fps or config.SCHEDULER_MIN_FPS
+        self.slo = (slo_ms or config.STREAM_SLO_MS) / 1000.0
+        self.fixed_capacity = capacity_fps
+        self.headroom = config.SCHEDULER_HEADROOM if headroom is None else headroom
+        self.rebalance_sec = config.SCHEDULER_REBALANCE_SEC if rebalance_sec is None else rebalance_sec
+        self.clock = clock
+
+        self.streams = {}
+        self.capacity_fps = capacity_fps
+        self.overloaded = False
+        self.rebalances = 0
+        self._last_rebalance = clock()
+
+    def add_stream(self, stream_id, source_fps):
+        self.streams[stream_id] = StreamState(stream_id, source_fps, self.clock())
+        self.rebalance()
+
+    def finish_stream(self, stream_id):
+        """The stream ended; its share goes to the others."""
+        self.streams[stream_id].finished = True
+        self.rebalance()
+
+    def _live(self):
+        return [s for s in self.streams.values() if not s.finished]
+
+    def next(self):
+        """
+        Pick the stream whose frame should be processed now.
+        Returns (stream_id, 0.0), or (None, seconds to wait) when nothing is due
+        (None, None once every stream has finished).
+        """
+        now = self.clock()
+        if now - self._last_rebalance >= self.rebalance_sec:
+            self.rebalance()
+        live = self._live()
+        if not live:
+            return None, None
+        due = []
+        for s in live:
+            if s.next_due > now:
+                continue
+            if now > s.next_due + self.slo:
+                # Deadline already passed: shed the missed slots and take the current one
+                missed = int((now - s.next_due) / s.interval)
+                s.dropped += missed
+                s.next_due += missed * s.interval
+            due.append(s)
+        if not due:
+            return None, min(s.next_due for s in live) - now
+        chosen = min(due, key=lambda s: (s.next_due + self.slo, not s.active))
+        return chosen.stream_id, 0.0
+
+    def skip(self, stream_id):
+        """No new frame was available for the due stream; try again one interval later."""
+        s = self.streams[stream_id]
+        s.next_due = max(s.next_due, self.clock()) + s.interval
+
+    def complete(self, stream_id, results, started, finished=None):
+        """
+        Record one processed frame: its latency, whether it met the deadline,
+        and the stream's activity (overlaps or active interactions in
+        `results`, an InteractionFilter.process result or a list of them).
+        """
+        finished = self.clock() if finished is None else finished
+        s = self.streams[stream_id]
+        latency = finished - started
+        s.latency = latency if s.latency is None else 0.8 * s.latency + 0.2 * latency
+        s.processed += 1
+        if finished > s.next_due + self.slo:
+            s.slo_misses += 1
+        s.completions.append(finished)
+        while s.completions and finished - s.completions[0] > RATE_WINDOW_SEC:
+            s.completions.popleft()
+
+        results = results if isinstance(results, (list, tuple)) else [results]
+        active = any(r['overlaps'] or len(r['active_interactions']) for r in results)
+        if active != s.active:
+            s.active = active
+            self.rebalance()
+        s.next_due += s.interval
+
+    def measured_capacity(self):
+        """Frames per second this node can process, from the mean latency so far."""
+        if self.fixed_capacity:
+            return self.fixed_capacity
+        latencies = [s.latency for s in self.streams.values() if s.latency]
+        if not latencies:
+            return None
+        return 1.0 / (sum(latencies) / len(latencies))
+
+    def rebalance(self):
+        """Recompute every live stream's budget from its activity and the node capacity."""
+        self._last_rebalance = self.clock()
+        self.rebalances += 1
+        live = self._live()
+        demand = {s.stream_id: min(self.active_fps if s.active else self.idle_fps, s.source_fps) for s in live}
+        capacity = self.measured_capacity()
+        self.capacity_fps = capacity
+        budgets = dict(demand)
+        usable = capacity * self.headroom if capacity else None
+        self.overloaded = usable is not None and sum(demand.values()) > usable
+        if self.overloaded:
+            active = [s.stream_id for s in live if s.active]
+            idle = [s.stream_id for s in live if not s.active]
+            active_demand = sum(demand[sid] for sid in active)
+            # Idle streams give way first, down to the floor
+            idle_share = max(self.min_fps, (usable - active_demand) / len(idle)) if idle else 0.0
+            for sid in idle:
+                budgets[sid] = min(demand[sid], idle_share)
+            left = usable - sum(budgets[sid] for sid in idle)
+            if active and active_demand > left:
+                scale = max(left, 0.0) / active_demand
+                for sid in active:
+                    budgets[sid] = max(self.min_fps, demand[sid] * scale)
+        for s in live:
+            s.budget_fps = budgets[s.stream_id]
+
+    def metrics(self):
+        """Scheduler decisions and per-stream effective frame rates."""
+        now = self.clock()
+        streams = {}
+        for sid, s in self.streams.items():
+            recent = sum(1 for t in s.completions if now - t <= RATE_WINDOW_SEC)
+            streams[sid] = {
+                'active': s.active,
+                'finished': s.finished,
+                'budget_fps': round(s.budget_fps, 2),
+                'effective_fps': round(recent / RATE_WINDOW_SEC, 2),
+                'average_fps': round(s.processed / (s.completions[-1] - s.started), 2) if s.completions and s.completions[-1] > s.started else 0.0,
+                'latency_ms': round(s.latency * 1000, 1) if s.latency is not None else None,
+                'processed': s.processed,
+                'dropped': s.dropped,
+                'slo_misses': s.slo_misses,
+            }
+        return {
+            'capacity_fps': round(self.capacity_fps, 2) if self.capacity_fps else None,
+            'overloaded': self.overloaded,
+            'rebalances': self.rebalances,
+            'streams': streams,
+        }
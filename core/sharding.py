@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+from core.comparator import Comparator
+import config
+
+# Comparator counters that add up across shards
+SUMMED_STATS = ('interactions', 'triggers', 'overlap_frames', 'dropped_annotations', 'evicted_pairs', 'dropped_pairs', 'merged_gaps')
+
+def plan_jobs(videos, frame_counts, shard_frames=0, args=()):
+    """
+    Split videos into jobs of at most `shard_frames` frames (0 = whole videos).
+    frame_counts: {video: total frames}; videos with an unknown count (<= 0) stay whole.
+    args: extra main.py arguments every job runs with.
+    Returns [(job_id, payload)]. Job ids are derived from the payload, so
+    re-queueing the same plan reuses finished results.
+    """
+    jobs = []
+    for video in videos:
+        video = os.path.abspath(video)
+        total = frame_counts.get(video, 0)
+        if shard_frames and total > shard_frames:
+            ranges = [(start, min(start + shard_frames, total)) for start in range(0, total, shard_frames)]
+        else:
+            ranges = [(0, None)]
+        for start, end in ranges:
+            payload = {'video': video, 'start': start, 'end': end, 'args': list(args)}
+            digest = hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:12]
+            jobs.append((f"{os.path.basename(video)}:{start}-{end if end is not None else 'end'}:{digest}", payload))
+    return jobs
+
+def warmup_start(start, filters):
+    """
+    Frame to start decoding a shard reporting from frame `start` + 1: a dwell
+    plus a miss tolerance earlier, so an interaction crossing the cut has the
+    same dwell and miss state as in a whole-video run. Interactions and
+    triggers of those warm-up frames belong to the previous shard and are not
+    reported (see Comparator start_frame).
+    """
+    if start <= 0:
+        return 0
+    return max(0, start - max(f.trigger_frames + f.miss_tolerance for f in filters))
+
+def shard_result(comparator, payload, worker_id):
+    """JSON-able result of one job: counters and every annotation per method, plus run stats."""
+    stats = {}
+    for method, data in comparator.stats.items():
+        stats[method] = {key: data[key] for key in SUMMED_STATS}
+        stats[method]['annotations'] = list(comparator.iter_annotations(method))
+    processing = comparator.processing_stats
+    return {
+        'worker': worker_id,
+        'video': payload['video'],
+        'start': payload['start'],
+        'end': payload['end'],
+        'frames': processing.get('total_frames', 0),
+        'fps': processing.get('fps', 0.0),
+        'duration_sec': processing.get('duration_sec', 0.0),
+        'inference_calls': processing.get('inference_calls'),
+        'stats': stats,
+    }
+
+def stitch(annotations, following, boundary, tolerance=None):
+    """
+    Append the annotations of the next shard, joining interactions cut at the
+    shard boundary: one still active at `boundary` (the last frame of the
+    earlier shard), or inside its miss tolerance there, continues an
+    interaction of the next shard starting within `tolerance` frames after it
+    or during its warm-up. Tracks are re-identified after a cut, so pairs are
+    matched by time: an equal start frame first (the warm-up saw the whole
+    interaction), then earliest first. Returns the number of joined interactions.
+    """
+    tolerance = config.INTERACTION_MISS_TOLERANCE + 1 if tolerance is None else tolerance
+    # Pairs still inside their miss tolerance were closed at their last seen frame
+    cut = sorted((a for a in annotations if a['end_frame'] > boundary - tolerance), key=lambda a: a['start_frame'])
+    resumed = sorted((a for a in following if a['start_frame'] <= boundary + tolerance), key=lambda a: a['start_frame'])
+    matches, unmatched = [], []
+    for after in resumed:
+        before = next((a for a in cut if a['start_frame'] == after['start_frame']), None)
+        if before is None:
+            unmatched.append(after)
+        else:
+            cut.remove(before)
+            matches.append((before, after))
+    matches.extend(zip(cut, unmatched))
+
+    for before, after in matches:
+        before['end_frame'] = after['end_frame']
+        if not before['triggered'] and after['triggered']:
+            before['triggered'] = True
+            before['trigger_frame'] = after['trigger_frame']
+        # A shard that saw the interaction from its start already counted the earlier gaps
+        gaps = after.get('gaps', 0) + (before.get('gaps', 0) if before['start_frame'] != after['start_frame'] else 0)
+        if gaps:
+            before['gaps'] = gaps
+    taken = {id(after) for _, after in matches}
+    annotations.extend(a for a in following if id(a) not in taken)
+    return len(matches)
+
+def merge_results(results):
+    """
+    Combine job results (see shard_result) into one Comparator: counters are
+    summed, annotations concatenated per video in frame order with
+    interactions cut at shard boundaries joined. Annotations carry their video.
+    Returns (comparator, joined interactions).
+    """
+    comparator = Comparator()
+    joined = 0
+    ordered = sorted(results, key=lambda r: (r['video'], r['start']))
+    merged = {}  # (video, method) -> annotations
+    last_frame = {}  # video -> last frame of the previous shard
+    for result in ordered:
+        video = result['video']
+        for method, data in result['stats'].items():
+            for key in SUMMED_STATS:
+                comparator.stats[method][key] += data.get(key, 0)
+            following = [dict(ann, video=video) for ann in data['annotations']]
+            annotations = merged.setdefault((video, method), [])
+            if video in last_frame and result['start'] == last_frame[video]:
+                joined += stitch(annotations, following, last_frame[video])
+            else:
+                annotations.extend(following)
+        last_frame[video] = result['start'] + result['frames']
+    for (video, method), annotations in merged.items():
+        comparator.stats[method]['annotations'].extend(annotations)
+
+    frames = sum(r['frames'] for r in ordered)
+    fps = ordered[0]['fps'] if ordered else 0.0
+    comparator.set_processing_stats(None, None, sum(r['duration_sec'] for r in ordered), fps, frames)
+    if ordered and all(r['inference_calls'] is not None for r in ordered):
+        comparator.set_inference_stats(frames, sum(r['inference_calls'] for r in ordered))
+    return comparator, joined
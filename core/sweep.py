@@ -0,0 +1,103 @@
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from core.interaction_filter import InteractionFilter, DEFAULT_TRIGGER_FRAMES
+from core.comparator import Comparator
+from core.evaluation import match_intervals, triggered_intervals, pareto_front
+from detectors.detection_cache import CachedDetections
+
+# Sweepable parameters: InteractionFilter keyword arguments plus dwell time in seconds
+PARAM_NAMES = ['ratio_threshold', 'depth_diff_threshold', 'conf_threshold', 'miss_tolerance', 'dwell_sec']
+
+def grid_search(space):
+    """
+    Cartesian product of a parameter space.
+    space: dict of param name -> list of values
+    """
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+def random_search(space, n, seed=0):
+    """
+    Sample `n` configurations uniformly between the min and max listed for each parameter.
+    Parameters with a single value stay fixed.
+    """
+    rng = random.Random(seed)
+    return [
+        {name: rng.uniform(min(values), max(values)) if len(values) > 1 else values[0]
+         for name, values in space.items()}
+        for _ in range(n)
+    ]
+
+def replay(cached, method, params=None):
+    """
+    Run InteractionFilter over cached detections with the given parameters.
+    Returns the Comparator holding this run's stats and annotations.
+    """
+    params = dict(params or {})
+    dwell_sec = params.pop('dwell_sec', None)
+    trigger_frames = DEFAULT_TRIGGER_FRAMES if dwell_sec is None else max(1, int(round(dwell_sec * cached.fps)))
+
+    interaction_filter = InteractionFilter(method=method, trigger_frames=trigger_frames, **params)
+    comparator = Comparator()
+    results = {}
+    for i in range(len(cached)):
+        results = interaction_filter.process(None, persons=cached.persons(i))
+        comparator.record_frame(method, results)
+    comparator.close_interactions(method, results.get('active_interactions', {}), len(cached))
+    return comparator
+
+def summarize(comparator, method, params, labels):
+    """One sweep table row: parameters, VLM cost and accuracy against `labels`."""
+    data = comparator.stats[method]
+    match = match_intervals(triggered_intervals(data['annotations']), labels)
+    row = dict(params)
+    row.update({
+        'triggers': data['triggers'],
+        'events': len(data['annotations']),
+        'interaction_frames': data['interactions'],
+        'recall': match['recall'],
+        'precision': match['precision'],
+        'cost_reduction': comparator.cost_reduction(method),
+    })
+    return row
+
+# Per-process state: each pool worker memory-maps the cache once
+_worker_cached = None
+
+def _init_worker(cache_path):
+    global _worker_cached
+    _worker_cached = CachedDetections(cache_path)
+
+def _run_config(task):
+    method, params, labels = task
+    return summarize(replay(_worker_cached, method, params), method, params, labels)
+
+def baseline_labels(cached, method):
+    """
+    Pseudo ground truth when no labelled file is given: every interaction found
+    with the current config thresholds.
+    """
+    comparator = replay(cached, method)
+    return [(ann['start_frame'], ann['end_frame']) for ann in comparator.stats[method]['annotations']]
+
+def run_sweep(cached, method, configs, labels=None, workers=None):
+    """
+    Evaluate every configuration in parallel over a process pool.
+    Returns (rows, pareto_rows).
+    """
+    if method == 'mde' and not cached.has_depth:
+        raise ValueError("Cached detections have no per-person depth; record them with --method mde first.")
+    if labels is None:
+        labels = baseline_labels(cached, method)
+
+    workers = workers or os.cpu_count() or 1
+    tasks = [(method, params, labels) for params in configs]
+    if workers == 1:
+        _init_worker(cached.path)
+        rows = [_run_config(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cached.path,)) as pool:
+            rows = list(pool.map(_run_config, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    return rows, pareto_front(rows)
@@ -0,0 +1,269 @@
+import json
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+import config
+
+class SQLiteBroker:
+    """
+    Work queue in a SQLite file, shared by every process on one machine (or a
+    network filesystem that supports locking).
+
+    A job is claimed under a lease; the worker extends the lease with
+    heartbeats while it runs. A job whose lease expires (crashed or hung
+    worker) goes back to the queue, as does a failed one, until it has been
+    attempted `max_attempts` times. Results are written once per job: a late
+    duplicate from a worker that lost its lease is ignored.
+    """
+    def __init__(self, path, max_attempts=None):
+        self.path = path
+        self.max_attempts = max_attempts or config.JOB_MAX_ATTEMPTS
+        self._local = threading.local()
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, payload TEXT, status TEXT, "
+                       "attempts INTEGER DEFAULT 0, worker TEXT, lease_until REAL, error TEXT)")
+            db.execute("CREATE TABLE IF NOT EXISTS results (job_id TEXT PRIMARY KEY, worker TEXT, result TEXT, finished REAL)")
+
+    def _connect(self):
+        # One connection per thread (heartbeats run on their own thread)
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def put(self, job_id, payload):
+        """Queue a job; putting an existing job id again is a no-op."""
+        self._connect().execute("INSERT OR IGNORE INTO jobs (id, payload, status) VALUES (?, ?, 'pending')",
+                                (job_id, json.dumps(payload)))
+
+    def claim(self, worker_id, lease_sec=None):
+        """Lease the next runnable job: returns (job_id, payload), or None if nothing is runnable now."""
+        lease_sec = lease_sec or config.JOB_LEASE_SEC
+        db = self._connect()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            # Expired leases of jobs out of attempts are given up on
+            db.execute("UPDATE jobs SET status = 'failed', error = 'lease expired' "
+                       "WHERE status = 'running' AND lease_until < ? AND attempts >= ?", (now, self.max_attempts))
+            row = db.execute("SELECT id, payload FROM jobs WHERE status = 'pending' "
+                             "OR (status = 'running' AND lease_until < ?) ORDER BY rowid LIMIT 1", (now,)).fetchone()
+            if row is not None:
+                db.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, lease_until = ? "
+                           "WHERE id = ?", (worker_id, now + lease_sec, row[0]))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return (row[0], json.loads(row[1])) if row is not None else None
+
+    def heartbeat(self, job_id, worker_id, lease_sec=None):
+        """Extend the lease; False if the worker no longer holds the job."""
+        lease_sec = lease_sec or config.JOB_LEASE_SEC
+        cursor = self._connect().execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                                         (time.time() + lease_sec, job_id, worker_id))
+        return cursor.rowcount > 0
+
+    def complete(self, job_id, worker_id, result):
+        """Store the job's result (first write wins) and mark it done."""
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("INSERT OR IGNORE INTO results (job_id, worker, result, finished) VALUES (?, ?, ?, ?)",
+                       (job_id, worker_id, json.dumps(result), time.time()))
+            db.execute("UPDATE jobs SET status = 'done', error = NULL WHERE id = ?", (job_id,))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def fail(self, job_id, worker_id, error):
+        """Give the job back for a retry, or mark it failed once out of attempts."""
+        self._connect().execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, error = ?, lease_until = NULL "
+            "WHERE id = ? AND worker = ? AND status = 'running'", (self.max_attempts, error, job_id, worker_id))
+
+    def results(self):
+        """{job_id: result} of every finished job."""
+        rows = self._connect().execute("SELECT job_id, result FROM results").fetchall()
+        return {job_id: json.loads(result) for job_id, result in rows}
+
+    def errors(self):
+        """{job_id: last error} of failed jobs."""
+        rows = self._connect().execute("SELECT id, error FROM jobs WHERE status = 'failed'").fetchall()
+        return dict(rows)
+
+    def counts(self):
+        """Jobs per status: pending, running, done, failed."""
+        counts = {'pending': 0, 'running': 0, 'done': 0, 'failed': 0}
+        counts.update(self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return counts
+
+# Broker calls a TCPBroker may forward
+BROKER_OPS = ('put', 'claim', 'heartbeat', 'complete', 'fail', 'results', 'errors', 'counts')
+
+class BrokerServer(socketserver.ThreadingTCPServer):
+    """
+    Serves a broker to workers on other machines: one JSON request per line,
+    {"op": ..., "args": [...]}, answered by {"result": ...} or {"error": ...}.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, broker, address):
+        self.broker = broker
+        super().__init__(address, _BrokerHandler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"tcp://{host}:{port}"
+
+    def start(self):
+        """Serve on a background thread."""
+        thread = threading.Thread(target=self.serve_forever, name="broker-server", daemon=True)
+        thread.start()
+        return thread
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request['op'] not in BROKER_OPS:
+                    raise ValueError(f"Unknown broker op {request['op']!r}")
+                response = {'result': getattr(self.server.broker, request['op'])(*request.get('args', []))}
+            except Exception as e:
+                response = {'error': f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(response) + '\n').encode())
+            self.wfile.flush()
+
+class TCPBroker:
+    """Client of a BrokerServer with the SQLiteBroker interface."""
+    def __init__(self, host, port, timeout=30.0):
+        self.address = (host, port)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _call(self, op, *args):
+        # One connection per thread, reopened once if the server dropped it
+        for attempt in range(2):
+            conn = getattr(self._local, 'conn', None)
+            try:
+                if conn is None:
+                    sock = socket.create_connection(self.address, timeout=self.timeout)
+                    conn = self._local.conn = (sock, sock.makefile('rb'))
+                sock, reader = conn
+                sock.sendall((json.dumps({'op': op, 'args': list(args)}) + '\n').encode())
+                line = reader.readline()
+                if not line:
+                    raise ConnectionError("Broker closed the connection")
+                break
+            except OSError:
+                self._local.conn = None
+                if attempt:
+                    raise
+        response = json.loads(line)
+        if 'error' in response:
+            raise RuntimeError(f"Broker {op} failed: {response['error']}")
+        return response['result']
+
+    def put(self, job_id, payload):
+        return self._call('put', job_id, payload)
+
+    def claim(self, worker_id, lease_sec=None):
+        claimed = self._call('claim', worker_id, lease_sec)
+        return tuple(claimed) if claimed is not None else None
+
+    def heartbeat(self, job_id, worker_id, lease_sec=None):
+        return self._call('heartbeat', job_id, worker_id, lease_sec)
+
+    def complete(self, job_id, worker_id, result):
+        return self._call('complete', job_id, worker_id, result)
+
+    def fail(self, job_id, worker_id, error):
+        return self._call('fail', job_id, worker_id, error)
+
+    def results(self):
+        return self._call('results')
+
+    def errors(self):
+        return self._call('errors')
+
+    def counts(self):
+        return self._call('counts')
+
+def open_broker(url, max_attempts=None):
+    """Broker for `tcp://host:port` (a BrokerServer) or a SQLite file path."""
+    if url.startswith('tcp://'):
+        host, port = url[len('tcp://'):].rsplit(':', 1)
+        return TCPBroker(host, int(port))
+    return SQLiteBroker(url, max_attempts=max_attempts)
+
+class Worker:
+    """
+    Pulls jobs from a broker and runs `handler(payload) -> result` (JSON-able)
+    on each, heartbeating while it runs. An exception fails the job, which the
+    broker then retries, on this worker or another one.
+    """
+    def __init__(self, broker, handler, worker_id=None, lease_sec=None, heartbeat_sec=None, poll_sec=None):
+        self.broker = broker
+        self.handler = handler
+        self.worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.lease_sec = lease_sec or config.JOB_LEASE_SEC
+        self.heartbeat_sec = heartbeat_sec or config.JOB_HEARTBEAT_SEC
+        self.poll_sec = poll_sec or config.JOB_POLL_SEC
+        self.completed = 0
+        self.failed = 0
+
+    def _heartbeat(self, job_id, stop):
+        while not stop.wait(self.heartbeat_sec):
+            try:
+                if not self.broker.heartbeat(job_id, self.worker_id, self.lease_sec):
+                    return  # Lease lost: the job is someone else's now, our result is a harmless duplicate
+            except Exception:
+                pass  # Broker briefly unreachable; the lease covers a few missed beats
+
+    def run_one(self):
+        """Claim and run one job; False if nothing was runnable."""
+        claimed = self.broker.claim(self.worker_id, self.lease_sec)
+        if claimed is None:
+            return False
+        job_id, payload = claimed
+        stop = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(job_id, stop), name=f"heartbeat-{job_id}", daemon=True)
+        beat.start()
+        try:
+            result = self.handler(payload)
+        except Exception:
+            stop.set()
+            self.broker.fail(job_id, self.worker_id, traceback.format_exc(limit=3))
+            self.failed += 1
+        else:
+            stop.set()
+            self.broker.complete(job_id, self.worker_id, result)
+            self.completed += 1
+        beat.join()
+        return True
+
+    def run(self, max_jobs=None, wait=False):
+        """
+        Work until the queue is drained (every job done or failed), or forever
+        with `wait`, or until `max_jobs` jobs were run.
+        """
+        runs = 0
+        while max_jobs is None or runs < max_jobs:
+            if self.run_one():
+                runs += 1
+                continue
+            counts = self.broker.counts()
+            if not wait and not counts['pending'] and not counts['running']:
+                break
+            time.sleep(self.poll_sec)  # Others' leases may still expire and hand their jobs to us
+        return runs
@@ -0,0 +1,104 @@
+import numpy as np
+import networkx as nx
+import config
+from utils.geometry import box_iou, overlapping_pairs
+
+class CascadePoseDetector:
+    """
+    Two-stage detection. A cheap person detector tracks everyone on every frame;
+    the pose model only runs on crops around groups of overlapping boxes, since
+    only overlapping pairs reach the head-size / depth z-plane test. Each pose
+    found in a crop is attached to the tracked person it overlaps most; everyone
+    else keeps keypoints None. When the crops together cover most of the frame,
+    the pose model runs once on the full frame instead.
+    pose_detector may be None when no method needs keypoints (mde only).
+    """
+    def __init__(self, person_detector, pose_detector, margin=None, min_iou=None, full_frame_fraction=None):
+        self.person_detector = person_detector
+        self.pose_detector = pose_detector
+        self.margin = config.CASCADE_CROP_MARGIN if margin is None else margin
+        self.min_iou = config.CASCADE_MIN_IOU if min_iou is None else min_iou
+        self.full_frame_fraction = config.CASCADE_FULL_FRAME_FRACTION if full_frame_fraction is None else full_frame_fraction
+
+        self.frames = 0
+        self.pose_frames = 0  # Frames on which the pose model ran
+        self.pose_calls = 0  # Pose model invocations (one per crop)
+
+    @property
+    def inference_calls(self):
+        return self.pose_frames
+
+    def state_dict(self):
+        return {'person_detector': self.person_detector.state_dict(), 'frames': self.frames,
+                'pose_frames': self.pose_frames, 'pose_calls': self.pose_calls}
+
+    def load_state_dict(self, state):
+        self.person_detector.load_state_dict(state['person_detector'])
+        self.frames = state['frames']
+        self.pose_frames = state['pose_frames']
+        self.pose_calls = state['pose_calls']
+
+    def warmup(self, frame_shapes, passes=None):
+        """
+        Warm the person detector on the frame sizes and the pose model on the
+        inputs crops can map to: the shape buckets when bucketing, else the frame sizes.
+        """
+        seconds = self.person_detector.warmup(frame_shapes, passes)
+        if self.pose_detector is not None:
+            crop_shapes = config.SHAPE_BUCKETS if config.SHAPE_BUCKETING and not config.INFERENCE_SHAPE else frame_shapes
+            seconds += self.pose_detector.warmup(crop_shapes, passes)
+        return seconds
+
+    def regions(self, boxes, pairs, frame_shape):
+        """Crops [x1, y1, x2, y2] around each group of overlapping boxes (ints, clipped to the frame)."""
+        h, w = frame_shape[:2]
+        graph = nx.Graph(pairs)
+        regions = []
+        for group in nx.connected_components(graph):
+            b = boxes[sorted(group)]
+            regions.append((max(0, int(b[:, 0].min() - self.margin)), max(0, int(b[:, 1].min() - self.margin)),
+                            min(w, int(np.ceil(b[:, 2].max() + self.margin))), min(h, int(np.ceil(b[:, 3].max() + self.margin)))))
+        area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in regions)
+        if area > self.full_frame_fraction * w * h:
+            return [(0, 0, w, h)]
+        return [r for r in regions if r[2] > r[0] and r[3] > r[1]]
+
+    def detect(self, frame, shared=None):
+        self.frames += 1
+        persons = self.person_detector.detect(frame, shared=shared)
+        ids = list(persons)
+        if self.pose_detector is None or len(ids) < 2:
+            return persons
+        boxes = np.array([persons[pid]['bbox'][:4] for pid in ids], dtype=np.float32)
+        pairs = overlapping_pairs(boxes)
+        if not pairs:
+            return persons
+
+        self.pose_frames += 1
+        pose_boxes, pose_keypoints = [], []
+        for x1, y1, x2, y2 in self.regions(boxes, pairs, frame.shape):
+            self.pose_calls += 1
+            bboxes, keypoints = self.pose_detector.estimate(frame[y1:y2, x1:x2])
+            pose_boxes.append(np.asarray(bboxes, dtype=np.float32) + (x1, y1, x1, y1))
+            keypoints = np.array(keypoints, dtype=np.float32)
+            keypoints[..., 0] += x1
+            keypoints[..., 1] += y1
+            pose_keypoints.append(keypoints)
+        if not pose_boxes or not sum(len(b) for b in pose_boxes):
+            return persons
+        pose_boxes = np.concatenate(pose_boxes)
+        pose_keypoints = np.concatenate(pose_keypoints)
+
+        # Greedy one-to-one matching of overlapping people to poses by IoU
+        involved = sorted(set(i for pair in pairs for i in pair))
+        iou = box_iou(boxes[involved], pose_boxes)
+        persons = dict(persons)
+        while iou.size:
+            i, j = np.unravel_index(np.argmax(iou), iou.shape)
+            if iou[i, j] < self.min_iou:
+                break
+            pid = ids[involved[i]]
+            persons[pid] = dict(persons[pid], keypoints=pose_keypoints[j], conf=float(pose_keypoints[j, :, 2].mean()))
+            iou[i, :] = -1
+            iou[:, j] = -1
+        return persons
@@ -0,0 +1,49 @@
+from detectors.detection_cache import CachedPoseDetector
+from detectors.keyframe_tracker import KeyframePoseDetector
+from detectors.motion_gate import GatedPoseDetector
+from detectors.roi import RoiPoseDetector
+
+WRAPPERS = (RoiPoseDetector, KeyframePoseDetector, GatedPoseDetector)
+
+def build_pose_detector(base_detector, polygons=None, roi_auto=False, keyframe_interval=1, gate=None):
+    """
+    Wrap a base pose detector in the optional inference savers, innermost
+    first: ROI crop, keyframe tracking, motion gate (a MotionGate or None).
+    A CachedPoseDetector is returned as is: a cache entry already holds the
+    wrapped chain's output for every frame, and a gate skipping frames would
+    stall its replay index.
+    """
+    if isinstance(base_detector, CachedPoseDetector):
+        return base_detector
+    detector = base_detector
+    if polygons or roi_auto:
+        detector = RoiPoseDetector(detector, polygons=polygons, auto=roi_auto and not polygons)
+    if keyframe_interval > 1:
+        detector = KeyframePoseDetector(detector, interval=keyframe_interval)
+    if gate is not None:
+        detector = GatedPoseDetector(detector, gate)
+    return detector
+
+def wrapper_state(detector):
+    """State of every wrapper around the base detector, outermost first, for checkpoints."""
+    states = []
+    while isinstance(detector, WRAPPERS):
+        states.append((type(detector).__name__, detector.state_dict()))
+        detector = detector.detector
+    return states
+
+def load_wrapper_state(detector, states):
+    """
+    Restore wrapper_state(). Returns False, restoring nothing, when the chain
+    was built differently; the wrappers then start fresh, which runs full
+    detection on the first frame.
+    """
+    chain = []
+    while isinstance(detector, WRAPPERS):
+        chain.append(detector)
+        detector = detector.detector
+    if [type(w).__name__ for w in chain] != [name for name, _ in states]:
+        return False
+    for wrapper, (_, state) in zip(chain, states):
+        wrapper.load_state_dict(state)
+    return True
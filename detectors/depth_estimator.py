@@ -3,9 +3,13 @@ import torch
 import torch.nn.functional as F
 import numpy as np
 import os
+import time
 import config
+from utils.geometry import box_depths
+from utils import thread_budget
 from depth_anything_v2.dpt import DepthAnythingV2
 from utils.cli import print_info
+from utils.frame_buffer import SharedInput, bucket_shape
 
 class DepthEstimator:
     def __init__(self):
@@ -39,27 +43,102 @@ class DepthEstimator:
         # but noting it might be a logical redundancy.
         self.model = self.model.to(config.DEVICE).eval() 
 
-    def get_depth_map(self, frame):
+        # Preprocessing state reused across frames (ImageNet mean/std scaled to 0-255)
+        self._mean = torch.tensor([0.485, 0.456, 0.406], device=config.DEVICE).view(1, 3, 1, 1) * 255
+        self._std = torch.tensor([0.229, 0.224, 0.225], device=config.DEVICE).view(1, 3, 1, 1) * 255
+        self._input_shapes = {}
+        self._rgb_buffers = {}
+        self._resize_buffers = {}
+        self._shared = SharedInput()
+
+    def input_shape(self, height, width):
+        """
+        Model input (h, w) for a frame size. Uses config.INFERENCE_SHAPE when set, or the
+        frame's shape bucket with bucketing on (both shared with the pose model); otherwise
+        the infer_image rule: scale the short side to DEPTH_INPUT_SIZE keeping the aspect
+        ratio, rounded to a multiple of the ViT patch (14).
+        """
+        if config.INFERENCE_SHAPE:
+            return tuple(config.INFERENCE_SHAPE)
+        if config.SHAPE_BUCKETING:
+            return bucket_shape(height, width, config.SHAPE_BUCKETS)
+        key = (height, width)
+        if key not in self._input_shapes:
+            size, m = config.DEPTH_INPUT_SIZE, 14
+            scale = max(size / height, size / width)
+            def constrain(x):
+                y = int(np.round(x / m) * m)
+                return y if y >= size else int(np.ceil(x / m) * m)
+            self._input_shapes[key] = (constrain(scale * height), constrain(scale * width))
+        return self._input_shapes[key]
+
+    def get_depth_map(self, frame, shared=None):
         """
         Returns metric depth map (numpy array).
+        shared: optional SharedInput for this frame, so a letterbox already made for the
+        pose model (same input shape) is reused instead of resizing again. That only
+        happens with INFERENCE_SHAPE or shape bucketing; otherwise the frame is
+        resized like infer_image does (stretched to the input shape, INTER_CUBIC).
+        """
+        h, w = frame.shape[:2]
+        shape = self.input_shape(h, w)
+        box = None
+        if config.INFERENCE_SHAPE or config.SHAPE_BUCKETING:
+            if shared is None:
+                shared = self._shared
+                shared.set_frame(frame)
+            image, box = shared.letterboxed(shape)
+        else:
+            image = self._resize_buffers.get(shape)
+            if image is None:
+                image = self._resize_buffers[shape] = np.empty(shape + (3,), dtype=np.uint8)
+            cv2.resize(frame, (shape[1], shape[0]), dst=image, interpolation=cv2.INTER_CUBIC)
+
+        # Same preprocessing as infer_image, but BGR->RGB happens on the small
+        # resized image into a reused buffer, and normalisation runs in place
+        # on the model device instead of on full-resolution float64 copies.
+        rgb = self._rgb_buffers.get(image.shape)
+        if rgb is None:
+            rgb = self._rgb_buffers[image.shape] = np.empty(image.shape, dtype=np.uint8)
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=rgb)
+
+        with torch.no_grad():
+            x = torch.from_numpy(rgb).to(config.DEVICE).permute(2, 0, 1).unsqueeze(0).float()
+            x.sub_(self._mean).div_(self._std)
+            depth = self.model.forward(x)
+            if box is not None:
+                depth = box.content(depth)
+            depth = F.interpolate(depth[:, None], (h, w), mode="bilinear", align_corners=True)[0, 0]
+        return depth.cpu().numpy()
+
+    def warmup(self, frame_shapes, passes=None):
+        """
+        Forward passes on blank inputs for each (h, w) frame size, so the input
+        shapes a stream will use are allocated and tuned before its first frame.
+        Returns seconds spent.
         """
-        # infer_image returns depth
-        depth = self.model.infer_image(frame) 
-        return depth
+        passes = config.WARMUP_PASSES if passes is None else passes
+        start = time.perf_counter()
+        shapes = dict.fromkeys(self.input_shape(h, w) for h, w in frame_shapes)
+        with torch.no_grad():
+            for shape in shapes:
+                if shape + (3,) not in self._rgb_buffers:
+                    self._rgb_buffers[shape + (3,)] = np.empty(shape + (3,), dtype=np.uint8)
+                x = torch.zeros((1, 3) + shape, device=config.DEVICE)
+                for _ in range(passes):
+                    self.model.forward(x)
+        return time.perf_counter() - start
 
     def get_person_depth(self, depth_map, bbox):
         """
-        Calculate median depth for a person's bounding box.
+        Calculate the depth statistic (config.DEPTH_STAT, median by default) for a person's bounding box.
         bbox: [x1, y1, x2, y2]
         """
-        x1, y1, x2, y2 = map(int, bbox)
-        # Clip to image bounds
-        h, w = depth_map.shape
-        x1 = max(0, x1); y1 = max(0, y1)
-        x2 = min(w, x2); y2 = min(h, y2)
-        
-        if x1 >= x2 or y1 >= y2:
-            return 0.0
-            
-        person_depth_roi = depth_map[y1:y2, x1:x2]
-        return np.median(person_depth_roi)
+        return float(self.get_persons_depth(depth_map, [bbox])[0])
+
+    def get_persons_depth(self, depth_map, bboxes):
+        """
+        Depth statistic for several bounding boxes in one call.
+        bboxes: sequence of [x1, y1, x2, y2]; returns an array with one depth per box.
+        """
+        return box_depths(depth_map, bboxes, stat=config.DEPTH_STAT, executor=thread_budget.executor())
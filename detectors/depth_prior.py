@@ -0,0 +1,83 @@
+import numpy as np
+import config
+
+def build_prior(depth_maps):
+    """Per-pixel median of depth maps of the empty scene (moving objects drop out)."""
+    return np.median(np.stack(list(depth_maps)), axis=0).astype(np.float32)
+
+def save_prior(path, prior):
+    np.save(path, np.asarray(prior, dtype=np.float32))
+
+class DepthPrior:
+    """
+    Background depth of a fixed camera, calibrated once (see calibrate.py) and
+    memory-mapped from a .npy file. A person's depth is the prior at the
+    bottom-centre of their box, where their feet touch the ground, so no
+    per-frame depth inference is needed.
+
+    A foot-point lookup is unreliable when the box is cut off by the frame
+    bottom, when the foot point is covered by another person standing closer,
+    or when the prior jumps around the foot point (a depth edge: stairs,
+    furniture). Those persons are reported for a live MDE fallback.
+    """
+    def __init__(self, path, window=None, max_variation=None):
+        self.path = path
+        self.depth = np.load(path, mmap_mode='r')
+        self.window = config.DEPTH_PRIOR_WINDOW if window is None else window
+        self.max_variation = config.DEPTH_PRIOR_MAX_VARIATION if max_variation is None else max_variation
+        self._background = None
+        self.lookups = 0
+        self.fallbacks = 0
+
+    def foot_points(self, bboxes, frame_shape):
+        """Bottom-centre of each box in prior pixels, and whether it lies inside the frame."""
+        boxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+        h, w = frame_shape[:2]
+        inside = boxes[:, 3] < h - 1  # Boxes touching the frame bottom have their feet cut off
+        ph, pw = self.depth.shape
+        xs = np.clip(((boxes[:, 0] + boxes[:, 2]) / 2 * pw / w).astype(np.int64), 0, pw - 1)
+        ys = np.clip((boxes[:, 3] * ph / h).astype(np.int64), 0, ph - 1)
+        return xs, ys, inside
+
+    def lookup(self, bboxes, frame_shape):
+        """
+        Prior depth at each box's foot point.
+        Returns (depths, reliable): reliable is False where a live estimate is needed.
+        """
+        boxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+        xs, ys, reliable = self.foot_points(boxes, frame_shape)
+        depths = np.asarray(self.depth[ys, xs], dtype=np.float64)
+
+        # Occluded: the foot point is inside another box whose own bottom is lower (closer to the camera)
+        fx = (boxes[:, 0] + boxes[:, 2]) / 2
+        fy = boxes[:, 3]
+        covered = ((fx[:, None] >= boxes[None, :, 0]) & (fx[:, None] <= boxes[None, :, 2]) &
+                   (fy[:, None] >= boxes[None, :, 1]) & (fy[:, None] < boxes[None, :, 3]))
+        np.fill_diagonal(covered, False)
+        reliable &= ~covered.any(axis=1)
+
+        # Ambiguous: the prior varies strongly around the foot point
+        r = self.window
+        ph, pw = self.depth.shape
+        for i in np.flatnonzero(reliable):
+            patch = self.depth[max(0, ys[i] - r):ys[i] + r + 1, max(0, xs[i] - r):xs[i] + r + 1]
+            spread = float(patch.max() - patch.min())
+            if spread > self.max_variation * max(abs(depths[i]), 1e-6):
+                reliable[i] = False
+
+        self.lookups += len(boxes)
+        self.fallbacks += int((~reliable).sum())
+        return depths, reliable
+
+    def align(self, depth_map):
+        """
+        Scale that maps a live depth map onto the prior. Relative depth models
+        normalise every image differently, so fallback depths are rescaled by
+        the ratio of the two maps' medians (on a coarse grid).
+        """
+        if self._background is None:
+            self._background = float(np.median(self.depth[::8, ::8]))
+        step_y = max(1, depth_map.shape[0] * 8 // self.depth.shape[0])
+        step_x = max(1, depth_map.shape[1] * 8 // self.depth.shape[1])
+        live = float(np.median(depth_map[::step_y, ::step_x]))
+        return self._background / live if live else 1.0
@@ -0,0 +1,316 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import config
+
+CACHE_VERSION = 2  # 2: detection settings are part of the key
+NUM_KEYPOINTS = 17
+STALE_TMP_SEC = 24 * 3600
+
+# Column name -> (dtype, per-row shape). Every column is a flat memory-mapped
+# file with one row per detected person; `offsets` maps frame index -> rows.
+COLUMNS = {
+    'ids': (np.int32, ()),
+    'bboxes': (np.float32, (4,)),
+    'keypoints': (np.float32, (NUM_KEYPOINTS, 3)),
+    'conf': (np.float32, ()),
+    'depth': (np.float32, ()),
+}
+
+def file_digest(path, chunk_size=1 << 20):
+    """
+    SHA-256 of a file's content, streamed in chunks.
+    Falls back to hashing the name for model names that are not local files yet
+    (e.g. Ultralytics weights that will be auto-downloaded).
+    """
+    h = hashlib.sha256()
+    if not os.path.exists(path):
+        h.update(os.path.basename(path).encode())
+        return h.hexdigest()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def detection_config(imgsz=None, decode_width=None, polygons=None, roi_auto=False, keyframe_interval=1,
+                     motion_gate=False, motion_threshold=None, motion_refresh=None, shape_buckets=False):
+    """
+    Settings that shape recorded detections besides the video and the weights:
+    inference size, decode size (the coordinate space) and the wrapper chain
+    (ROI, keyframe tracking, motion gate), which is recorded with them.
+    JSON-able, with config defaults resolved; part of the cache key.
+    """
+    return {
+        'imgsz': config.POSE_IMGSZ if imgsz is None else imgsz,
+        'inference_shape': config.INFERENCE_SHAPE,
+        'shape_buckets': config.SHAPE_BUCKETS if shape_buckets else None,
+        'decode_width': decode_width,
+        'roi': list(polygons or []),
+        'roi_auto': bool(roi_auto and not polygons),
+        'keyframe_interval': max(1, keyframe_interval),
+        'motion_gate': {
+            'threshold': config.MOTION_THRESHOLD if motion_threshold is None else motion_threshold,
+            'refresh': config.MOTION_REFRESH_FRAMES if motion_refresh is None else motion_refresh,
+        } if motion_gate else None,
+    }
+
+class CachedDetections:
+    """
+    Read-only, memory-mapped view of one cached video.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.fps = self.meta.get('fps', 30.0)
+        self.num_frames = self.meta['num_frames']
+        self.offsets = np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r')
+        rows = int(self.offsets[-1])
+        self.columns = {}
+        for name, (dtype, shape) in COLUMNS.items():
+            col_path = os.path.join(path, f"{name}.bin")
+            if rows == 0:
+                self.columns[name] = np.zeros((0,) + shape, dtype=dtype)
+            else:
+                self.columns[name] = np.memmap(col_path, dtype=dtype, mode='r', shape=(rows,) + shape)
+        self.has_depth = self.meta.get('has_depth', False)
+
+    def __len__(self):
+        return self.num_frames
+
+    def persons(self, index):
+        """
+        Detections for frame `index` (0-based) in PoseDetector.detect format,
+        with an extra 'depth' entry when a per-person depth was cached.
+        """
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        ids = self.columns['ids'][start:end]
+        bboxes = self.columns['bboxes'][start:end]
+        keypoints = self.columns['keypoints'][start:end]
+        conf = self.columns['conf'][start:end]
+        depth = self.columns['depth'][start:end]
+
+        persons = {}
+        for i in range(end - start):
+            person = {
+                'bbox': np.asarray(bboxes[i]),
+                'keypoints': np.asarray(keypoints[i]),
+                'conf': float(conf[i])
+            }
+            if self.has_depth and not np.isnan(depth[i]):
+                person['depth'] = float(depth[i])
+            persons[int(ids[i])] = person
+        return persons
+
+class DetectionCacheWriter:
+    """
+    Streams per-frame detections to column files so long videos never sit in memory.
+    The entry only becomes visible to lookups once `close()` renames it into place.
+    """
+    def __init__(self, cache, key, meta):
+        self.cache = cache
+        self.final_path = os.path.join(cache.root, key)
+        self.tmp_path = f"{self.final_path}.tmp-{os.getpid()}"
+        os.makedirs(self.tmp_path, exist_ok=True)
+        self.meta = meta
+        self.files = {name: open(os.path.join(self.tmp_path, f"{name}.bin"), 'wb') for name in COLUMNS}
+        self.offsets = [0]
+        self.has_depth = False
+
+    def append(self, persons, depths=None):
+        """
+        Append the next frame's detections.
+        depths: optional dict of person_id -> depth value (e.g. MDE z-metrics).
+        """
+        n = len(persons)
+        if n:
+            ids = np.fromiter(persons.keys(), dtype=np.int32, count=n)
+            data = list(persons.values())
+            self.files['ids'].write(ids.tobytes())
+            self.files['bboxes'].write(np.asarray([p['bbox'] for p in data], dtype=np.float32).tobytes())
+            self.files['keypoints'].write(np.asarray([p['keypoints'] for p in data], dtype=np.float32).tobytes())
+            self.files['conf'].write(np.asarray([p['conf'] for p in data], dtype=np.float32).tobytes())
+            depth = np.full(n, np.nan, dtype=np.float32)
+            if depths:
+                for i, pid in enumerate(persons):
+                    if pid in depths and depths[pid]:
+                        depth[i] = depths[pid]
+                        self.has_depth = True
+            self.files['depth'].write(depth.tobytes())
+        self.offsets.append(self.offsets[-1] + n)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        np.save(os.path.join(self.tmp_path, 'offsets.npy'), np.asarray(self.offsets, dtype=np.int64))
+        self.meta['num_frames'] = len(self.offsets) - 1
+        self.meta['has_depth'] = self.has_depth
+        self.meta['last_access'] = time.time()
+        with open(os.path.join(self.tmp_path, 'meta.json'), 'w') as f:
+            json.dump(self.meta, f)
+
+        if os.path.exists(self.final_path):
+            shutil.rmtree(self.final_path)
+        os.replace(self.tmp_path, self.final_path)
+        self.cache.evict()
+
+    def abort(self):
+        """Drop a partial entry (e.g. the run was interrupted)."""
+        for f in self.files.values():
+            f.close()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+class DetectionCache:
+    """
+    Content-addressed on-disk cache of PoseDetector results.
+    Entries are keyed by the video content hash, the pose model weights hash
+    and the detection settings (see detection_config), so retraining, swapping
+    weights or changing detection flags never serves stale detections.
+    """
+    def __init__(self, root, max_bytes=None):
+        self.root = root
+        self.max_bytes = config.DETECTION_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, video_digest, model_digest, settings=None):
+        settings = json.dumps(detection_config() if settings is None else settings, sort_keys=True)
+        return hashlib.sha256(f"v{CACHE_VERSION}:{video_digest}:{model_digest}:{settings}".encode()).hexdigest()[:32]
+
+    def lookup(self, video_path, model_path=None, depth_model_path=None, video_digest=None, settings=None):
+        """
+        Return CachedDetections for this video/model pair, or None on a miss.
+        Cached depth is ignored if it was produced by different depth weights.
+        video_digest: file_digest(video_path) if the caller already has it, so a
+        run hashes a long video once for both lookup() and writer().
+        settings: detection_config() of the run (default: config defaults);
+        'any' takes the most recently used entry whatever it was recorded with.
+        """
+        model_path = model_path or config.YOLO_MODEL_NAME
+        model_digest = file_digest(model_path)
+        self.invalidate(model_path, model_digest)
+
+        video_digest = video_digest or file_digest(video_path)
+        if settings == 'any':
+            matches = [(meta.get('last_access', 0), p) for p, meta in self.entries()
+                       if meta['video_digest'] == video_digest and meta['model_digest'] == model_digest]
+            if not matches:
+                return None
+            path = max(matches)[1]
+        else:
+            path = os.path.join(self.root, self.key(video_digest, model_digest, settings))
+            if not os.path.exists(os.path.join(path, 'meta.json')):
+                return None
+
+        self._touch(path)
+        cached = CachedDetections(path)
+        if cached.has_depth and depth_model_path is not None:
+            if cached.meta.get('depth_model_digest') != file_digest(depth_model_path):
+                cached.has_depth = False
+        return cached
+
+    def writer(self, video_path, fps, model_path=None, depth_model_path=None, video_digest=None, settings=None):
+        model_path = model_path or config.YOLO_MODEL_NAME
+        video_digest = video_digest or file_digest(video_path)
+        model_digest = file_digest(model_path)
+        meta = {
+            'version': CACHE_VERSION,
+            'video': os.path.basename(video_path),
+            'video_digest': video_digest,
+            'model_name': os.path.basename(model_path),
+            'model_digest': model_digest,
+            'depth_model_digest': file_digest(depth_model_path) if depth_model_path else None,
+            'fps': fps,
+            'settings': detection_config() if settings is None else settings,
+        }
+        return DetectionCacheWriter(self, self.key(video_digest, model_digest, meta['settings']), meta)
+
+    def entries(self):
+        """List (path, meta) for every complete entry."""
+        entries = []
+        for name in os.listdir(self.root):
+            meta_path = os.path.join(self.root, name, 'meta.json')
+            if '.tmp-' in name or not os.path.exists(meta_path):
+                continue
+            with open(meta_path) as f:
+                entries.append((os.path.join(self.root, name), json.load(f)))
+        return entries
+
+    def size_bytes(self, path=None):
+        paths = [path] if path else [p for p, _ in self.entries()]
+        total = 0
+        for p in paths:
+            for name in os.listdir(p):
+                total += os.path.getsize(os.path.join(p, name))
+        return total
+
+    def invalidate(self, model_path, model_digest=None):
+        """
+        Remove entries produced by an older version of the same weights file.
+        Returns the number of removed entries.
+        """
+        model_digest = model_digest or file_digest(model_path)
+        model_name = os.path.basename(model_path)
+        removed = 0
+        for path, meta in self.entries():
+            if meta['model_name'] == model_name and meta['model_digest'] != model_digest:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def evict(self):
+        """
+        Drop least-recently-used entries until the cache fits in max_bytes.
+        Returns the number of evicted entries.
+        """
+        # Partial entries left behind by crashed runs
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if '.tmp-' in name and time.time() - os.path.getmtime(path) > STALE_TMP_SEC:
+                shutil.rmtree(path, ignore_errors=True)
+
+        if not self.max_bytes:
+            return 0
+        entries = sorted(self.entries(), key=lambda e: e[1].get('last_access', 0))
+        sizes = {path: self.size_bytes(path) for path, _ in entries}
+        total = sum(sizes.values())
+        evicted = 0
+        # Never evict the most recent entry, even if it alone exceeds the budget
+        for path, _ in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= sizes[path]
+            evicted += 1
+        return evicted
+
+    def _touch(self, path):
+        meta_path = os.path.join(path, 'meta.json')
+        with open(meta_path) as f:
+            meta = json.load(f)
+        meta['last_access'] = time.time()
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+
+class CachedPoseDetector:
+    """
+    Drop-in replacement for PoseDetector that replays cached detections in frame order.
+    """
+    def __init__(self, cached):
+        self.cached = cached
+        self.index = 0
+
+    def detect(self, frame=None, shared=None):
+        if self.index >= len(self.cached):
+            return {}
+        persons = self.cached.persons(self.index)
+        self.index += 1
+        return persons
+
+    def state_dict(self):
+        return {'index': self.index}
+
+    def load_state_dict(self, state):
+        self.index = state['index']
@@ -0,0 +1,128 @@
+import cv2
+import numpy as np
+import config
+
+HEAD_INDICES = [0, 1, 2, 3, 4]  # nose, eyes, ears
+
+class KeyframePoseDetector:
+    """
+    Runs the wrapped pose detector every `interval` frames and propagates
+    boxes and head keypoints in between with pyramidal Lucas-Kanade optical flow.
+    A person whose tracked points fail the forward-backward or appearance check
+    forces an early re-detection, which bounds drift.
+    """
+    def __init__(self, detector, interval=None, min_confidence=None, max_width=None):
+        self.detector = detector
+        self.interval = interval or config.KEYFRAME_INTERVAL
+        self.min_confidence = config.KEYFRAME_MIN_TRACK_CONFIDENCE if min_confidence is None else min_confidence
+        self.max_width = max_width or config.KEYFRAME_FLOW_MAX_WIDTH
+        self.max_patch_error = config.KEYFRAME_MAX_PATCH_ERROR
+
+        self.persons = {}
+        self.prev_gray = None
+        self.since_keyframe = 0
+        self.redetections = 0  # Keyframes forced early by low tracker confidence
+        self._lk_params = dict(winSize=(21, 21), maxLevel=3,
+                               criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+    def _gray(self, frame):
+        h, w = frame.shape[:2]
+        self.scale = min(1.0, self.max_width / w)
+        if self.scale < 1.0:
+            frame = cv2.resize(frame, (int(w * self.scale), int(h * self.scale)), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    def _track_points(self, gray, person):
+        """Head keypoints plus corner features inside the box, in flow (downscaled) pixels."""
+        kp = person['keypoints']
+        head = [] if kp is None else [kp[i][:2] for i in HEAD_INDICES if kp[i][2] > config.CONF_THRESHOLD]
+        x1, y1, x2, y2 = (np.asarray(person['bbox']) * self.scale).astype(int)
+        h, w = gray.shape
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(w, x2), min(h, y2)
+
+        points = [np.asarray(head, dtype=np.float32).reshape(-1, 2) * self.scale]
+        if x2 - x1 > 4 and y2 - y1 > 4:
+            corners = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], maxCorners=20, qualityLevel=0.01, minDistance=3)
+            if corners is not None:
+                points.append(corners.reshape(-1, 2) + (x1, y1))
+        return np.concatenate(points).astype(np.float32), len(head)
+
+    def _keyframe(self, frame, gray, shared):
+        self.persons = self.detector.detect(frame, shared=shared)
+        self.prev_gray = gray
+        self.since_keyframe = 0
+        self.points = {pid: self._track_points(gray, p) for pid, p in self.persons.items()}
+        return self.persons
+
+    def state_dict(self):
+        """Keyframe anchor for checkpoints: people, flow points and the frame they were tracked on."""
+        return {'persons': self.persons, 'prev_gray': self.prev_gray, 'points': getattr(self, 'points', {}),
+                'scale': getattr(self, 'scale', 1.0), 'since_keyframe': self.since_keyframe,
+                'redetections': self.redetections}
+
+    def load_state_dict(self, state):
+        self.persons = state['persons']
+        self.prev_gray = state['prev_gray']
+        self.points = state['points']
+        self.scale = state['scale']
+        self.since_keyframe = state['since_keyframe']
+        self.redetections = state['redetections']
+
+    def detect(self, frame, shared=None):
+        gray = self._gray(frame)
+        self.since_keyframe += 1
+        if self.prev_gray is None or self.since_keyframe >= self.interval or not self.persons:
+            return self._keyframe(frame, gray, shared)
+
+        # One LK call for everyone: stack every person's points
+        pids = [pid for pid in self.persons if len(self.points[pid][0])]
+        if not pids:
+            return self._keyframe(frame, gray, shared)
+        stacked = np.concatenate([self.points[pid][0] for pid in pids]).reshape(-1, 1, 2)
+        forward, st, patch_error = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, stacked, None, **self._lk_params)
+        backward, st_back, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, forward, None, **self._lk_params)
+        fb_error = np.linalg.norm((stacked - backward).reshape(-1, 2), axis=1)
+        # A point is reliable if it tracks both ways and its patch still looks the same
+        good = ((st.ravel() == 1) & (st_back.ravel() == 1) & (fb_error < 1.0)
+                & (patch_error.ravel() < self.max_patch_error))
+        forward = forward.reshape(-1, 2)
+
+        # Persons without trackable points keep their keyframe box
+        propagated = {pid: p for pid, p in self.persons.items() if pid not in pids}
+        offset = 0
+        for pid in pids:
+            points, num_head = self.points[pid]
+            n = len(points)
+            ok = good[offset:offset + n]
+            new_points = forward[offset:offset + n]
+            offset += n
+
+            confidence = ok.mean()
+            if confidence < self.min_confidence:
+                # Tracker lost this person: re-detect now rather than drift
+                self.redetections += 1
+                return self._keyframe(frame, gray, shared)
+
+            flow_shift = np.median(new_points[ok] - points[ok], axis=0)
+            shift = flow_shift / self.scale
+            # Lost points follow the person's median motion so the point set stays aligned
+            new_points = np.where(ok[:, None], new_points, points + flow_shift)
+            person = self.persons[pid]
+            kp = person['keypoints']
+            if kp is not None:
+                kp = kp.copy()
+                kp[:, :2] += shift
+                # Head keypoints follow their own flow when it is reliable
+                head_ids = [i for i in HEAD_INDICES if person['keypoints'][i][2] > config.CONF_THRESHOLD]
+                for j, i in enumerate(head_ids):
+                    if ok[j]:
+                        kp[i, :2] = new_points[j] / self.scale
+
+            propagated[pid] = dict(person, bbox=np.asarray(person['bbox']) + np.tile(shift, 2),
+                                   keypoints=kp, interpolated=True)
+            self.points[pid] = (new_points, num_head)
+
+        self.persons = propagated
+        self.prev_gray = gray
+        return propagated
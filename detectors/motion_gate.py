@@ -0,0 +1,101 @@
+import cv2
+import numpy as np
+import config
+
+class MotionGate:
+    """
+    Cheap scene-change test on a downsampled, blurred grayscale frame.
+    The current frame is compared with the last frame that went through detection
+    (not the previous frame), so slow changes still add up to a refresh.
+    """
+    def __init__(self, threshold=None, pixel_delta=None, refresh_interval=None, width=None):
+        self.threshold = config.MOTION_THRESHOLD if threshold is None else threshold  # Fraction of changed pixels
+        self.pixel_delta = config.MOTION_PIXEL_DELTA if pixel_delta is None else pixel_delta
+        self.refresh_interval = config.MOTION_REFRESH_FRAMES if refresh_interval is None else refresh_interval
+        self.width = width or config.MOTION_DOWNSAMPLE_WIDTH
+
+        self.reference = None
+        self.since_refresh = 0
+        self._small = None
+        self._gray = None
+        self._diff = None
+        self.last_mask = None  # Changed-pixel mask of the latest frame (downsampled)
+
+    def _prepare(self, frame):
+        h, w = frame.shape[:2]
+        small_h = max(1, int(round(h * self.width / w)))
+        if self._small is None or self._small.shape[:2] != (small_h, self.width):
+            self._small = np.empty((small_h, self.width, 3), dtype=np.uint8)
+            self._gray = np.empty((small_h, self.width), dtype=np.uint8)
+            self._diff = np.empty((small_h, self.width), dtype=np.uint8)
+            self.reference = None
+        cv2.resize(frame, (self.width, small_h), dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        cv2.GaussianBlur(self._gray, (5, 5), 0, dst=self._gray)
+        return self._gray
+
+    def changed_fraction(self, frame):
+        gray = self._prepare(frame)
+        if self.reference is None:
+            self.last_mask = np.ones_like(gray, dtype=bool)
+            return 1.0
+        cv2.absdiff(gray, self.reference, dst=self._diff)
+        self.last_mask = self._diff > self.pixel_delta
+        return float(np.count_nonzero(self.last_mask)) / self.last_mask.size
+
+    def state_dict(self):
+        return {'reference': self.reference, 'since_refresh': self.since_refresh}
+
+    def load_state_dict(self, state):
+        self.reference = state['reference']
+        self.since_refresh = state['since_refresh']
+        if self.reference is not None:
+            # Allocate the work buffers now, so the first frame does not discard the restored reference
+            small_h = self.reference.shape[0]
+            self._small = np.empty((small_h, self.width, 3), dtype=np.uint8)
+            self._gray = np.empty((small_h, self.width), dtype=np.uint8)
+            self._diff = np.empty((small_h, self.width), dtype=np.uint8)
+
+    def should_detect(self, frame):
+        """
+        True when the scene changed beyond the threshold since the last detection,
+        or when the forced refresh interval has elapsed.
+        """
+        changed = self.changed_fraction(frame) > self.threshold
+        self.since_refresh += 1
+        if changed or self.since_refresh >= self.refresh_interval:
+            self.reference = self._gray.copy()
+            self.since_refresh = 0
+            return True
+        return False
+
+class GatedPoseDetector:
+    """
+    Wraps a pose detector and only runs it when the MotionGate sees a change.
+    Skipped frames reuse the previous detections.
+    """
+    def __init__(self, detector, gate=None):
+        self.detector = detector
+        self.gate = gate or MotionGate()
+        self.last_persons = {}
+        self.frames = 0
+        self.skipped = 0
+
+    def state_dict(self):
+        """Gate reference and the detections skipped frames reuse, for checkpoints."""
+        return {'gate': self.gate.state_dict(), 'last_persons': self.last_persons,
+                'frames': self.frames, 'skipped': self.skipped}
+
+    def load_state_dict(self, state):
+        self.gate.load_state_dict(state['gate'])
+        self.last_persons = state['last_persons']
+        self.frames = state['frames']
+        self.skipped = state['skipped']
+
+    def detect(self, frame, shared=None):
+        self.frames += 1
+        if self.gate.should_detect(frame):
+            self.last_persons = self.detector.detect(frame, shared=shared)
+        else:
+            self.skipped += 1
+        return self.last_persons
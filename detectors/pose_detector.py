@@ -1,22 +1,154 @@
+import pickle
+import time
 from ultralytics import YOLO
 import numpy as np
 import config
-from utils.cli import print_info
+from utils.cli import print_info, print_warning
+from utils.frame_buffer import SharedInput, bucket_shape, PAD_VALUE
+
+def resolve_imgsz(value):
+    """
+    Inference resolution from a tier name in config.RESOLUTION_TIERS or a pixel size.
+    None keeps the Ultralytics default.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str) and not value.isdigit():
+        if value not in config.RESOLUTION_TIERS:
+            raise ValueError(f"Unknown resolution tier '{value}' (choose from {', '.join(config.RESOLUTION_TIERS)})")
+        return config.RESOLUTION_TIERS[value]
+    imgsz = int(value)
+    return (imgsz + 31) // 32 * 32  # YOLO stride
+
+def _keypoint_array(result):
+    """(N, 17, 3) [x, y, conf] keypoints of one Ultralytics result."""
+    # Ultralytics .keypoints.xy is (N, 17, 2), .keypoints.conf is (N, 17) or None
+    keypoints_xy = result.keypoints.xy.cpu().numpy()
+    keypoints_conf = result.keypoints.conf
+    keypoints_conf = keypoints_conf.cpu().numpy() if keypoints_conf is not None else np.zeros(keypoints_xy.shape[:2])
+    return np.concatenate([keypoints_xy, keypoints_conf[..., None]], axis=2)
 
 class PoseDetector:
-    def __init__(self):
-        print_info(f"Loading YOLO model: {config.YOLO_MODEL_NAME} on {config.DEVICE}...")
-        self.model = YOLO(config.YOLO_MODEL_NAME)
+    def __init__(self, imgsz=None, model_name=None):
+        model_name = model_name or config.YOLO_MODEL_NAME
+        print_info(f"Loading YOLO model: {model_name} on {config.DEVICE}...")
+        self.model = YOLO(model_name)
+        # Per-stream inference resolution (long side, pixels)
+        self.imgsz = resolve_imgsz(imgsz if imgsz is not None else config.POSE_IMGSZ)
         # Force device if possible (Ultralytics handles this internally usually, but good to be explicit if passed)
         # self.model.to(config.DEVICE) 
+        self._shared = SharedInput()
+        self.inference_calls = 0
+
+    def state_dict(self):
+        """
+        Inference counter and Ultralytics tracker state for checkpoints.
+        Trackers that cannot be pickled (e.g. with a ReID model) are left out;
+        a resumed run then starts fresh tracks with new IDs.
+        """
+        state = {'inference_calls': self.inference_calls, 'trackers': None, 'track_count': None}
+        try:
+            from ultralytics.trackers.basetrack import BaseTrack
+            state['track_count'] = BaseTrack._count
+        except ImportError:
+            pass
+        trackers = getattr(self.model.predictor, 'trackers', None)
+        if trackers is not None:
+            try:
+                state['trackers'] = pickle.dumps(trackers)
+            except Exception as e:
+                print_warning(f"Tracker state not checkpointed ({e}); tracks restart on resume")
+        return state
 
-    def detect(self, frame):
+    def load_state_dict(self, state):
+        self.inference_calls = state['inference_calls']
+        if state.get('track_count') is not None:
+            # Keep new track IDs from colliding with IDs still held in the pair tables
+            from ultralytics.trackers.basetrack import BaseTrack
+            BaseTrack._count = state['track_count']
+        if state.get('trackers') is not None:
+            trackers = pickle.loads(state['trackers'])
+
+            def restore(predictor):
+                # Runs before the tracker's own on_predict_start, which then keeps these trackers (persist=True)
+                if not hasattr(predictor, 'trackers'):
+                    predictor.trackers = trackers
+                    predictor.vid_path = [None] * len(trackers)
+
+            self.model.add_callback("on_predict_start", restore)
+
+    def input_shape(self, height, width):
+        """
+        Fixed model input (h, w): config.INFERENCE_SHAPE, else the frame's shape
+        bucket when bucketing is on, else None to let Ultralytics letterbox the full frame.
+        """
+        if config.INFERENCE_SHAPE:
+            return tuple(config.INFERENCE_SHAPE)
+        if config.SHAPE_BUCKETING:
+            return bucket_shape(height, width, config.SHAPE_BUCKETS)
+        return None
+
+    def _model_input(self, shared):
+        """(image, predict kwargs, letterbox or None) for the frame held by `shared`."""
+        frame = shared.frame
+        shape = self.input_shape(*frame.shape[:2])
+        if shape is None:
+            return frame, ({'imgsz': self.imgsz} if self.imgsz else {}), None
+        image, box = shared.letterboxed(shape)
+        return image, {'imgsz': list(shape)}, box
+
+    def _track(self, frame, shared, **kwargs):
+        """Tracker call on the frame (or the shared letterboxed input); returns (results, letterbox or None)."""
+        self.inference_calls += 1
+        if shared is None:
+            shared = self._shared
+            shared.set_frame(frame)
+        image, size, box = self._model_input(shared)
+        return self.model.track(image, persist=True, verbose=False, device=config.DEVICE, **size, **kwargs), box
+
+    def estimate(self, image):
+        """
+        Untracked pose estimation on an arbitrary image (e.g. a crop).
+        Returns (bboxes (N, 4), keypoints (N, 17, 3)) in image pixels.
+        """
+        self.inference_calls += 1
+        crop = SharedInput()  # Crop sizes vary, so their letterbox buffers are not kept
+        crop.set_frame(image)
+        model_input, size, box = self._model_input(crop)
+        result = self.model.predict(model_input, verbose=False, device=config.DEVICE, **size)[0]
+        if result.boxes is None or len(result.boxes) == 0:
+            return np.zeros((0, 4), dtype=np.float32), np.zeros((0, 17, 3), dtype=np.float32)
+        bboxes, keypoints = result.boxes.xyxy.cpu().numpy(), _keypoint_array(result)
+        if box is not None:
+            box.to_frame(bboxes.reshape(-1, 2, 2))
+            box.to_frame(keypoints)
+        return bboxes, keypoints
+
+    def warmup(self, frame_shapes, passes=None):
+        """
+        Untracked passes on blank frames of each (h, w) size, so allocations and
+        backend tuning for the resulting input shapes happen before the first
+        real frame. Not counted as inference calls. Returns seconds spent.
+        """
+        passes = config.WARMUP_PASSES if passes is None else passes
+        start = time.perf_counter()
+        warm = SharedInput()
+        for height, width in dict.fromkeys(map(tuple, frame_shapes)):
+            warm.set_frame(np.full((height, width, 3), PAD_VALUE, dtype=np.uint8))
+            image, size, _ = self._model_input(warm)
+            for _ in range(passes):
+                self.model.predict(image, verbose=False, device=config.DEVICE, **size)
+        return time.perf_counter() - start
+
+    def detect(self, frame, shared=None):
         """
         Runs tracking on the frame.
+        shared: optional SharedInput for this frame; with a fixed input shape the
+        letterboxed image is shared with the depth model.
         Returns:
             dict: { person_id: { 'bbox': [x1,y1,x2,y2], 'keypoints': [[x,y,conf], ...], 'conf': float } }
         """
-        results = self.model.track(frame, persist=True, verbose=False, device=config.DEVICE)
+        results, box = self._track(frame, shared)
         
         persons = {}
         if results[0].boxes is None or results[0].boxes.id is None:
@@ -25,25 +157,54 @@ class PoseDetector:
         ids = results[0].boxes.id.cpu().numpy().astype(int)
         bboxes = results[0].boxes.xyxy.cpu().numpy()
         
-        # Keypoints: result is (N, 17, 2) usually xy, or (N, 17, 3) if conf included?
-        # Ultralytics .keypoints.data is (N, 17, 3) [x, y, conf]
-        # .keypoints.xy is (N, 17, 2)
-        # .keypoints.conf is (N, 17)
-        keypoints_xy = results[0].keypoints.xy.cpu().numpy()
-        keypoints_conf = results[0].keypoints.conf.cpu().numpy()
+        keypoints = _keypoint_array(results[0])
 
-        for i, person_id in enumerate(ids):
-            # Combine xy and conf for easier processing later
-            kps = []
-            for j in range(len(keypoints_xy[i])):
-                x, y = keypoints_xy[i][j]
-                c = keypoints_conf[i][j] if keypoints_conf is not None else 0.0
-                kps.append([x, y, c])
+        # Coordinates come back in letterbox space; map them to the original frame
+        if box is not None:
+            box.to_frame(bboxes.reshape(-1, 2, 2))
+            box.to_frame(keypoints)
 
+        for i, person_id in enumerate(ids):
             persons[person_id] = {
                 'bbox': bboxes[i],
-                'keypoints': np.array(kps),
-                'conf': np.mean(kps, axis=0)[2] # Average keypoint confidence as proxy
+                'keypoints': keypoints[i],
+                'conf': keypoints[i, :, 2].mean() # Average keypoint confidence as proxy
             }
         
         return persons
+
+class PersonDetector(PoseDetector):
+    """
+    Cheap first stage of the detection cascade: a plain YOLO detector (person
+    class only) tracked at low resolution. Persons carry the box confidence and
+    no keypoints.
+    """
+    def __init__(self, imgsz=None, model_name=None):
+        super().__init__(imgsz=imgsz if imgsz is not None else config.CASCADE_PERSON_IMGSZ,
+                         model_name=model_name or config.CASCADE_PERSON_MODEL)
+
+    def detect(self, frame, shared=None):
+        results, box = self._track(frame, shared, classes=[0])
+        persons = {}
+        if results[0].boxes is None or results[0].boxes.id is None:
+            return persons
+        ids = results[0].boxes.id.cpu().numpy().astype(int)
+        bboxes = results[0].boxes.xyxy.cpu().numpy()
+        conf = results[0].boxes.conf.cpu().numpy()
+        if box is not None:
+            box.to_frame(bboxes.reshape(-1, 2, 2))
+        for i, person_id in enumerate(ids):
+            persons[person_id] = {'bbox': bboxes[i], 'keypoints': None, 'conf': float(conf[i])}
+        return persons
+
+    def count(self, image):
+        """
+        People in an arbitrary image, untracked (e.g. sparse calibration samples,
+        where a tracker would hold back every new track as unconfirmed).
+        """
+        self.inference_calls += 1
+        sample = SharedInput()
+        sample.set_frame(image)
+        model_input, size, _ = self._model_input(sample)
+        result = self.model.predict(model_input, verbose=False, device=config.DEVICE, classes=[0], **size)[0]
+        return 0 if result.boxes is None else len(result.boxes)
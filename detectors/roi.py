@@ -0,0 +1,186 @@
+import cv2
+import numpy as np
+import config
+from utils.frame_buffer import PAD_VALUE
+from utils.geometry import box_iou
+
+def parse_polygon(text):
+    """
+    Parse "x1,y1 x2,y2 x3,y3 ..." into an (N, 2) int32 array.
+    """
+    points = [tuple(map(float, pair.split(','))) for pair in text.split()]
+    if len(points) < 3:
+        raise ValueError(f"ROI polygon needs at least 3 points: '{text}'")
+    return np.array(points, dtype=np.int32)
+
+class ActivityRegion:
+    """
+    Auto-derived region of interest: a decaying heatmap of frame differences on
+    a downsampled frame. The box around the hot area (plus the people already
+    tracked) is the region worth running detection on.
+    """
+    def __init__(self, width=None, decay=0.9, pixel_delta=None):
+        self.width = width or config.MOTION_DOWNSAMPLE_WIDTH
+        self.decay = decay
+        self.pixel_delta = config.MOTION_PIXEL_DELTA if pixel_delta is None else pixel_delta
+        self.prev = None
+        self.heat = None
+
+    def update(self, frame):
+        h, w = frame.shape[:2]
+        small_h = max(1, int(round(h * self.width / w)))
+        small = cv2.resize(frame, (self.width, small_h), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        if self.prev is None or self.prev.shape != gray.shape:
+            self.heat = np.zeros(gray.shape, dtype=np.float32)
+        else:
+            self.heat *= self.decay
+            self.heat += cv2.absdiff(gray, self.prev) > self.pixel_delta
+        self.prev = gray
+
+    def box(self, frame_shape, threshold=0.5):
+        """Bounding box [x1, y1, x2, y2] of the active area in frame pixels, or None."""
+        if self.heat is None:
+            return None
+        ys, xs = np.nonzero(self.heat > threshold)
+        if len(xs) == 0:
+            return None
+        scale = frame_shape[1] / self.heat.shape[1]
+        return np.array([xs.min(), ys.min(), xs.max() + 1, ys.max() + 1], dtype=np.float32) * scale
+
+class RoiPoseDetector:
+    """
+    Runs the wrapped detector on a crop instead of the full frame, either the
+    bounding rectangle of user polygons or an auto-derived activity region, and
+    maps results back to full-frame coordinates.
+    Polygon mode greys out pixels outside the polygons and drops people whose
+    foot point falls outside them. Auto mode only moves the crop every
+    `refresh_interval` frames, so the tracker mostly sees a stable crop; with no
+    activity at all it falls back to the full frame.
+    The wrapped tracker works in crop coordinates, so a crop move shifts every
+    box and it starts new tracks. Right after a move, new track IDs are matched
+    to the previous frame's people by full-frame IoU and reported under the old
+    IDs.
+    """
+    def __init__(self, detector, polygons=None, auto=False, margin=None, refresh_interval=None):
+        self.detector = detector
+        self.polygons = [np.asarray(p, dtype=np.int32) for p in (polygons or [])]
+        self.auto = auto
+        self.margin = config.ROI_MARGIN if margin is None else margin
+        self.refresh_interval = refresh_interval or config.ROI_REFRESH_FRAMES
+
+        self.activity = ActivityRegion() if auto else None
+        self.region = None  # Current crop [x1, y1, x2, y2] in frame pixels (ints)
+        self.frames = 0
+        self._mask = None
+        self._buffer = None
+        self._fed_region = None  # Region the wrapped detector saw last frame (None = full frame)
+        self.id_map = {}  # Wrapped tracker ID -> reported ID, for tracks restarted by a crop move
+        self.last_persons = {}
+
+    def _clip(self, box, frame_shape):
+        h, w = frame_shape[:2]
+        # Quantise outward to a 32 px grid so small changes do not move the crop
+        x1 = max(0, int(box[0] - self.margin) // 32 * 32)
+        y1 = max(0, int(box[1] - self.margin) // 32 * 32)
+        x2 = min(w, -(-int(box[2] + self.margin) // 32) * 32)
+        y2 = min(h, -(-int(box[3] + self.margin) // 32) * 32)
+        if x2 - x1 < 32 or y2 - y1 < 32:
+            return None
+        return (x1, y1, x2, y2)
+
+    def _polygon_region(self, frame_shape):
+        if self.region is None:
+            points = np.concatenate(self.polygons)
+            self.region = self._clip([points[:, 0].min(), points[:, 1].min(),
+                                      points[:, 0].max(), points[:, 1].max()], frame_shape)
+            if self.region is None:
+                raise ValueError("ROI polygons must cover at least 32x32 pixels inside the frame")
+            x1, y1, x2, y2 = self.region
+            self._mask = np.zeros((y2 - y1, x2 - x1), dtype=np.uint8)
+            cv2.fillPoly(self._mask, [p - (x1, y1) for p in self.polygons], 1)
+            self._mask = self._mask.astype(bool)
+            self._buffer = np.empty((y2 - y1, x2 - x1, 3), dtype=np.uint8)
+        return self.region
+
+    def _auto_region(self, frame):
+        self.activity.update(frame)
+        if (self.frames - 1) % self.refresh_interval == 0 or self.region is None:
+            # Re-derive the crop around recent motion and the people already tracked
+            boxes = [p['bbox'] for p in self.last_persons.values()]
+            active = self.activity.box(frame.shape)
+            if active is not None:
+                boxes.append(active)
+            self.region = self._clip([min(b[0] for b in boxes), min(b[1] for b in boxes),
+                                      max(b[2] for b in boxes), max(b[3] for b in boxes)], frame.shape) if boxes else None
+        return self.region
+
+    def state_dict(self):
+        """Crop, activity heatmap and ID mapping for checkpoints (polygon crops are rebuilt)."""
+        state = {'frames': self.frames, 'last_persons': self.last_persons, 'id_map': dict(self.id_map),
+                 'fed_region': self._fed_region, 'region': None, 'activity': None}
+        if self.activity is not None:
+            state['region'] = self.region
+            state['activity'] = (self.activity.prev, self.activity.heat)
+        return state
+
+    def load_state_dict(self, state):
+        self.frames = state['frames']
+        self.last_persons = state['last_persons']
+        self.id_map = dict(state['id_map'])
+        self._fed_region = state['fed_region']
+        if self.activity is not None and state['activity'] is not None:
+            self.region = state['region']
+            self.activity.prev, self.activity.heat = state['activity']
+
+    def _stable_ids(self, persons, moved):
+        if moved:
+            claimed = {self.id_map[pid] for pid in persons if pid in self.id_map}
+            previous = {pid: p for pid, p in self.last_persons.items() if pid not in claimed and pid not in persons}
+            for pid, person in persons.items():
+                if pid in self.id_map or pid in self.last_persons or not previous:
+                    continue
+                best = max(previous, key=lambda q: box_iou(person['bbox'], previous[q]['bbox']))
+                if box_iou(person['bbox'], previous[best]['bbox']) >= config.ROI_REMATCH_IOU:
+                    self.id_map[pid] = best
+                    del previous[best]
+        # A lost track the wrapped tracker picks up again keeps its own ID
+        revived = set(persons) & set(self.id_map.values())
+        if revived:
+            self.id_map = {pid: old for pid, old in self.id_map.items() if old not in revived}
+        while len(self.id_map) > config.MAX_TRACKS:
+            del self.id_map[next(iter(self.id_map))]
+        return {self.id_map.get(pid, pid): person for pid, person in persons.items()}
+
+    def detect(self, frame, shared=None):
+        self.frames += 1
+        region = self._polygon_region(frame.shape) if self.polygons else self._auto_region(frame)
+        moved = region != self._fed_region
+        self._fed_region = region
+        if region is None:
+            self.last_persons = self._stable_ids(self.detector.detect(frame, shared=shared), moved)
+            return self.last_persons
+
+        x1, y1, x2, y2 = region
+        crop = frame[y1:y2, x1:x2]
+        if self._mask is not None:
+            np.copyto(self._buffer, crop)
+            self._buffer[~self._mask] = PAD_VALUE
+            crop = self._buffer
+        persons = self.detector.detect(crop)
+
+        remapped = {}
+        for pid, person in persons.items():
+            bbox = np.asarray(person['bbox'], dtype=np.float32) + (x1, y1, x1, y1)
+            keypoints = person['keypoints']
+            if keypoints is not None:
+                keypoints = keypoints.copy()
+                keypoints[:, 0] += x1
+                keypoints[:, 1] += y1
+            if self.polygons:
+                foot = (float((bbox[0] + bbox[2]) / 2), float(bbox[3]) - 1)
+                if not any(cv2.pointPolygonTest(p, foot, False) >= 0 for p in self.polygons):
+                    continue
+            remapped[pid] = dict(person, bbox=bbox, keypoints=keypoints)
+        self.last_persons = self._stable_ids(remapped, moved)
+        return self.last_persons
@@ -0,0 +1,145 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+import config
+from core.sharding import plan_jobs, shard_result, merge_results
+from core.work_queue import BrokerServer, SQLiteBroker, Worker, open_broker
+from utils.cli import ProgressBar, print_info, print_success, print_error, print_warning
+
+def frame_counts(videos):
+    """Total frames per video (absolute path), 0 where the container does not say."""
+    from utils.video_io import open_reader
+    counts = {}
+    for video in videos:
+        cap = open_reader(video)
+        counts[os.path.abspath(video)] = max(cap.total_frames, 0)
+        cap.release()
+    return counts
+
+def print_worker_table(results, wall_sec):
+    workers = {}
+    for result in results.values():
+        row = workers.setdefault(result['worker'], {'jobs': 0, 'frames': 0, 'busy': 0.0})
+        row['jobs'] += 1
+        row['frames'] += result['frames']
+        row['busy'] += result['duration_sec']
+    frames = sum(row['frames'] for row in workers.values())
+    print(f"\n\033[1m\033[36mWORKERS ({len(workers)}, {frames / wall_sec if wall_sec else 0:.1f} fps aggregate)\033[0m")
+    print(f"\033[36m{'-' * 60}\033[0m")
+    print(f"  \033[1m{'Worker':<28} {'Jobs':>6} {'Frames':>9} {'Busy':>7} {'fps':>7}\033[0m")
+    for worker, row in sorted(workers.items()):
+        print(f"  {worker[:28]:<28} {row['jobs']:>6} {row['frames']:>9} {row['busy']:>6.0f}s "
+              f"{row['frames'] / row['busy'] if row['busy'] else 0:>7.1f}")
+    print(f"\033[36m{'-' * 60}\033[0m\n")
+
+def coordinate(args, main_args):
+    missing = [video for video in args.video if not os.path.exists(video)]
+    if missing:
+        print_error(f"Input video file '{missing[0]}' not found.")
+        sys.exit(1)
+
+    broker = SQLiteBroker(args.broker)
+    server = None
+    if args.serve:
+        host, port = args.serve.rsplit(':', 1)
+        server = BrokerServer(broker, (host, int(port)))
+        server.start()
+        print_success(f"Serving the work queue on {server.url}")
+
+    counts = frame_counts(args.video) if args.shard_frames else {}
+    jobs = plan_jobs(args.video, counts, args.shard_frames, main_args)
+    for job_id, payload in jobs:
+        broker.put(job_id, payload)
+    print_info(f"Queued {len(jobs)} jobs from {len(args.video)} videos in {args.broker}")
+
+    job_ids = {job_id for job_id, _ in jobs}
+    start_wall = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    start = time.time()
+    progress = ProgressBar(total=len(jobs), prefix='Jobs')
+    try:
+        while True:
+            finished = job_ids & set(broker.results())
+            failed = job_ids & set(broker.errors())
+            progress.update(len(finished) + len(failed), suffix=f"| Failed: {len(failed)}")
+            if len(finished) + len(failed) == len(jobs):
+                break
+            time.sleep(config.JOB_POLL_SEC)
+    except KeyboardInterrupt:
+        print_info("Interrupted; reporting the jobs finished so far (rerun to pick the queue up again)")
+    progress.finish()
+    wall = time.time() - start
+    if server is not None:
+        server.shutdown()
+
+    errors = broker.errors()
+    for job_id in sorted(job_ids & set(errors)):
+        print_warning(f"Job {job_id} failed: {errors[job_id].strip().splitlines()[-1]}")
+    results = {job_id: result for job_id, result in broker.results().items() if job_id in job_ids}
+    if not results:
+        print_error("No job finished.")
+        sys.exit(1)
+
+    comparator, joined = merge_results(results.values())
+    frames = comparator.processing_stats['total_frames']
+    comparator.set_processing_stats(start_wall, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), wall,
+                                    comparator.processing_stats['fps'], frames)
+    if joined:
+        print_info(f"Joined {joined} interactions cut at shard boundaries")
+    print_worker_table(results, wall)
+    comparator.print_report()
+    print_success(f"{len(results)} jobs, {frames} frames in {wall:.1f}s ({frames / wall if wall else 0:.1f} fps aggregate).")
+
+def run_job(payload, worker_id, output_dir):
+    """Run main.py in-process over one job's video range."""
+    import main
+    stem = os.path.splitext(os.path.basename(payload['video']))[0]
+    output = os.path.join(output_dir or tempfile.gettempdir(), f"{stem}.{payload['start']}.mp4")
+    argv = ['--video', payload['video'], '--output', output, '--start-frame', str(payload['start'])]
+    if payload['end'] is not None:
+        argv += ['--end-frame', str(payload['end'])]
+    if output_dir is None:
+        argv += ['--encoder', 'none']  # Only the report is collected; later flags may override
+    args = main.build_parser().parse_args(argv + payload['args'])
+    try:
+        comparator = main.run(args)
+    except SystemExit as e:
+        # main reports its own errors; make them retryable job failures
+        raise RuntimeError(f"main.py exited with status {e.code}") from e
+    return shard_result(comparator, payload, worker_id)
+
+def work(args):
+    broker = open_broker(args.broker)
+    worker = Worker(broker, lambda payload: run_job(payload, worker.worker_id, args.output_dir), worker_id=args.worker_id)
+    print_info(f"Worker {worker.worker_id} pulling jobs from {args.broker}")
+    worker.run(max_jobs=args.max_jobs, wait=args.wait)
+    print_success(f"Worker {worker.worker_id}: {worker.completed} jobs done, {worker.failed} failed.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Distribute main.py runs over workers through a shared work queue. "
+                                                 "Arguments after -- are passed to main.py for every job.")
+    sub = parser.add_subparsers(dest="role", required=True)
+    coord = sub.add_parser("coordinator", help="Split videos into jobs, queue them, collect and merge the reports")
+    coord.add_argument("--video", type=str, nargs='+', required=True, help="Input videos (paths must be valid on every worker)")
+    coord.add_argument("--broker", type=str, default="jobs.db", help="SQLite work queue file")
+    coord.add_argument("--serve", type=str, default=None, help="Also serve the queue over TCP on host:port for remote workers")
+    coord.add_argument("--shard-frames", type=int, default=config.SHARD_FRAMES, help="Split videos into jobs of this many frames (0 = one job per video)")
+    worker = sub.add_parser("worker", help="Pull and run jobs until the queue is drained")
+    worker.add_argument("--broker", type=str, default="jobs.db", help="SQLite work queue file or tcp://host:port")
+    worker.add_argument("--worker-id", type=str, default=None, help="Name in leases and the report (default: host-random)")
+    worker.add_argument("--output-dir", type=str, default=None, help="Write each job's annotated video here (default: no video)")
+    worker.add_argument("--max-jobs", type=int, default=None, help="Exit after this many jobs")
+    worker.add_argument("--wait", action="store_true", help="Keep polling for new jobs once the queue is drained")
+
+    argv = sys.argv[1:]
+    main_args = argv[argv.index('--') + 1:] if '--' in argv else []
+    args = parser.parse_args(argv[:argv.index('--')] if '--' in argv else argv)
+    if args.role == "coordinator":
+        coordinate(args, main_args)
+    else:
+        work(args)
+
+if __name__ == "__main__":
+    main()
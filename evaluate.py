@@ -0,0 +1,122 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from core.evaluation import discover_dataset, load_labels, match_intervals, triggered_intervals, aggregate_runs, recall_regressions
+from utils.cli import ProgressBar, print_info, print_success, print_error, print_warning
+
+def evaluate_video(task):
+    """
+    Run main.py over one labelled video with one method (in a pool worker) and
+    match its VLM-triggered interactions against the labels.
+    """
+    video, label_path, method, main_args, workers = task
+    import main
+    with tempfile.TemporaryDirectory() as tmp:
+        argv = ['--video', video, '--output', os.path.join(tmp, 'out.mp4'), '--method', method,
+                '--encoder', 'none', '--streams-per-node', str(workers)] + main_args
+        try:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                comparator = main.run(main.build_parser().parse_args(argv))
+        except (Exception, SystemExit) as e:
+            return {'video': video, 'method': method, 'error': f"{type(e).__name__}: {e}"}
+        # Long runs spill annotations next to the output, so read them before it is removed
+        processing = comparator.processing_stats
+        labels = load_labels(label_path, processing.get('fps') or 30.0)
+        match = match_intervals(triggered_intervals(comparator.iter_annotations(method)), labels)
+    return {
+        'video': video,
+        'method': method,
+        'frames': processing.get('total_frames', 0),
+        'fps': processing.get('fps', 0.0),
+        'duration_sec': processing.get('duration_sec', 0.0),
+        'triggers': comparator.stats[method]['triggers'],
+        'tp': match['tp'],
+        'fp': match['fp'],
+        'recalled': match['recalled'],
+        'labels': len(labels),
+    }
+
+def print_table(rows):
+    print(f"\n\033[1m\033[36mEVALUATION (labelled intervals vs. VLM-triggered interactions)\033[0m")
+    print(f"\033[36m{'-' * 78}\033[0m")
+    print(f"  \033[1m{'Method':<10} {'Videos':>7} {'Labels':>7} {'Recall':>7} {'Prec.':>7} {'Triggers':>9} "
+          f"{'Trig/h':>8} {'fps':>8}\033[0m")
+    for row in sorted(rows, key=lambda r: r['method']):
+        print(f"  {row['method']:<10} {row['videos']:>7} {row['labels']:>7} {row['recall']:>7.2f} {row['precision']:>7.2f} "
+              f"{row['triggers']:>9} {row['triggers_per_hour']:>8.1f} {row['fps']:>8.1f}")
+    print(f"\033[36m{'-' * 78}\033[0m\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy vs. cost over a labelled video set, in parallel. "
+                                                 "Arguments after -- are passed to main.py for every run.")
+    parser.add_argument("--dataset", type=str, required=True, help="Directory of videos, each with a <stem>.json label file (see load_labels)")
+    parser.add_argument("--method", type=str, nargs='+', default=["hybrid"], choices=['ipd', 'head', 'hybrid', 'mde', 'prior'],
+                        help="Methods to evaluate; each runs in its own pass so its fps is measured on its own")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: all cores)")
+    parser.add_argument("--save", type=str, default=None, help="Write the table (and per-video runs) to this JSON file")
+    parser.add_argument("--baseline", type=str, default=None, help="JSON from an earlier --save; exit 1 if any method's recall dropped")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="Recall drop allowed against --baseline")
+    argv = sys.argv[1:]
+    main_args = argv[argv.index('--') + 1:] if '--' in argv else []
+    args = parser.parse_args(argv[:argv.index('--')] if '--' in argv else argv)
+
+    if not os.path.isdir(args.dataset):
+        print_error(f"Dataset directory '{args.dataset}' not found.")
+        sys.exit(1)
+    labelled, unlabelled = discover_dataset(args.dataset)
+    if unlabelled:
+        print_warning(f"{len(unlabelled)} videos have no label file and are skipped")
+    if not labelled:
+        print_error(f"No labelled videos in '{args.dataset}'.")
+        sys.exit(1)
+
+    workers = args.workers or os.cpu_count() or 1
+    methods = list(dict.fromkeys(args.method))
+    # Longest videos first keeps the pool busy until the end
+    labelled.sort(key=lambda pair: os.path.getsize(pair[0]), reverse=True)
+    tasks = [(video, label_path, method, main_args, workers) for video, label_path in labelled for method in methods]
+    print_info(f"Evaluating {len(methods)} methods on {len(labelled)} videos with {workers} workers...")
+
+    start = time.time()
+    runs = []
+    progress = ProgressBar(total=len(tasks), prefix='Evaluating')
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for done, future in enumerate(as_completed(pool.submit(evaluate_video, task) for task in tasks), 1):
+            run = future.result()
+            if 'error' in run:
+                progress.log(f"{os.path.basename(run['video'])} ({run['method']}) failed: {run['error']}")
+            else:
+                runs.append(run)
+            progress.update(done)
+    progress.finish()
+    failed = len(tasks) - len(runs)
+    if not runs:
+        print_error("Every run failed.")
+        sys.exit(1)
+
+    rows = aggregate_runs(runs)
+    print_table(rows)
+    print_success(f"{len(runs)} runs in {time.time() - start:.1f}s" + (f" ({failed} failed)" if failed else ""))
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'rows': rows, 'runs': runs}, f, indent=2)
+        print_info(f"Results saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = recall_regressions(rows, json.load(f)['rows'], args.tolerance)
+        for method, before, now in regressions:
+            print_error(f"Recall regression for {method}: {before:.3f} -> {now:.3f}")
+        if failed:
+            print_error(f"{failed} runs failed; recall is not comparable")
+        if regressions or failed:
+            sys.exit(1)
+        print_success("No recall regression against the baseline.")
+
+if __name__ == "__main__":
+    main()
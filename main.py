@@ -1,5 +1,4 @@
 import argparse
-import cv2
 import sys
 import os
 import time
@@ -7,28 +6,97 @@ from datetime import datetime
 import config
 from core.interaction_filter import InteractionFilter
 from core.comparator import Comparator
-from detectors.pose_detector import PoseDetector
+from core.results_store import BACKENDS as RESULTS_BACKENDS, ResultsWriter
+from core.checkpoint import Checkpointer, checkpoint_path, load_checkpoint, segment_path
+from core.sharding import warmup_start
+from detectors.pose_detector import PoseDetector, PersonDetector
+from detectors.cascade import CascadePoseDetector
 from detectors.depth_estimator import DepthEstimator
-from utils.visualization import draw_detections, draw_interactions, draw_status
-from utils.cli import ProgressBar, print_info, print_success, print_error
+from detectors.depth_prior import DepthPrior
+from detectors.detection_cache import DetectionCache, CachedPoseDetector, detection_config, file_digest
+from detectors.motion_gate import MotionGate
+from detectors.chain import build_pose_detector, wrapper_state, load_wrapper_state
+from detectors.roi import parse_polygon
+from utils.visualization import OverlayRenderer
+from utils.frame_buffer import FrameRing, SharedInput
+from utils.clip_extractor import ClipExtractor
+from utils.video_io import BACKENDS, ENCODERS, open_reader, open_writer, concat_videos
+from utils import thread_budget
+from utils.cli import ProgressBar, print_info, print_success, print_error, print_warning
 
-def main():
+def _format_triggers(total_triggers):
+    """Progress suffix: a bare count for one method, name=count pairs for several."""
+    if len(total_triggers) == 1:
+        return str(next(iter(total_triggers.values())))
+    return " ".join(f"{method}={count}" for method, count in total_triggers.items())
+
+def _draw_and_write(renderer, out, clips, frame, results, frame_count, fps, method, triggers):
+    """Overlay one frame and queue it for encoding and clip extraction (runs on the shared thread pool)."""
+    annotated = renderer.render(frame, results, frame_count, fps, method, triggers)
+    out.write(annotated)
+    if clips is not None:
+        clips.add(annotated, frame_count)
+
+def build_parser():
     parser = argparse.ArgumentParser(description="Smart Video Interaction Filter")
     parser.add_argument("--video", type=str, default="input.mp4", help="Input video path")
     parser.add_argument("--output", type=str, default="output.mp4", help="Output video path")
-    parser.add_argument("--method", type=str, default="hybrid", choices=['ipd', 'head', 'hybrid', 'mde'], help="Z-plane detection method")
+    parser.add_argument("--method", type=str, nargs='+', default=["hybrid"], choices=['ipd', 'head', 'hybrid', 'mde', 'prior'],
+                        help="Z-plane detection method(s). Several methods share one decode and pose pass; the first is drawn")
     parser.add_argument("--device", type=str, default=None, help="Device override")
-    args = parser.parse_args()
-    
+    parser.add_argument("--cache-dir", type=str, default=None, help="Detection cache directory: replay cached pose results or record them")
+    parser.add_argument("--imgsz", type=str, default=None, help=f"Pose inference resolution: pixels or a tier ({', '.join(config.RESOLUTION_TIERS)})")
+    parser.add_argument("--shape-buckets", action="store_true", help="Letterbox frames into the closest of config.SHAPE_BUCKETS so models see few fixed input shapes")
+    parser.add_argument("--warmup", type=int, default=config.WARMUP_PASSES, help="Warmup passes per model input shape before the first frame (0 = off)")
+    parser.add_argument("--depth-prior", type=str, default=config.DEPTH_PRIOR_PATH, help="Background depth .npy from calibrate.py (needed by --method prior)")
+    parser.add_argument("--no-depth-fallback", action="store_true", help="Method prior: never run live MDE, even where the foot point is occluded")
+    parser.add_argument("--cascade", action="store_true", help="Track people with a cheap detector; run the pose model only on overlapping boxes")
+    parser.add_argument("--person-model", type=str, default=config.CASCADE_PERSON_MODEL, help="Cascade first-stage detector weights")
+    parser.add_argument("--person-imgsz", type=str, default=None, help="Cascade first-stage resolution: pixels or a tier (default: config)")
+    parser.add_argument("--roi", type=str, action="append", default=None, help="Detect only inside this polygon: \"x1,y1 x2,y2 x3,y3 ...\" (repeatable)")
+    parser.add_argument("--roi-auto", action="store_true", help="Detect only inside an auto-derived activity region")
+    parser.add_argument("--keyframe-interval", type=int, default=config.KEYFRAME_INTERVAL, help="Run the pose model every K frames and track with optical flow in between")
+    parser.add_argument("--motion-gate", action="store_true", help="Skip pose inference on frames where the scene did not change")
+    parser.add_argument("--motion-threshold", type=float, default=None, help="Motion gate sensitivity: fraction of changed pixels (default: config)")
+    parser.add_argument("--motion-refresh", type=int, default=None, help="Force a detection every N frames while gated (default: config)")
+    parser.add_argument("--video-backend", type=str, default=config.VIDEO_BACKEND, choices=BACKENDS, help="Decoder: PyAV (threaded FFmpeg) or OpenCV; auto prefers PyAV")
+    parser.add_argument("--decode-width", type=int, default=None, help="Downscale frames to this width while decoding")
+    parser.add_argument("--encoder", type=str, default=config.VIDEO_ENCODER, choices=ENCODERS, help="Output encoder: mp4v (OpenCV), x264 (PyAV) or none")
+    parser.add_argument("--x264-preset", type=str, default=None, help="x264 preset (default: config)")
+    parser.add_argument("--overlay-every", type=int, default=config.OVERLAY_EVERY, help="Draw detections on every Nth output frame only")
+    parser.add_argument("--overlay-scale", type=float, default=config.OVERLAY_SCALE, help="Render and encode the output at this fraction of the input size")
+    parser.add_argument("--streams-per-node", type=int, default=config.STREAMS_PER_NODE, help="Processes sharing this node's cores; thread counts are divided accordingly")
+    parser.add_argument("--cores", type=int, default=None, help="Cores available to all streams on this node (default: CPU affinity)")
+    parser.add_argument("--checkpoint-every", type=int, default=config.CHECKPOINT_INTERVAL, help="Checkpoint filter, tracker and report state every N frames (0 = off)")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint next to --output")
+    parser.add_argument("--clips-dir", type=str, default=None, help="Write a short annotated clip around every trigger into this directory")
+    parser.add_argument("--clip-pre", type=float, default=config.CLIP_PRE_SEC, help="Seconds before a trigger included in its clip")
+    parser.add_argument("--clip-post", type=float, default=config.CLIP_POST_SEC, help="Seconds after a trigger included in its clip")
+    parser.add_argument("--annotations-log", type=str, default=None, help="JSONL file receiving interactions flushed from memory on long runs (default: <output stem>.annotations.jsonl)")
+    parser.add_argument("--results-dir", type=str, default=None, help="Columnar results store: per-frame summary and per-interaction rows of this run")
+    parser.add_argument("--results-backend", type=str, default=config.RESULTS_BACKEND, choices=RESULTS_BACKENDS, help="Results format: Parquet (pyarrow) or NumPy records")
+    parser.add_argument("--start-frame", type=int, default=0, help="Process the video from this frame (a shard of a distributed run)")
+    parser.add_argument("--end-frame", type=int, default=None, help="Stop before this frame (default: end of video)")
+    return parser
+
+def run(args):
+    """Process one video (or frame range) as configured by `args`; returns the Comparator."""
     # Config override
     if args.device:
         config.DEVICE = args.device
+    if args.shape_buckets:
+        config.SHAPE_BUCKETING = True
+
+    # Deduplicate while keeping order: the first method is the one drawn on the output
+    methods = list(dict.fromkeys(args.method))
+    primary_method = methods[0]
+    partial = args.start_frame > 0 or args.end_frame is not None
 
     # Startup Banner (Moved to top)
     print(f"\n\033[1m\033[34m=== Smart Video Interaction Filter ===\033[0m")
-    print(f"  \033[1mInput:\033[0m  {args.video}")
+    print(f"  \033[1mInput:\033[0m  {args.video}" + (f" [frames {args.start_frame}-{args.end_frame or 'end'}]" if partial else ""))
     print(f"  \033[1mOutput:\033[0m {args.output}")
-    print(f"  \033[1mMethod:\033[0m {args.method}")
+    print(f"  \033[1mMethod:\033[0m {', '.join(methods)}")
     print(f"  \033[1mDevice:\033[0m {config.DEVICE}")
     print(f"\033[34m======================================\033[0m\n")
 
@@ -36,116 +104,357 @@ def main():
         print_error(f"Input video file '{args.video}' not found.")
         sys.exit(1)
 
+    # Split the cores between torch, OpenCV and the shared pool before any model loads
+    budget = thread_budget.configure(streams=args.streams_per_node, cores=args.cores)
+    print_info(f"Threads: torch={budget.torch_threads} opencv={budget.cv2_threads} pool={budget.workers}")
+
     print_info("Initializing Detectors...")
 
-    # Initialize Detectors
-    pose_detector = PoseDetector()
+    # Initialize Detectors (replaying cached detections skips YOLO entirely)
+    detection_cache = None
+    cached = None
+    video_digest = None
+    # Everything besides the video and weights that changes the recorded detections
+    cache_settings = detection_config(imgsz=args.imgsz, decode_width=args.decode_width, polygons=args.roi,
+                                      roi_auto=args.roi_auto, keyframe_interval=args.keyframe_interval,
+                                      motion_gate=args.motion_gate, motion_threshold=args.motion_threshold,
+                                      motion_refresh=args.motion_refresh, shape_buckets=args.shape_buckets)
+    depth_model_path = config.DEPTH_MODEL_NAME if 'mde' in methods else None
+    if args.cache_dir and args.cascade:
+        print_warning("The detection cache stores full-frame poses; --cache-dir is ignored with --cascade")
+    elif args.cache_dir:
+        detection_cache = DetectionCache(args.cache_dir)
+        video_digest = file_digest(args.video)  # Hashed once; the cache writer reuses it
+        cached = detection_cache.lookup(args.video, depth_model_path=depth_model_path, video_digest=video_digest,
+                                        settings=cache_settings)
+        if cached is not None:
+            print_success(f"Detection cache hit: replaying {len(cached)} frames from {cached.path}")
+            if args.roi or args.roi_auto or args.keyframe_interval > 1 or args.motion_gate:
+                print_info("ROI, keyframe and motion-gate flags are not re-run: the replayed detections were recorded with them")
+
+    if cached is not None:
+        base_detector = CachedPoseDetector(cached)
+    elif args.cascade:
+        # mde and prior only compare depths, so with no keypoint method the pose model is never needed
+        pose_model = PoseDetector(imgsz=args.imgsz) if any(m not in ('mde', 'prior') for m in methods) else None
+        base_detector = CascadePoseDetector(PersonDetector(imgsz=args.person_imgsz, model_name=args.person_model), pose_model)
+    else:
+        base_detector = PoseDetector(imgsz=args.imgsz)
+    pose_detector = build_pose_detector(
+        base_detector,
+        polygons=[parse_polygon(text) for text in args.roi or []],
+        roi_auto=args.roi_auto,
+        keyframe_interval=args.keyframe_interval,
+        gate=MotionGate(threshold=args.motion_threshold, refresh_interval=args.motion_refresh) if args.motion_gate else None
+    )
+    depth_prior = None
+    if 'prior' in methods:
+        if not args.depth_prior or not os.path.exists(args.depth_prior):
+            print_error(f"Method 'prior' needs a depth prior: run calibrate.py and pass --depth-prior (got {args.depth_prior})")
+            sys.exit(1)
+        depth_prior = DepthPrior(args.depth_prior)
     depth_estimator = None
-    if args.method == 'mde':
+    if ('mde' in methods and not (cached is not None and cached.has_depth)) or ('prior' in methods and not args.no_depth_fallback):
         depth_estimator = DepthEstimator()
 
-    # Initialize Filter
-    interaction_filter = InteractionFilter(
-        method=args.method, 
-        pose_detector=pose_detector, 
-        depth_estimator=depth_estimator
-    )
+    # Initialize one Filter per method, each with its own temporal state
+    interaction_filters = {
+        method: InteractionFilter(
+            method=method,
+            pose_detector=pose_detector,
+            depth_estimator=depth_estimator,
+            depth_prior=depth_prior
+        )
+        for method in methods
+    }
     
-    # Initialize Comparator
-    comparator = Comparator()
+    # Initialize Comparator (annotations past the memory cap spill to the annotation log,
+    # by default next to the output; it is only created once the cap is exceeded)
+    annotation_sink = args.annotations_log or os.path.splitext(args.output)[0] + ".annotations.jsonl"
+    comparator = Comparator(max_annotations=config.MAX_ANNOTATIONS_IN_MEMORY, annotation_sink=annotation_sink,
+                            append=args.resume, start_frame=args.start_frame)
     
+    # Checkpoints live next to the output; resuming restores all per-run state
+    ckpt_path = checkpoint_path(args.output)
+    resume_state = None
+    if args.resume and partial:
+        print_error("--resume continues whole-video runs; frame ranges are retried from their start")
+        sys.exit(1)
+    if args.resume:
+        resume_state = load_checkpoint(ckpt_path)
+        if resume_state is None:
+            print_error(f"No checkpoint to resume from at {ckpt_path}")
+            sys.exit(1)
+        if resume_state['video'] != os.path.abspath(args.video) or resume_state['methods'] != methods:
+            print_error(f"Checkpoint {ckpt_path} was written for {resume_state['video']} ({', '.join(resume_state['methods'])})")
+            sys.exit(1)
+    checkpoint_every = args.checkpoint_every or (resume_state['interval'] if resume_state else 0)
+    if partial:
+        checkpoint_every = 0
+    checkpointer = Checkpointer(ckpt_path, checkpoint_every) if checkpoint_every else None
+    # A crashed mp4 is unreadable, so checkpointed runs write one segment per checkpoint interval
+    segmented = checkpointer is not None and args.encoder != 'none'
+    segment = 0
+
     print_success("Initialization complete.")
 
-    # Video Setup
-    cap = cv2.VideoCapture(args.video)
-    if not cap.isOpened():
-        print_error("Could not open video.")
+    # Video Setup (encoding runs on its own thread)
+    try:
+        cap = open_reader(args.video, backend=args.video_backend, decode_width=args.decode_width)
+        if not cap.isOpened():
+            raise IOError(args.video)
+    except Exception as e:
+        print_error(f"Could not open video: {e}")
         sys.exit(1)
-        
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(args.output, fourcc, fps, (width, height))
-    
+
+    fps = cap.fps
+    width, height = cap.width, cap.height
+
+    # Warm every model up for this stream's input shapes, so the first frames run at steady-state latency
+    if args.warmup > 0:
+        warmed = [model for model in (base_detector, depth_estimator) if hasattr(model, 'warmup')]
+        warmup_sec = sum(model.warmup([(height, width)], args.warmup) for model in warmed)
+        shapes = {model.input_shape(height, width) for model in warmed if hasattr(model, 'input_shape')}
+        comparator.set_warmup_stats(warmup_sec, len(shapes))
+        print_info(f"Warmup: {warmup_sec:.2f}s ({args.warmup} passes per input shape)")
+
     frame_count = 0
-    total_triggers = 0
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    
+    warmup_frames = 0  # Decoded before --start-frame to warm tracks and dwell timers, not reported
+    total_triggers = {method: 0 for method in methods}
+    total_frames = cap.total_frames
+    end_frame = args.end_frame
+    if end_frame is not None and total_frames > 0:
+        end_frame = min(end_frame, total_frames)
     start_time_wall = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    elapsed_before = 0.0
+
+    if resume_state is not None:
+        frame_count = resume_state['frame']
+        total_triggers = resume_state['total_triggers']
+        start_time_wall = resume_state['start_time_wall']
+        elapsed_before = resume_state['elapsed']
+        segment = resume_state['segment']
+        for method, interaction_filter in interaction_filters.items():
+            interaction_filter.load_state_dict(resume_state['filters'][method])
+        comparator.load_state_dict(resume_state['comparator'])
+        if resume_state['detector_type'] == type(base_detector).__name__:
+            base_detector.load_state_dict(resume_state['detector'])
+        if not load_wrapper_state(pose_detector, resume_state['wrappers']):
+            print_warning("ROI / keyframe / motion-gate flags differ from the checkpointed run; "
+                          "their state starts fresh with a full detection")
+        # Segments written after the checkpoint are redone
+        stale = segment
+        while os.path.exists(segment_path(args.output, stale)):
+            os.remove(segment_path(args.output, stale))
+            stale += 1
+        cap.seek(frame_count)
+        print_success(f"Resuming at frame {frame_count} from {ckpt_path}")
+    elif args.start_frame:
+        # Frame numbers stay those of the whole video, so annotations of several ranges line up.
+        # Decoding starts early, so an interaction crossing the range start has built up the same
+        # tracks, dwell and miss state as in a whole-video run by the first reported frame
+        frame_count = warmup_start(args.start_frame, interaction_filters.values())
+        warmup_frames = args.start_frame - frame_count
+        for interaction_filter in interaction_filters.values():
+            interaction_filter.frame_count = frame_count
+        if isinstance(base_detector, CachedPoseDetector):
+            base_detector.index = frame_count
+        cap.seek(frame_count)
+        if warmup_frames:
+            print_info(f"Warming up on frames {frame_count + 1}-{args.start_frame} (not reported)")
+
+    renderer = OverlayRenderer(every=args.overlay_every, scale=args.overlay_scale)
+    output_size = renderer.output_size(width, height)
+    open_output = lambda: open_writer(segment_path(args.output, segment) if segmented else args.output, fps, output_size,
+                                      encoder=args.encoder, preset=args.x264_preset)
+    try:
+        out = open_output()
+    except ImportError as e:
+        print_error(str(e))
+        sys.exit(1)
+
+    clips = None
+    if args.clips_dir:
+        clips = ClipExtractor(args.clips_dir, fps, output_size, pre_sec=args.clip_pre, post_sec=args.clip_post,
+                              encoder=args.encoder if args.encoder != 'none' else None)
+        comparator.clip_lookup = clips.clip_for
+        if resume_state is not None and resume_state['clips'] is not None:
+            clips.load_state_dict(resume_state['clips'])
+
+    cache_writer = None
+    if detection_cache is not None and cached is None:
+        if partial:
+            print_warning("Frame ranges do not record the detection cache (it needs every frame)")
+        elif resume_state is None:
+            cache_writer = detection_cache.writer(args.video, fps, depth_model_path=depth_model_path,
+                                                  video_digest=video_digest, settings=cache_settings)
+        else:
+            print_warning("Resumed runs do not record the detection cache (it needs every frame)")
+
+    results_writer = None
+    if args.results_dir:
+        first_frame = frame_count + warmup_frames
+        run_id = f"{os.path.splitext(os.path.basename(args.video))[0]}.{first_frame}.{datetime.now():%Y%m%d-%H%M%S}.{os.getpid()}"
+        # A resumed run continues the checkpointed run's partial results under its run ID
+        results_state = resume_state['results'] if resume_state is not None else None
+        try:
+            results_writer = ResultsWriter(args.results_dir, run_id, methods, backend=args.results_backend,
+                                           meta={'video': os.path.abspath(args.video), 'start_frame': first_frame},
+                                           state=results_state)
+        except ImportError as e:
+            print_error(str(e))
+            sys.exit(1)
+        comparator.on_interaction = results_writer.add_interaction
+
     start_time = time.time()
-    results = {}
+    all_results = {}
+
+    progress = ProgressBar(total=(end_frame or total_frames) - args.start_frame, prefix='Processing')
 
-    progress = ProgressBar(total=total_frames, prefix='Processing')
+    # Decode into reused buffers; model inputs are letterboxed once per frame and shared
+    # One extra buffer: the previous frame may still be drawn on the pool while the next decodes
+    frame_ring = FrameRing(height, width, config.FRAME_RING_SIZE + 1)
+    pending_draw = None
+    shared = SharedInput()
 
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
+    timings = {}
+    try:
+        while cap.isOpened() and (end_frame is None or frame_count < end_frame):
+            stage_start = time.perf_counter()
+            ret, frame = frame_ring.read(cap)
+            if not ret:
+                break
             
-        frame_count += 1
-        
-        # Process
-        results = interaction_filter.process(frame)
-        
-        # Log Interaction Groups
-        if results.get('groups'):
-            current_time_sec = frame_count / fps
-            time_str = time.strftime('%H:%M:%S', time.gmtime(current_time_sec)) + f".{int((current_time_sec % 1) * 100):02d}"
-            for group in results['groups']:
-                progress.log(f"[Frame {frame_count} | {time_str}] Interaction Group: {sorted(group)}")
-
-        # Stats update
-        has_overlap = len(results['overlaps']) > 0
-        has_interaction = len(results['interactions']) > 0
-        triggers = results['triggers']
-        if triggers > 0:
-            total_triggers += 1
-        
-        comparator.update(args.method, has_overlap, has_interaction, triggers > 0)
+            frame_count += 1
+            warming = frame_count <= args.start_frame
+            shared.set_frame(frame)
+            detect_start = time.perf_counter()
+            timings['decode'] = detect_start - stage_start
         
-        # Log ended interactions
-        for interaction in results.get('ended_interactions', []):
-            comparator.log_interaction(
-                args.method,
-                interaction['start_frame'],
-                interaction['end_frame'],
-                interaction['triggered'],
-                interaction.get('trigger_frame')
-            )
-
-        # Draw
-        draw_detections(frame, results['persons'], results.get('z_metrics'), results.get('groups'))
-        draw_interactions(frame, results['interactions'], results['persons'])
-        draw_status(frame, frame_count, fps, args.method, total_triggers)
-        
-        out.write(frame)
+            # Detect once, then feed every method's filter
+            persons = pose_detector.detect(frame, shared=shared)
+            timings['detect'] = time.perf_counter() - detect_start
+            for method, interaction_filter in interaction_filters.items():
+                filter_start = time.perf_counter()
+                results = interaction_filter.process(frame, persons=persons, shared=shared)
+                timings['filter'] = time.perf_counter() - filter_start
+                all_results[method] = results
+                if warming:
+                    continue
+                if results_writer is not None:
+                    results_writer.add_frame(frame_count, method, results, len(persons), timings)
+                if results['triggers'] > 0:
+                    total_triggers[method] += 1
+
+                # Stats update and ended interactions
+                comparator.record_frame(method, results)
+            if warming:
+                continue
+            comparator.record_latency(time.perf_counter() - stage_start)
+
+            if cache_writer is not None:
+                depths = all_results['mde']['z_metrics'] if 'mde' in all_results else None
+                cache_writer.append(persons, depths)
+
+            results = all_results[primary_method]
+
+            # Log Interaction Groups
+            if results.get('groups'):
+                current_time_sec = frame_count / fps
+                time_str = time.strftime('%H:%M:%S', time.gmtime(current_time_sec)) + f".{int((current_time_sec % 1) * 100):02d}"
+                for group in results['groups']:
+                    progress.log(f"[Frame {frame_count} | {time_str}] Interaction Group: {sorted(group)}")
+
+            # Draw
+            # Drawing overlaps the next frame's decode and inference; one frame in flight keeps output order
+            if pending_draw is not None:
+                pending_draw.result()
+            if clips is not None and any(r['triggers'] > 0 for r in all_results.values()):
+                clips.trigger(frame_count)
+            pending_draw = budget.executor.submit(_draw_and_write, renderer, out, clips, frame, results, frame_count, fps,
+                                                  primary_method, total_triggers[primary_method])
         
-        progress.update(frame_count, suffix=f"| Triggers: {total_triggers}")
+            progress.update(frame_count - args.start_frame, suffix=f"| Triggers: {_format_triggers(total_triggers)}")
+
+            if checkpointer is not None and checkpointer.due(frame_count):
+                # Consistent cut: this frame is drawn and its output segment closed before the snapshot
+                pending_draw.result()
+                pending_draw = None
+                if segmented:
+                    out.release()
+                    segment += 1
+                    out = open_output()
+                checkpointer.save({
+                    'video': os.path.abspath(args.video),
+                    'methods': methods,
+                    'interval': checkpoint_every,
+                    'frame': frame_count,
+                    'segment': segment,
+                    'total_triggers': dict(total_triggers),
+                    'start_time_wall': start_time_wall,
+                    'elapsed': elapsed_before + time.time() - start_time,
+                    'filters': {method: f.state_dict() for method, f in interaction_filters.items()},
+                    'comparator': comparator.state_dict(),
+                    'detector_type': type(base_detector).__name__,
+                    'detector': base_detector.state_dict() if hasattr(base_detector, 'state_dict') else None,
+                    'wrappers': wrapper_state(pose_detector),
+                    'clips': clips.state_dict() if clips is not None else None,
+                    'results': results_writer.state_dict() if results_writer is not None else None,
+                })
+    except BaseException:
+        # Failed or interrupted (Ctrl-C): drop partial results rather than leave .tmp- directories behind,
+        # unless a checkpoint lets --resume continue them
+        if results_writer is not None:
+            results_writer.abort(keep=checkpointer is not None and (checkpointer.saves > 0 or resume_state is not None))
+        if cache_writer is not None:
+            cache_writer.abort()
+        raise
 
+    if pending_draw is not None:
+        pending_draw.result()
     progress.finish()
     cap.release()
     out.release()
+    budget.shutdown()
+    if cache_writer is not None:
+        cache_writer.close()
+        print_info(f"Detections cached in {cache_writer.final_path}")
+    if segmented:
+        parts = [segment_path(args.output, i) for i in range(segment + 1) if os.path.exists(segment_path(args.output, i))]
+        if not concat_videos(parts, args.output):
+            print_warning(f"ffmpeg not available: output left in {len(parts)} segments ({parts[0]} ...)")
+    if checkpointer is not None:
+        checkpointer.close(remove=True)
+    if clips is not None:
+        written = clips.close()
+        print_info(f"{len(written)} trigger clips written to {args.clips_dir}")
     
     # Log remaining active interactions as ended
-    for pair, data in results.get('active_interactions', {}).items():
-        comparator.log_interaction(
-            args.method,
-            data['start_frame'],
-            frame_count,
-            data['triggered'],
-            data.get('trigger_frame')
-        )
+    for method, interaction_filter in interaction_filters.items():
+        comparator.close_interactions(method, interaction_filter.active_interactions, frame_count)
 
     end_time = time.time()
-    duration = end_time - start_time
+    duration = elapsed_before + end_time - start_time
     end_time_wall = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    comparator.set_processing_stats(start_time_wall, end_time_wall, duration, fps, frame_count)
+    processed = frame_count - args.start_frame
+    comparator.set_processing_stats(start_time_wall, end_time_wall, duration, fps, processed)
+    if isinstance(base_detector, (PoseDetector, CascadePoseDetector)):
+        comparator.set_inference_stats(processed + warmup_frames, base_detector.inference_calls)
+    if results_writer is not None:
+        results_writer.close(comparator.processing_stats)
+        print_info(f"Results stored in {results_writer.final_path}")
+    if depth_prior is not None:
+        print_info(f"Depth prior: {depth_prior.lookups} foot-point lookups, {depth_prior.fallbacks} needed live MDE")
+    if isinstance(base_detector, CascadePoseDetector):
+        print_info(f"Cascade: pose model ran on {base_detector.pose_frames} of {base_detector.frames} frames "
+                   f"({base_detector.pose_calls} crops)")
     comparator.print_report()
     print_success("Done.")
+    return comparator
+
+def main():
+    run(build_parser().parse_args())
 
 if __name__ == "__main__":
     main()
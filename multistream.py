@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import config
+from core.interaction_filter import InteractionFilter
+from core.comparator import Comparator
+from core.scheduler import DeadlineScheduler
+from utils.video_io import BACKENDS, open_reader
+from utils import thread_budget
+from utils.cli import print_info, print_success, print_error
+
+class LiveSource:
+    """
+    Plays a video on its own thread at its native frame rate, like a camera
+    feed: frames keep coming whether or not they are processed, and the
+    consumer always gets the newest one.
+    """
+    def __init__(self, path, backend=None, decode_width=None):
+        self.cap = open_reader(path, backend=backend, decode_width=decode_width)
+        if not self.cap.isOpened():
+            raise IOError(path)
+        self.fps = self.cap.fps or 30.0
+        self.frame = None
+        self.index = 0
+        self.done = False
+        self._taken = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"source-{os.path.basename(path)}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        start = time.monotonic()
+        index = 0
+        while True:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            index += 1
+            delay = start + index / self.fps - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            with self._lock:
+                self.frame, self.index = frame, index
+        self.cap.release()
+        self.done = True
+
+    def latest(self):
+        """Newest frame not handed out yet and its index, or (None, index)."""
+        with self._lock:
+            if self.index == self._taken:
+                return None, self.index
+            self._taken = self.index
+            return self.frame, self.index
+
+def print_stream_table(metrics, comparators):
+    print(f"\n\033[1m\033[36mSTREAMS (capacity {metrics['capacity_fps'] or '?'} fps, "
+          f"{'overloaded' if metrics['overloaded'] else 'within capacity'})\033[0m")
+    print(f"\033[36m{'-' * 96}\033[0m")
+    print(f"  \033[1m{'Stream':<20} {'Budget':>7} {'Avg fps':>8} {'Latency':>9} {'Frames':>7} {'Dropped':>8} "
+          f"{'SLO miss':>9} {'Triggers':>9}\033[0m")
+    for sid, m in metrics['streams'].items():
+        triggers = sum(data['triggers'] for data in comparators[sid].stats.values())
+        latency = f"{m['latency_ms']:.0f}ms" if m['latency_ms'] is not None else "-"
+        print(f"  {sid[:20]:<20} {m['budget_fps']:>7.1f} {m['average_fps']:>8.1f} {latency:>9} {m['processed']:>7} "
+              f"{m['dropped']:>8} {m['slo_misses']:>9} {triggers:>9}")
+    print(f"\033[36m{'-' * 96}\033[0m\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Process several live feeds on one node with a deadline-aware scheduler")
+    parser.add_argument("--video", type=str, nargs='+', required=True, help="Input videos or stream URLs, played back in real time")
+    parser.add_argument("--method", type=str, nargs='+', default=["hybrid"], choices=['ipd', 'head', 'hybrid', 'mde'],
+                        help="Interaction detection method(s) run on every stream")
+    parser.add_argument("--device", type=str, default=None, help="Device override")
+    parser.add_argument("--imgsz", type=str, default=None, help="Pose inference resolution: pixels or a tier")
+    parser.add_argument("--video-backend", type=str, default=config.VIDEO_BACKEND, choices=BACKENDS, help="Decoder")
+    parser.add_argument("--decode-width", type=int, default=None, help="Downscale frames to this width while decoding")
+    parser.add_argument("--active-fps", type=float, default=config.SCHEDULER_ACTIVE_FPS, help="Budget of streams with overlaps or active interactions")
+    parser.add_argument("--idle-fps", type=float, default=config.SCHEDULER_IDLE_FPS, help="Budget of idle streams")
+    parser.add_argument("--slo-ms", type=float, default=config.STREAM_SLO_MS, help="Per-frame latency SLO; later frames are dropped")
+    parser.add_argument("--capacity-fps", type=float, default=None, help="Node capacity in frames/s (default: measured)")
+    parser.add_argument("--shape-buckets", action="store_true", help="Letterbox frames into the closest of config.SHAPE_BUCKETS")
+    parser.add_argument("--warmup", type=int, default=config.WARMUP_PASSES, help="Warmup passes per model input shape before a stream is scheduled")
+    parser.add_argument("--metrics-log", type=str, default=None, help="JSONL file receiving scheduler metrics every second")
+    args = parser.parse_args()
+
+    if args.device:
+        config.DEVICE = args.device
+    if args.shape_buckets:
+        config.SHAPE_BUCKETING = True
+    methods = list(dict.fromkeys(args.method))
+    for path in args.video:
+        if '://' not in path and not os.path.exists(path):
+            print_error(f"Input video file '{path}' not found.")
+            sys.exit(1)
+
+    thread_budget.configure()
+    from detectors.pose_detector import PoseDetector
+    depth_estimator = None
+    if 'mde' in methods:
+        from detectors.depth_estimator import DepthEstimator
+        depth_estimator = DepthEstimator()  # Stateless: shared by all streams
+
+    scheduler = DeadlineScheduler(active_fps=args.active_fps, idle_fps=args.idle_fps, slo_ms=args.slo_ms,
+                                  capacity_fps=args.capacity_fps)
+    sources, detectors, filters, comparators = {}, {}, {}, {}
+    for i, path in enumerate(args.video):
+        sid = f"{i}:{os.path.basename(path)}"
+        detectors[sid] = PoseDetector(imgsz=args.imgsz)  # One tracker per stream
+        filters[sid] = {m: InteractionFilter(method=m, depth_estimator=depth_estimator) for m in methods}
+        comparators[sid] = Comparator(max_annotations=config.MAX_ANNOTATIONS_IN_MEMORY)
+        try:
+            sources[sid] = LiveSource(path, backend=args.video_backend, decode_width=args.decode_width)
+        except Exception as e:
+            print_error(f"Could not open video: {e}")
+            sys.exit(1)
+        if args.warmup > 0:
+            # Before scheduling, so warmup does not count against the stream's deadlines
+            frame_shape = [(sources[sid].cap.height, sources[sid].cap.width)]
+            for model in (detectors[sid], depth_estimator):
+                if model is not None:
+                    model.warmup(frame_shape, args.warmup)
+        scheduler.add_stream(sid, sources[sid].fps)
+    print_success(f"Scheduling {len(sources)} streams")
+
+    metrics_log = open(args.metrics_log, 'a') if args.metrics_log else None
+    last_status = time.monotonic()
+    try:
+        while True:
+            sid, wait = scheduler.next()
+            if sid is None:
+                if wait is None:
+                    break
+                time.sleep(min(wait, 0.05))
+                continue
+            frame, index = sources[sid].latest()
+            if frame is None:
+                if sources[sid].done:
+                    scheduler.finish_stream(sid)
+                else:
+                    scheduler.skip(sid)
+                continue
+
+            started = scheduler.clock()
+            persons = detectors[sid].detect(frame)
+            results = []
+            for method, interaction_filter in filters[sid].items():
+                # Source frame numbers: dropped frames still count toward dwell and tolerance
+                result = interaction_filter.process(frame, persons=persons, frame_index=index)
+                comparators[sid].record_frame(method, result)
+                results.append(result)
+            scheduler.complete(sid, results, started)
+
+            now = time.monotonic()
+            if now - last_status >= config.SCHEDULER_REBALANCE_SEC:
+                last_status = now
+                metrics = scheduler.metrics()
+                if metrics_log is not None:
+                    metrics_log.write(json.dumps(dict(metrics, time=time.time())) + '\n')
+                    metrics_log.flush()
+                rates = " ".join(f"{s.split(':')[0]}={m['effective_fps']:.0f}" for s, m in metrics['streams'].items())
+                print(f"\r\033[34mℹ\033[0m fps {rates}{' (overloaded)' if metrics['overloaded'] else ''}   ", end="", flush=True)
+    except KeyboardInterrupt:
+        print_info("Interrupted; reporting what was processed so far")
+    finally:
+        if metrics_log is not None:
+            metrics_log.close()
+    print()
+
+    for sid, stream_filters in filters.items():
+        for method, interaction_filter in stream_filters.items():
+            comparators[sid].close_interactions(method, interaction_filter.active_interactions, interaction_filter.frame_count)
+    print_stream_table(scheduler.metrics(), comparators)
+    print_success("Done.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import sys
+import time
+import config
+from core.evaluation import load_labels
+from core.sweep import grid_search, random_search, run_sweep
+from detectors.detection_cache import DetectionCache
+from utils.cli import print_info, print_success, print_error
+
+def print_table(rows, pareto_rows, param_names, limit):
+    pareto_ids = {id(row) for row in pareto_rows}
+    header = " ".join(f"{name:>14}" for name in param_names)
+    print(f"\n\033[1m\033[36mPARAMETER SWEEP (Pareto: VLM triggers vs. recall)\033[0m")
+    print(f"\033[36m{'-' * (16 * len(param_names) + 44)}\033[0m")
+    print(f"  \033[1m{header} {'Triggers':>9} {'Events':>7} {'Recall':>7} {'Prec.':>7} {'Savings':>8}\033[0m")
+
+    # Pareto-optimal rows first, then the rest by cost
+    ordered = pareto_rows + sorted((r for r in rows if id(r) not in pareto_ids), key=lambda r: (r['triggers'], -r['recall']))
+    for row in ordered[:limit]:
+        color = "\033[32m" if id(row) in pareto_ids else ""
+        values = " ".join(f"{row[name]:>14.3f}" for name in param_names)
+        print(f"  {color}{values} {row['triggers']:>9} {row['events']:>7} {row['recall']:>7.2f} "
+              f"{row['precision']:>7.2f} {row['cost_reduction']:>7.1f}%\033[0m")
+    print(f"\033[36m{'-' * (16 * len(param_names) + 44)}\033[0m\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel threshold sweep over cached detections")
+    parser.add_argument("--video", type=str, default="input.mp4", help="Video whose detections were cached by main.py --cache-dir")
+    parser.add_argument("--cache-dir", type=str, required=True, help="Detection cache directory")
+    parser.add_argument("--method", type=str, default="hybrid", choices=['ipd', 'head', 'hybrid', 'mde'], help="Z-plane detection method")
+    parser.add_argument("--ratio", type=float, nargs='+', default=[config.Z_PLANE_RATIO_THRESHOLD], help="Head size / IPD ratio thresholds")
+    parser.add_argument("--depth-diff", type=float, nargs='+', default=[config.Z_PLANE_DEPTH_DIFF_THRESHOLD], help="MDE depth difference thresholds")
+    parser.add_argument("--conf", type=float, nargs='+', default=[config.CONF_THRESHOLD], help="Keypoint confidence thresholds")
+    parser.add_argument("--miss-tolerance", type=int, nargs='+', default=[config.INTERACTION_MISS_TOLERANCE], help="Frames an active pair may drop out without ending")
+    parser.add_argument("--dwell", type=float, nargs='+', default=[2.0], help="Seconds of interaction before a VLM trigger")
+    parser.add_argument("--random", type=int, default=0, help="Random search with N samples inside the given ranges instead of a grid")
+    parser.add_argument("--labels", type=str, default=None, help="Labelled interaction intervals (JSON); defaults to the current config's interactions")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: all cores)")
+    parser.add_argument("--top", type=int, default=25, help="Rows to print")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.video):
+        print_error(f"Input video file '{args.video}' not found.")
+        sys.exit(1)
+
+    depth_model_path = config.DEPTH_MODEL_NAME if args.method == 'mde' else None
+    # Whatever detection flags the cached run used; the sweep only tunes the filter
+    cached = DetectionCache(args.cache_dir).lookup(args.video, depth_model_path=depth_model_path, settings='any')
+    if cached is None:
+        print_error(f"No cached detections for '{args.video}'. Run main.py --cache-dir {args.cache_dir} first.")
+        sys.exit(1)
+    print_info(f"Replaying detections recorded with {json.dumps(cached.meta.get('settings', {}), sort_keys=True)}")
+
+    # Only sweep the parameters the method actually reads
+    space = {'conf_threshold': args.conf, 'miss_tolerance': args.miss_tolerance, 'dwell_sec': args.dwell}
+    if args.method == 'mde':
+        space = {'depth_diff_threshold': args.depth_diff, 'miss_tolerance': args.miss_tolerance, 'dwell_sec': args.dwell}
+    else:
+        space['ratio_threshold'] = args.ratio
+    configs = random_search(space, args.random) if args.random else grid_search(space)
+
+    labels = load_labels(args.labels, cached.fps) if args.labels else None
+    print_info(f"Sweeping {len(configs)} configurations over {len(cached)} cached frames...")
+
+    start = time.time()
+    try:
+        rows, pareto_rows = run_sweep(cached, args.method, configs, labels, args.workers)
+    except ValueError as e:
+        print_error(str(e))
+        sys.exit(1)
+    duration = time.time() - start
+
+    print_table(rows, pareto_rows, list(space), args.top)
+    replayed = len(configs) * len(cached)
+    print_success(f"Replayed {replayed} frames in {duration:.1f}s ({replayed / duration if duration else 0:.0f} fps).")
+
+if __name__ == "__main__":
+    main()
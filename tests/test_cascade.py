@@ -0,0 +1,101 @@
+import unittest
+import numpy as np
+from core.interaction_filter import InteractionFilter
+from detectors.cascade import CascadePoseDetector
+
+def head_keypoints(x, y, eye_gap, conf=0.9):
+    """Pose with confident eyes `eye_gap` pixels apart around (x, y)."""
+    keypoints = np.zeros((17, 3), dtype=np.float32)
+    keypoints[:5] = [[x, y, conf], [x - eye_gap / 2, y, conf], [x + eye_gap / 2, y, conf],
+                     [x - eye_gap, y, conf], [x + eye_gap, y, conf]]
+    return keypoints
+
+class FakePersonDetector:
+    def __init__(self, boxes):
+        self.boxes = boxes  # pid -> [x1, y1, x2, y2]
+
+    def detect(self, frame, shared=None):
+        return {pid: {'bbox': np.array(box, dtype=np.float32), 'keypoints': None, 'conf': 0.8}
+                for pid, box in self.boxes.items()}
+
+    def state_dict(self):
+        return {}
+
+    def load_state_dict(self, state):
+        pass
+
+class FakePoseModel:
+    """Finds the scripted full-frame poses that lie inside the crop, in crop coordinates."""
+    def __init__(self, poses):
+        self.poses = poses  # list of (bbox, eye_gap)
+        self.crops = []
+
+    def estimate(self, image):
+        x1, y1 = image.offset
+        h, w = image.shape[:2]
+        self.crops.append((x1, y1, x1 + w, y1 + h))
+        boxes, keypoints = [], []
+        for box, gap in self.poses:
+            if box[0] >= x1 and box[1] >= y1 and box[2] <= x1 + w and box[3] <= y1 + h:
+                boxes.append(np.subtract(box, (x1, y1, x1, y1)))
+                keypoints.append(head_keypoints((box[0] + box[2]) / 2 - x1, box[1] + 10 - y1, gap))
+        return np.array(boxes, dtype=np.float32).reshape(-1, 4), np.array(keypoints, dtype=np.float32).reshape(-1, 17, 3)
+
+class Frame(np.ndarray):
+    """Frame whose slices remember their top-left corner."""
+    offset = (0, 0)
+
+    def __getitem__(self, key):
+        view = super().__getitem__(key)
+        if isinstance(key, tuple) and len(key) == 2 and all(isinstance(k, slice) for k in key):
+            view.offset = (key[1].start or 0, key[0].start or 0)
+        return view
+
+def frame(h=480, w=640):
+    return np.zeros((h, w, 3), dtype=np.uint8).view(Frame)
+
+class TestCascade(unittest.TestCase):
+    def test_pose_model_skipped_without_overlaps(self):
+        pose = FakePoseModel([])
+        cascade = CascadePoseDetector(FakePersonDetector({1: [0, 0, 50, 100], 2: [200, 0, 250, 100]}), pose)
+        persons = cascade.detect(frame())
+        self.assertTrue(all(p['keypoints'] is None for p in persons.values()))
+        self.assertEqual((cascade.frames, cascade.pose_frames, pose.crops), (1, 0, []))
+
+    def test_keypoints_attached_in_crop(self):
+        boxes = {1: [100, 100, 160, 260], 2: [150, 110, 210, 270], 3: [500, 100, 550, 250]}
+        pose = FakePoseModel([([101, 99, 161, 259], 20), ([150, 112, 209, 270], 21), ([500, 100, 550, 250], 20)])
+        cascade = CascadePoseDetector(FakePersonDetector(boxes), pose, margin=10)
+        persons = cascade.detect(frame())
+        self.assertEqual(pose.crops, [(90, 90, 220, 280)])
+        self.assertIsNone(persons[3]['keypoints'])
+        # Keypoints come back in frame coordinates
+        self.assertAlmostEqual(float(persons[1]['keypoints'][0, 0]), 131.0)
+        self.assertAlmostEqual(float(persons[2]['keypoints'][2, 0]) - float(persons[2]['keypoints'][1, 0]), 21.0)
+        self.assertAlmostEqual(persons[1]['conf'], np.float32(0.9 * 5 / 17), places=5)
+        self.assertEqual(cascade.inference_calls, 1)
+
+    def test_large_crops_fall_back_to_full_frame(self):
+        boxes = {1: [0, 0, 400, 480], 2: [300, 0, 640, 480]}
+        pose = FakePoseModel([])
+        CascadePoseDetector(FakePersonDetector(boxes), pose).detect(frame())
+        self.assertEqual(pose.crops, [(0, 0, 640, 480)])
+
+    def test_filter_accepts_persons_without_keypoints(self):
+        boxes = {1: [100, 100, 160, 260], 2: [150, 110, 210, 270], 3: [200, 100, 260, 250]}
+        # Person 3 overlaps 2 but the pose model misses it
+        pose = FakePoseModel([([100, 100, 160, 260], 20), ([150, 110, 210, 270], 21)])
+        cascade = CascadePoseDetector(FakePersonDetector(boxes), pose)
+        interaction_filter = InteractionFilter(method='hybrid', pose_detector=cascade)
+        results = interaction_filter.process(frame())
+        self.assertEqual(results['interactions'], {frozenset([1, 2])})
+        self.assertEqual(results['z_metrics'][3], 0)
+
+    def test_mde_only_runs_without_pose_model(self):
+        cascade = CascadePoseDetector(FakePersonDetector({1: [0, 0, 50, 100], 2: [40, 0, 90, 100]}), None)
+        persons = cascade.detect(frame())
+        self.assertEqual(len(persons), 2)
+        self.assertEqual(cascade.pose_frames, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from core.checkpoint import Checkpointer, load_checkpoint, segment_path
+from core.comparator import Comparator
+from core.interaction_filter import InteractionFilter
+from detectors.chain import build_pose_detector, load_wrapper_state, wrapper_state
+from detectors.motion_gate import MotionGate
+from tests.test_keyframe_tracker import GroundTruthDetector, SyntheticScene
+from utils.video_io import OpenCVReader
+
+def make_person(x, head_size):
+    kps = np.zeros((17, 3), dtype=np.float32)
+    kps[1] = [x, 50, 0.9]              # left eye
+    kps[2] = [x + head_size, 50, 0.9]  # right eye
+    return {'bbox': np.array([x - 20, 20, x + 40, 200], dtype=np.float32), 'keypoints': kps, 'conf': 0.9}
+
+def scene(i):
+    """Pairs that meet and part on different schedules, so interactions span checkpoints."""
+    persons = {1: make_person(100, 10), 3: make_person(600, 10)}
+    persons[2] = make_person(130 if (i // 40) % 2 == 0 else 400, 10)
+    persons[4] = make_person(630 if (i // 25) % 3 else 900, 10)
+    return persons
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_frames(self, f, comparator, frames):
+        for i in frames:
+            comparator.record_frame('hybrid', f.process(None, persons=scene(i)))
+
+    def make(self, sink, append=False):
+        return (InteractionFilter(method='hybrid', trigger_frames=30, max_active_pairs=8),
+                Comparator(max_annotations=2, annotation_sink=sink, append=append))
+
+    def test_resume_matches_uninterrupted_run(self):
+        straight_sink = os.path.join(self.tmp.name, 'straight.jsonl')
+        f, straight = self.make(straight_sink)
+        self.run_frames(f, straight, range(300))
+        straight.close_interactions('hybrid', f.active_interactions, 300)
+        expected = list(straight.iter_annotations('hybrid'))
+        self.assertGreater(len(expected), 4)
+
+        sink = os.path.join(self.tmp.name, 'resumed.jsonl')
+        path = os.path.join(self.tmp.name, 'run.ckpt')
+        f, comparator = self.make(sink)
+        checkpointer = Checkpointer(path, interval=130)
+        for i in range(200):  # "Crash" 70 frames after the checkpoint at frame 130
+            comparator.record_frame('hybrid', f.process(None, persons=scene(i)))
+            if checkpointer.due(i + 1):
+                checkpointer.save({'frame': i + 1, 'filter': f.state_dict(), 'comparator': comparator.state_dict()})
+        checkpointer.close()
+
+        state = load_checkpoint(path)
+        self.assertEqual(state['frame'], 130)
+        f, comparator = self.make(sink, append=True)
+        f.load_state_dict(state['filter'])
+        comparator.load_state_dict(state['comparator'])
+        self.run_frames(f, comparator, range(130, 300))
+        comparator.close_interactions('hybrid', f.active_interactions, 300)
+
+        self.assertEqual(list(comparator.iter_annotations('hybrid')), expected)
+        for key in ('overlap_frames', 'interactions', 'triggers', 'flushed_annotations'):
+            self.assertEqual(comparator.stats['hybrid'][key], straight.stats['hybrid'][key], key)
+
+    def test_wrapper_state_resumes_detector_chain(self):
+        scene = SyntheticScene([(10, 0), (0, 0)])
+        def chain():
+            inner = GroundTruthDetector(scene)
+            return inner, build_pose_detector(inner, keyframe_interval=5, gate=MotionGate(threshold=0.0))
+
+        def run(inner, detector, frames):
+            out = []
+            for t in frames:
+                inner.t = t
+                out.append({pid: p['bbox'].tolist() for pid, p in detector.detect(scene.frame(t)).items()})
+            return out
+
+        inner, straight = chain()
+        expected = run(inner, straight, range(12))
+        inner.calls = 0
+        expected += run(inner, straight, range(12, 20))
+        straight_calls = inner.calls
+        inner, detector = chain()
+        run(inner, detector, range(12))
+        state = load_checkpoint(self.save(wrapper_state(detector)))['wrappers']
+
+        inner, resumed = chain()
+        self.assertTrue(load_wrapper_state(resumed, state))
+        self.assertEqual(run(inner, resumed, range(12, 20)), expected[12:])
+        self.assertEqual(inner.calls, straight_calls)  # Gate and keyframe cadence carry over
+        self.assertFalse(load_wrapper_state(build_pose_detector(inner), state))
+
+    def save(self, wrappers):
+        path = os.path.join(self.tmp.name, 'chain.ckpt')
+        checkpointer = Checkpointer(path, interval=1)
+        checkpointer.save({'wrappers': wrappers})
+        checkpointer.close()
+        return path
+
+    def test_atomic_async_write(self):
+        path = os.path.join(self.tmp.name, 'run.ckpt')
+        checkpointer = Checkpointer(path, interval=10)
+        self.assertEqual([n for n in range(1, 31) if checkpointer.due(n)], [10, 20, 30])
+        self.assertIsNone(load_checkpoint(path))
+        for frame in (10, 20):
+            checkpointer.save({'frame': frame, 'blob': np.zeros(1000)})
+        checkpointer.close()
+        self.assertEqual(load_checkpoint(path)['frame'], 20)
+        self.assertEqual(os.listdir(self.tmp.name), ['run.ckpt'])  # No temp files left
+        Checkpointer(path, interval=10).close(remove=True)
+        self.assertFalse(os.path.exists(path))
+
+    def test_segment_path(self):
+        self.assertEqual(segment_path('/data/out.mp4', 3), '/data/out.part0003.mp4')
+
+    def test_reader_seek(self):
+        clip = os.path.join(self.tmp.name, 'clip.avi')
+        out = cv2.VideoWriter(clip, cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+        for i in range(10):
+            out.write(np.full((48, 64, 3), i * 25, dtype=np.uint8))
+        out.release()
+        reader = OpenCVReader(clip)
+        reader.seek(6)
+        ret, frame = reader.read()
+        reader.release()
+        self.assertTrue(ret)
+        self.assertLess(abs(int(frame[24, 32, 0]) - 150), 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from core.comparator import Comparator
+from utils.clip_extractor import ClipExtractor
+
+SIZE = (64, 48)
+
+def frame_for(index):
+    return np.full((SIZE[1], SIZE[0], 3), (index * 20) % 250, dtype=np.uint8)
+
+def read_values(path):
+    cap = cv2.VideoCapture(path)
+    values = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        values.append(int(round(frame.mean())))
+    cap.release()
+    return values
+
+def run(extractor, frames, triggers):
+    for index in range(1, frames + 1):
+        if index in triggers:
+            extractor.trigger(index)
+        extractor.add(frame_for(index), index)
+    return extractor.close()
+
+class TestClipExtractor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def extractor(self):
+        # 10 fps: 2 frames before and 3 after each trigger
+        return ClipExtractor(self.tmp.name, 10, SIZE, pre_sec=0.2, post_sec=0.3)
+
+    def test_clip_covers_pre_and_post_window(self):
+        extractor = self.extractor()
+        paths = run(extractor, 20, {10})
+        self.assertEqual(len(paths), 1)
+        clip = extractor.clips[0]
+        self.assertEqual((clip.start, clip.end), (8, 13))
+        values = read_values(paths[0])
+        self.assertEqual(len(values), 6)
+        # Pre-roll frames come from the ring, in order
+        for value, index in zip(values, range(8, 14)):
+            self.assertAlmostEqual(value, (index * 20) % 250, delta=8)
+
+    def test_jpeg_preroll_over_budget(self):
+        extractor = ClipExtractor(self.tmp.name, 10, SIZE, pre_sec=0.2, post_sec=0.3, max_preroll_mb=0.01)
+        self.assertTrue(extractor.jpeg)
+        paths = run(extractor, 20, {10})
+        values = read_values(paths[0])
+        self.assertEqual(len(values), 6)
+        for value, index in zip(values, range(8, 14)):
+            self.assertAlmostEqual(value, (index * 20) % 250, delta=8)
+
+    def test_overlapping_triggers_merge(self):
+        extractor = self.extractor()
+        paths = run(extractor, 40, {10, 14, 30})
+        self.assertEqual(len(paths), 2)
+        self.assertEqual([(c.start, c.end) for c in extractor.clips], [(8, 17), (28, 33)])
+        self.assertEqual(len(read_values(paths[0])), 10)
+
+    def test_clip_truncated_at_end_of_stream(self):
+        extractor = self.extractor()
+        paths = run(extractor, 8, {1, 6})
+        self.assertEqual(len(paths), 1)
+        self.assertEqual((extractor.clips[0].start, extractor.clips[0].end), (1, 8))
+        self.assertEqual(len(read_values(paths[0])), 8)
+
+    def test_no_triggers_no_clips(self):
+        extractor = self.extractor()
+        self.assertEqual(run(extractor, 15, set()), [])
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_clip_for_and_annotations(self):
+        extractor = self.extractor()
+        comparator = Comparator(clip_lookup=extractor.clip_for)
+        run(extractor, 40, {10, 30})
+        self.assertIsNone(extractor.clip_for(20))
+        comparator.log_interaction('iou', 5, 12, True, trigger_frame=10)
+        comparator.log_interaction('iou', 25, 26, False)
+        comparator.log_interaction('iou', 28, 35, True, trigger_frame=30)
+        annotations = comparator.stats['iou']['annotations']
+        self.assertEqual(annotations[0]['clip_path'], extractor.clips[0].path)
+        self.assertNotIn('clip_path', annotations[1])
+        self.assertEqual(annotations[2]['clip_path'], extractor.clips[1].path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,6 @@
 import unittest
+import io
+from unittest.mock import patch
 from core.comparator import Comparator
 
 class TestComparator(unittest.TestCase):
@@ -18,5 +20,39 @@ class TestComparator(unittest.TestCase):
         self.assertIn('new_method', comparator.stats)
         self.assertEqual(comparator.stats['new_method']['triggers'], 1)
 
+    @patch('sys.stdout', new_callable=io.StringIO)
+    def test_report_compares_methods(self, mock_stdout):
+        comparator = Comparator()
+        comparator.update('hybrid', True, True, True)
+        comparator.update('mde', True, False, False)
+        comparator.print_report()
+        output = mock_stdout.getvalue()
+        self.assertIn('METHOD COMPARISON', output)
+        self.assertIn('METHOD: HYBRID', output)
+        self.assertIn('METHOD: MDE', output)
+        self.assertEqual(comparator.cost_reduction('mde'), 100.0)
+
+    @patch('sys.stdout', new_callable=io.StringIO)
+    def test_latency_percentiles_and_warmup(self, mock_stdout):
+        comparator = Comparator()
+        self.assertIsNone(comparator.latency_percentile(99))
+        comparator.record_latency(0.5)  # Slow first frame
+        for _ in range(98):
+            comparator.record_latency(0.010)
+        comparator.record_latency(0.040)
+        self.assertAlmostEqual(comparator.latency_percentile(50), 0.010, delta=0.001)
+        self.assertAlmostEqual(comparator.latency_percentile(99), 0.040, delta=0.003)
+        self.assertEqual(comparator.latency_percentile(100), 0.5)
+        self.assertEqual(comparator.first_latency, 0.5)
+
+        comparator.set_warmup_stats(1.5, 2)
+        restored = Comparator()
+        restored.load_state_dict(comparator.state_dict())
+        self.assertEqual(restored.latency_percentile(99), comparator.latency_percentile(99))
+        restored.print_report()
+        output = mock_stdout.getvalue()
+        self.assertIn('1.50s (2 input shapes', output)
+        self.assertIn('first frame 500.0ms', output)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,121 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import numpy as np
+from core.interaction_filter import InteractionFilter
+from detectors.depth_prior import DepthPrior, build_prior, save_prior
+from calibrate import is_empty
+
+def ground_plane(h=240, w=320):
+    """Depth growing towards the top of the image, like a floor seen from above."""
+    return np.tile(np.linspace(20.0, 2.0, h, dtype=np.float32)[:, None], (1, w))
+
+class FakeDepthEstimator:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def get_depth_map(self, frame, shared=None):
+        self.calls += 1
+        return np.full(frame.shape[:2], 2.0, dtype=np.float32)
+
+    def get_persons_depth(self, depth_map, bboxes):
+        return np.full(len(bboxes), self.value)
+
+class TestDepthPrior(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "prior.npy")
+        plane = ground_plane()
+        noisy = [plane + 0.01 * i for i in range(5)]
+        noisy[2] = plane.copy()
+        noisy[2][100:200, 100:150] = 99  # A passer-by in one frame drops out of the median
+        save_prior(self.path, build_prior(noisy))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_prior_is_median_and_memory_mapped(self):
+        prior = DepthPrior(self.path)
+        self.assertIsInstance(prior.depth, np.memmap)
+        np.testing.assert_allclose(prior.depth, ground_plane(), atol=0.03)
+
+    def test_foot_point_lookup(self):
+        prior = DepthPrior(self.path)
+        # Frame at twice the prior resolution: foot points are scaled into the prior
+        depths, reliable = prior.lookup([[100, 100, 140, 300], [400, 50, 440, 150]], (480, 640))
+        np.testing.assert_allclose(depths, [prior.depth[150, 60], prior.depth[75, 210]])
+        self.assertTrue(reliable.all())
+
+    def test_unreliable_foot_points(self):
+        prior = DepthPrior(self.path)
+        boxes = [[0, 200, 40, 240],  # Cut off by the frame bottom
+                 [100, 50, 140, 150],  # Feet hidden behind the next person
+                 [90, 80, 150, 200]]
+        depths, reliable = prior.lookup(boxes, (240, 320))
+        self.assertEqual(reliable.tolist(), [False, False, True])
+        self.assertEqual((prior.lookups, prior.fallbacks), (3, 2))
+
+    def test_depth_edge_is_ambiguous(self):
+        edge = ground_plane()
+        edge[:, 160:] *= 2  # e.g. a ledge
+        save_prior(self.path, edge)
+        depths, reliable = DepthPrior(self.path).lookup([[140, 50, 180, 150], [40, 50, 80, 150]], (240, 320))
+        self.assertEqual(reliable.tolist(), [False, True])
+
+    def test_align_scales_live_depth_to_prior(self):
+        prior = DepthPrior(self.path)
+        live = ground_plane() * 0.5
+        self.assertAlmostEqual(prior.align(live), 2.0, delta=0.02)
+
+    def test_prior_method(self):
+        prior = DepthPrior(self.path)
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        persons = {1: {'bbox': np.array([100, 60, 140, 160]), 'keypoints': None, 'conf': 0.9},
+                   2: {'bbox': np.array([130, 62, 170, 162]), 'keypoints': None, 'conf': 0.9},
+                   3: {'bbox': np.array([280, 100, 320, 239]), 'keypoints': None, 'conf': 0.9}}
+        estimator = FakeDepthEstimator(value=1000.0)
+        interaction_filter = InteractionFilter(method='prior', depth_prior=prior, depth_estimator=estimator)
+        results = interaction_filter.process(frame, persons=persons)
+        self.assertEqual(results['interactions'], {frozenset([1, 2])})
+        self.assertEqual(estimator.calls, 0)  # Nobody in an overlap needed a fallback
+
+        # Person 3's feet are cut off: live depth, rescaled onto the prior
+        persons[2]['bbox'] = np.array([270, 90, 310, 190])
+        results = interaction_filter.process(frame, persons=persons)
+        self.assertEqual(estimator.calls, 1)
+        self.assertAlmostEqual(results['z_metrics'][3], 1000.0 * prior.align(np.full((240, 320), 2.0)), places=3)
+
+        with self.assertRaises(ValueError):
+            InteractionFilter(method='prior')
+
+class TestCalibrationSampling(unittest.TestCase):
+    def setUp(self):
+        # Ultralytics is optional here; the test only exercises how results are read
+        with patch.dict(sys.modules, {'ultralytics': MagicMock()}):
+            sys.modules.pop('detectors.pose_detector', None)
+            from detectors.pose_detector import PersonDetector
+            with patch('builtins.print'):
+                self.detector = PersonDetector()
+        sys.modules.pop('detectors.pose_detector', None)
+
+    def test_person_on_a_sparse_sample_is_rejected(self):
+        # A tracker seeing a person for the first time holds the track back (no ids)
+        unconfirmed, found = MagicMock(), MagicMock()
+        unconfirmed.boxes.id = None
+        found.boxes.__len__.return_value = 1
+        self.detector.model.track.return_value = [unconfirmed]
+        self.detector.model.predict.return_value = [found]
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        self.assertEqual(self.detector.detect(frame), {})
+        self.assertFalse(is_empty(self.detector, frame))
+        self.assertEqual(self.detector.model.predict.call_args.kwargs['classes'], [0])
+
+        found.boxes.__len__.return_value = 0
+        self.assertTrue(is_empty(self.detector, frame))
+        self.assertTrue(is_empty(None, frame))
+
+if __name__ == '__main__':
+    unittest.main()
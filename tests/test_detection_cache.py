@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from detectors.chain import build_pose_detector
+from detectors.detection_cache import DetectionCache, CachedPoseDetector, detection_config, file_digest
+from detectors.motion_gate import MotionGate
+
+def make_persons(frame_index):
+    kps = np.full((17, 3), 0.9, dtype=np.float32)
+    return {
+        1: {'bbox': np.array([10, 10, 50, 100], dtype=np.float32) + frame_index, 'keypoints': kps, 'conf': 0.9},
+        7: {'bbox': np.array([40, 10, 80, 100], dtype=np.float32), 'keypoints': kps, 'conf': 0.8},
+    }
+
+class TestDetectionCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.video = os.path.join(self.tmp, 'clip.mp4')
+        self.model = os.path.join(self.tmp, 'pose.pt')
+        with open(self.video, 'wb') as f:
+            f.write(b'video-bytes')
+        with open(self.model, 'wb') as f:
+            f.write(b'weights-v1')
+        self.cache = DetectionCache(os.path.join(self.tmp, 'cache'), max_bytes=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _record(self, frames=5):
+        writer = self.cache.writer(self.video, 25.0, model_path=self.model)
+        for i in range(frames):
+            persons = make_persons(i) if i != 2 else {}
+            writer.append(persons, depths={1: 0.5} if persons else None)
+        writer.close()
+
+    def test_round_trip(self):
+        self.assertIsNone(self.cache.lookup(self.video, model_path=self.model))
+        self._record()
+
+        cached = self.cache.lookup(self.video, model_path=self.model)
+        self.assertIsNotNone(cached)
+        self.assertEqual(len(cached), 5)
+        self.assertEqual(cached.fps, 25.0)
+
+        persons = cached.persons(3)
+        self.assertEqual(sorted(persons), [1, 7])
+        np.testing.assert_allclose(persons[1]['bbox'], [13, 13, 53, 103])
+        self.assertEqual(persons[1]['keypoints'].shape, (17, 3))
+        self.assertAlmostEqual(persons[1]['depth'], 0.5)
+        self.assertNotIn('depth', persons[7])
+        self.assertEqual(cached.persons(2), {})
+
+    def test_precomputed_video_digest(self):
+        digest = file_digest(self.video)
+        writer = self.cache.writer(self.video, 25.0, model_path=self.model, video_digest=digest)
+        writer.append(make_persons(0))
+        writer.close()
+        # The video itself is not read again when its digest is passed in
+        os.remove(self.video)
+        cached = self.cache.lookup(self.video, model_path=self.model, video_digest=digest)
+        self.assertIsNotNone(cached)
+        self.assertEqual(cached.meta['video_digest'], digest)
+
+    def test_replay_detector(self):
+        self._record(frames=3)
+        detector = CachedPoseDetector(self.cache.lookup(self.video, model_path=self.model))
+        self.assertEqual(len(detector.detect(None)), 2)
+        self.assertEqual(len(detector.detect(None)), 2)
+        self.assertEqual(detector.detect(None), {})
+        self.assertEqual(detector.detect(None), {}) # past the end
+
+    def test_gated_replay_stays_in_frame_order(self):
+        self._record(frames=5)
+        detector = build_pose_detector(CachedPoseDetector(self.cache.lookup(self.video, model_path=self.model)),
+                                       gate=MotionGate(threshold=0.01, refresh_interval=100))
+        static = np.zeros((48, 64, 3), dtype=np.uint8)  # A gate would skip every frame after the first
+        for i in range(5):
+            persons = detector.detect(static)
+            expected = make_persons(i) if i != 2 else {}
+            self.assertEqual(sorted(persons), sorted(expected))
+            if i != 2:
+                np.testing.assert_allclose(persons[1]['bbox'], expected[1]['bbox'])
+
+    def test_detection_settings_are_part_of_the_key(self):
+        self._record()
+        roi = detection_config(polygons=["0,0 64,0 0,48"])
+        self.assertIsNone(self.cache.lookup(self.video, model_path=self.model, settings=roi))
+        self.assertIsNone(self.cache.lookup(self.video, model_path=self.model, settings=detection_config(decode_width=32)))
+        self.assertIsNotNone(self.cache.lookup(self.video, model_path=self.model, settings=detection_config()))
+
+        writer = self.cache.writer(self.video, 25.0, model_path=self.model, settings=roi)
+        writer.append({})
+        writer.close()
+        cached = self.cache.lookup(self.video, model_path=self.model, settings=roi)
+        self.assertEqual((len(cached), cached.meta['settings']['roi']), (1, ["0,0 64,0 0,48"]))
+        # Any settings: the most recently used entry
+        self.assertEqual(len(self.cache.lookup(self.video, model_path=self.model, settings='any')), 1)
+
+    def test_weights_change_invalidates(self):
+        self._record()
+        with open(self.model, 'wb') as f:
+            f.write(b'weights-v2')
+        self.assertIsNone(self.cache.lookup(self.video, model_path=self.model))
+        self.assertEqual(self.cache.entries(), [])
+
+    def test_lru_eviction(self):
+        self._record()
+        other_video = os.path.join(self.tmp, 'other.mp4')
+        with open(other_video, 'wb') as f:
+            f.write(b'other-bytes')
+        self.cache.max_bytes = 1 # Only the newest entry survives
+        writer = self.cache.writer(other_video, 25.0, model_path=self.model)
+        writer.append(make_persons(0))
+        writer.close()
+
+        self.assertIsNone(self.cache.lookup(self.video, model_path=self.model))
+        self.assertIsNotNone(self.cache.lookup(other_video, model_path=self.model))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+import unittest
+from core.evaluation import (load_labels, match_intervals, pareto_front, triggered_intervals, discover_dataset,
+                             aggregate_runs, recall_regressions)
+
+class TestEvaluation(unittest.TestCase):
+    def test_match_intervals(self):
+        labels = [(10, 20), (50, 60), (100, 120)]
+        predicted = [(0, 5), (18, 30), (55, 56), (200, 210)]
+        match = match_intervals(predicted, labels)
+        self.assertEqual(match['tp'], 2)
+        self.assertEqual(match['fp'], 2)
+        self.assertEqual(match['recalled'], 2)
+        self.assertEqual(match['fn'], 1)
+        self.assertAlmostEqual(match['recall'], 2 / 3)
+        self.assertAlmostEqual(match['precision'], 0.5)
+
+    def test_long_interval_covers_later_labels(self):
+        # An early, long prediction must still match labels that start after shorter ones
+        match = match_intervals([(0, 100), (10, 12)], [(50, 60), (90, 95)])
+        self.assertEqual(match['recalled'], 2)
+
+    def test_empty_inputs(self):
+        self.assertEqual(match_intervals([], [(1, 2)])['recall'], 0.0)
+        self.assertEqual(match_intervals([(1, 2)], [])['precision'], 0.0)
+
+    def test_triggered_intervals(self):
+        annotations = [
+            {'start_frame': 1, 'end_frame': 5, 'triggered': False},
+            {'start_frame': 8, 'end_frame': 90, 'triggered': True, 'trigger_frame': 68},
+        ]
+        self.assertEqual(triggered_intervals(annotations), [(8, 90)])
+
+    def test_pareto_front(self):
+        rows = [
+            {'triggers': 5, 'recall': 0.5},
+            {'triggers': 3, 'recall': 0.5},
+            {'triggers': 8, 'recall': 0.9},
+            {'triggers': 9, 'recall': 0.8},
+            {'triggers': 1, 'recall': 0.1},
+        ]
+        front = pareto_front(rows)
+        self.assertEqual([(r['triggers'], r['recall']) for r in front], [(1, 0.1), (3, 0.5), (8, 0.9)])
+
+    def test_load_labels_seconds(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump({'unit': 'seconds', 'intervals': [[1.0, 2.5]]}, f)
+        try:
+            self.assertEqual(load_labels(f.name, fps=30), [(30, 75)])
+        finally:
+            os.remove(f.name)
+
+    def test_discover_dataset(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ['a.mp4', 'a.json', 'b.MOV', 'b.json', 'c.mp4', 'notes.txt']:
+                open(os.path.join(tmp, name), 'w').close()
+            labelled, unlabelled = discover_dataset(tmp)
+        self.assertEqual([os.path.basename(v) for v, _ in labelled], ['a.mp4', 'b.MOV'])
+        self.assertEqual([os.path.basename(v) for v in unlabelled], ['c.mp4'])
+
+    def test_aggregate_runs(self):
+        runs = [
+            {'method': 'hybrid', 'frames': 1800, 'fps': 30.0, 'duration_sec': 30.0, 'triggers': 3, 'tp': 2, 'fp': 1, 'recalled': 2, 'labels': 2},
+            {'method': 'hybrid', 'frames': 1800, 'fps': 30.0, 'duration_sec': 90.0, 'triggers': 1, 'tp': 1, 'fp': 0, 'recalled': 1, 'labels': 2},
+            {'method': 'mde', 'frames': 1800, 'fps': 30.0, 'duration_sec': 60.0, 'triggers': 0, 'tp': 0, 'fp': 0, 'recalled': 0, 'labels': 2},
+        ]
+        rows = {row['method']: row for row in aggregate_runs(runs)}
+        hybrid = rows['hybrid']
+        self.assertEqual((hybrid['videos'], hybrid['labels']), (2, 4))
+        self.assertAlmostEqual(hybrid['recall'], 0.75)
+        self.assertAlmostEqual(hybrid['precision'], 0.75)
+        self.assertAlmostEqual(hybrid['triggers_per_hour'], 4 / (120 / 3600))
+        self.assertAlmostEqual(hybrid['fps'], 3600 / 120)
+        self.assertEqual(rows['mde']['precision'], 0.0)
+
+        baseline = [{'method': 'hybrid', 'recall': 0.8}, {'method': 'mde', 'recall': 0.0}]
+        self.assertEqual(recall_regressions(list(rows.values()), baseline), [('hybrid', 0.8, 0.75)])
+        self.assertEqual(recall_regressions(list(rows.values()), baseline, tolerance=0.1), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import cv2
+import numpy as np
+import torch
+import config
+from utils.frame_buffer import FrameRing, Letterbox, SharedInput, PAD_VALUE, bucket_shape
+
+class TestFrameRing(unittest.TestCase):
+    def test_decode_reuses_buffers(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'clip.mp4')
+            out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 30, (64, 48))
+            for i in range(5):
+                out.write(np.full((48, 64, 3), i * 40, dtype=np.uint8))
+            out.release()
+
+            cap = cv2.VideoCapture(path)
+            ring = FrameRing(48, 64, size=2)
+            frames = []
+            while True:
+                ret, frame = ring.read(cap)
+                if not ret:
+                    break
+                frames.append(frame)
+            cap.release()
+
+        self.assertEqual(len(frames), 5)
+        for i, frame in enumerate(frames):
+            self.assertTrue(np.shares_memory(frame, ring.buffers[i % 2]))
+
+class TestSharedInput(unittest.TestCase):
+    def test_letterbox_geometry(self):
+        box = Letterbox((1080, 1920), (448, 896))
+        self.assertEqual((box.new_h, box.new_w), (448, 796))
+        self.assertEqual((box.pad_y, box.pad_x), (0, 50))
+        xy = np.array([[50.0, 0.0], [846.0, 448.0]])
+        np.testing.assert_allclose(box.to_frame(xy), [[0, 0], [1920, 1080]], atol=1)
+
+    def test_resize_shared_within_frame(self):
+        shared = SharedInput()
+        frame = np.random.randint(0, 255, (120, 200, 3), dtype=np.uint8)
+        shared.set_frame(frame)
+        first, box = shared.letterboxed((64, 64))
+        second, _ = shared.letterboxed((64, 64))
+        self.assertIs(first, second)
+        self.assertTrue((first[:box.pad_y] == PAD_VALUE).all())
+
+        # The next frame reuses the same buffer with new content
+        shared.set_frame(np.zeros_like(frame))
+        third, _ = shared.letterboxed((64, 64))
+        self.assertIs(third, first)
+        self.assertEqual(int(box.content(third.transpose(2, 0, 1)).max()), 0)
+
+    def test_bucket_shape(self):
+        buckets = [(448, 896), (448, 672), (672, 672), (672, 448)]
+        self.assertEqual(bucket_shape(1080, 1920, buckets), (448, 896))
+        self.assertEqual(bucket_shape(480, 640, buckets), (448, 672))
+        self.assertEqual(bucket_shape(720, 720, buckets), (672, 672))
+        self.assertEqual(bucket_shape(1920, 1080, buckets), (672, 448))
+
+    def test_native_shape_is_zero_copy(self):
+        shared = SharedInput()
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        shared.set_frame(frame)
+        image, _ = shared.letterboxed((48, 64))
+        self.assertIs(image, frame)
+
+class TestDepthPreprocessing(unittest.TestCase):
+    def setUp(self):
+        # DepthAnything is optional here; the test only exercises our preprocessing
+        modules = {'depth_anything_v2': MagicMock(), 'depth_anything_v2.dpt': MagicMock()}
+        with patch.dict(sys.modules, modules):
+            sys.modules.pop('detectors.depth_estimator', None)
+            from detectors.depth_estimator import DepthEstimator
+            with patch('builtins.print'):
+                self.estimator = DepthEstimator()
+        sys.modules.pop('detectors.depth_estimator', None)
+
+    def test_input_shape_matches_infer_image(self):
+        self.assertEqual(self.estimator.input_shape(1080, 1920), (518, 924))
+        self.assertEqual(self.estimator.input_shape(518, 518), (518, 518))
+
+    def test_buckets_and_warmup(self):
+        with patch.object(config, 'SHAPE_BUCKETING', True):
+            self.assertEqual(self.estimator.input_shape(1080, 1920), (448, 896))
+            self.assertEqual(self.estimator.input_shape(720, 1280), (448, 896))
+            self.estimator.model = MagicMock()
+            self.estimator.warmup([(1080, 1920), (720, 1280), (480, 480)], passes=2)
+        # Two cameras share one bucket: two shapes warmed, two passes each
+        shapes = [tuple(call.args[0].shape) for call in self.estimator.model.forward.call_args_list]
+        self.assertEqual(shapes, [(1, 3, 448, 896)] * 2 + [(1, 3, 672, 672)] * 2)
+        self.assertIn((448, 896, 3), self.estimator._rgb_buffers)
+
+    def test_depth_map_matches_reference(self):
+        # Stand-in model: "depth" is the normalised red channel
+        self.estimator.model = MagicMock()
+        self.estimator.model.forward.side_effect = lambda x: x[:, 0]
+
+        frame = np.random.randint(0, 255, (90, 160, 3), dtype=np.uint8)
+        depth = self.estimator.get_depth_map(frame)
+        self.assertEqual(depth.shape, (90, 160))
+
+        # Reference: infer_image style float preprocessing on the red channel
+        h, w = self.estimator.input_shape(90, 160)
+        red = cv2.resize(frame[..., 2] / 255.0, (w, h), interpolation=cv2.INTER_CUBIC)
+        red = (red - 0.485) / 0.229
+        ref = torch.nn.functional.interpolate(torch.from_numpy(red)[None, None].float(), (90, 160),
+                                              mode="bilinear", align_corners=True)[0, 0].numpy()
+        self.assertLess(np.abs(depth - ref).mean(), 0.05)
+
+    def reference_depth(self, frame):
+        """infer_image preprocessing with the red-channel stand-in model."""
+        h, w = self.estimator.input_shape(*frame.shape[:2])
+        red = (cv2.resize(frame[..., 2] / 255.0, (w, h), interpolation=cv2.INTER_CUBIC) - 0.485) / 0.229
+        return torch.nn.functional.interpolate(torch.from_numpy(red)[None, None].float(), frame.shape[:2],
+                                               mode="bilinear", align_corners=True)[0, 0].numpy()
+
+    def test_downscaled_depth_matches_infer_image(self):
+        self.estimator.model = MagicMock()
+        self.estimator.model.forward.side_effect = lambda x: x[:, 0]
+        # Scene-like content: smooth shading plus fine texture, shrunk to 518 px
+        rng = np.random.default_rng(0)
+        ramp = np.linspace(0, 200, 1280, dtype=np.float32)[None, :, None]
+        texture = cv2.GaussianBlur(rng.integers(0, 55, (720, 1280, 3)).astype(np.float32), (0, 0), 2)
+        frame = (ramp + texture).astype(np.uint8)
+        ref = self.reference_depth(frame)
+
+        # Default: the depth model's own resize, as infer_image does it
+        self.assertLess(np.abs(self.estimator.get_depth_map(frame) - ref).max(), 0.05)
+        # Shared letterbox (INTER_AREA, padding cropped back out) stays close to it
+        with patch.object(config, 'INFERENCE_SHAPE', (448, 896)):
+            diff = np.abs(self.estimator.get_depth_map(frame) - ref)
+        self.assertLess(diff.mean(), 0.01)
+        self.assertLess(diff.max(), 0.1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
-from utils.geometry import bboxes_overlap, get_bbox_center
+import numpy as np
+from utils.geometry import bboxes_overlap, get_bbox_center, overlapping_pairs, box_depths, box_iou
 
 class TestGeometry(unittest.TestCase):
     def test_bboxes_overlap(self):
@@ -24,5 +25,34 @@ class TestGeometry(unittest.TestCase):
         bb = [0, 0, 10, 10]
         self.assertEqual(get_bbox_center(bb), (5, 5))
 
+    def test_overlapping_pairs_matches_pairwise(self):
+        rng = np.random.default_rng(0)
+        xy = rng.uniform(0, 500, (30, 2))
+        boxes = np.hstack([xy, xy + rng.uniform(10, 80, (30, 2))]).round()
+        expected = [(i, j) for i in range(30) for j in range(i + 1, 30) if bboxes_overlap(boxes[i], boxes[j])]
+        self.assertEqual(overlapping_pairs(boxes), expected)
+        self.assertEqual(overlapping_pairs([[0, 0, 10, 10], [10, 0, 20, 10]]), [(0, 1)])  # Touching
+        self.assertEqual(overlapping_pairs(np.zeros((0, 4))), [])
+
+    def test_box_iou(self):
+        iou = box_iou([[0, 0, 10, 10], [0, 0, 20, 10]], [[0, 0, 10, 10], [5, 0, 15, 10], [30, 30, 40, 40]])
+        np.testing.assert_allclose(iou, [[1.0, 1 / 3, 0.0], [0.5, 0.5, 0.0]])
+        self.assertEqual(box_iou(np.zeros((0, 4)), [[0, 0, 1, 1]]).shape, (0, 1))
+
+    def test_box_depths(self):
+        depth = np.random.default_rng(1).uniform(0, 10, (120, 160)).astype(np.float32)
+        boxes = [[10, 20, 50, 90], [-5, -5, 30.7, 40.2], [150, 100, 200, 200], [300, 0, 320, 10]]
+        medians = box_depths(depth, boxes, stat='median')
+        means = box_depths(depth, boxes, stat='mean')
+        for box, median, mean in zip(boxes[:3], medians, means):
+            x1, y1, x2, y2 = (max(0, int(v)) for v in box)
+            roi = depth[y1:y2, x1:x2]
+            self.assertAlmostEqual(median, np.median(roi), places=5)
+            self.assertAlmostEqual(mean, roi.mean(), places=4)
+        self.assertEqual(medians[3], 0.0)  # Outside the map
+        self.assertEqual(means[3], 0.0)
+        with self.assertRaises(ValueError):
+            box_depths(depth, boxes, stat='mode')
+
 if __name__ == '__main__':
     unittest.main()
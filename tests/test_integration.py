@@ -1,34 +1,19 @@
 import sys
 import unittest
 from unittest.mock import MagicMock
+import numpy as np
 
-# Mock dependencies before importing local modules
-sys.modules['torch'] = MagicMock()
-sys.modules['ultralytics'] = MagicMock()
-sys.modules['cv2'] = MagicMock()
-sys.modules['depth_anything_v2'] = MagicMock()
-sys.modules['depth_anything_v2.dpt'] = MagicMock()
+# Mock dependencies while importing the filter, then restore sys.modules so
+# test modules collected after this one still see the real libraries.
+_MOCKED_MODULES = ['torch', 'ultralytics', 'cv2', 'depth_anything_v2', 'depth_anything_v2.dpt',
+                   'networkx', 'scipy', 'scipy.spatial']
+_saved_modules = {name: sys.modules.get(name) for name in _MOCKED_MODULES + ['core.interaction_filter']}
+for name in _MOCKED_MODULES:
+    sys.modules[name] = MagicMock()
 
-# Mock networkx specifically to handle logic
-nx_mock = MagicMock()
-sys.modules['networkx'] = nx_mock
-
-sys.modules['scipy'] = MagicMock()
-sys.modules['scipy.spatial'] = MagicMock()
-
-import config
-import numpy as np # Restore numpy
-
-
-# Mock dependencies before importing local modules
-sys.modules['torch'] = MagicMock()
-sys.modules['ultralytics'] = MagicMock()
-sys.modules['cv2'] = MagicMock()
-sys.modules['depth_anything_v2'] = MagicMock()
-sys.modules['depth_anything_v2.dpt'] = MagicMock()
-sys.modules['networkx'] = MagicMock()
-sys.modules['scipy'] = MagicMock()
-sys.modules['scipy.spatial'] = MagicMock()
+# Mock networkx and scipy specifically to handle logic
+nx_mock = sys.modules['networkx']
+spatial_mock = sys.modules['scipy.spatial']
 
 import config
 # Mock config.DEVICE manually since config import might have failed or used mocked torch
@@ -39,10 +24,18 @@ config.FRAME_INTERVAL = 1
 config.Z_PLANE_DEPTH_DIFF_THRESHOLD = 0.1
 config.Z_PLANE_RATIO_THRESHOLD = 1.3
 
+# Fresh import so the filter binds to the mocks even if another test imported it first
+sys.modules.pop('core.interaction_filter', None)
 from core.interaction_filter import InteractionFilter
 
+for name, module in _saved_modules.items():
+    if module is None:
+        sys.modules.pop(name, None)
+    else:
+        sys.modules[name] = module
+
 class MockPoseDetector:
-    def detect(self, frame):
+    def detect(self, frame, shared=None):
         # Return synthetic persons
         # Scenario: Two people overlapping
         return {
@@ -51,18 +44,22 @@ class MockPoseDetector:
         }
 
 class MockDepthEstimator:
-    def get_depth_map(self, frame):
+    def get_depth_map(self, frame, shared=None):
         return np.ones((500, 500)) * 0.5 # Flat depth
         
     def get_person_depth(self, depth_map, bbox):
         return 0.5
 
+    def get_persons_depth(self, depth_map, bboxes):
+        self.queried = getattr(self, 'queried', 0) + len(bboxes)
+        return np.full(len(bboxes), 0.5)
+
 class TestIntegration(unittest.TestCase):
     def test_interaction_trigger(self):
         # Setup specific mock behavior for networkx
         # We need connected_components to return a list of sets of IDs
         # Scenario: ID 1 and 2 are connected
-        import networkx as nx # This gets the mock
+        nx = nx_mock
         nx.connected_components.return_value = [{1, 2}]
         nx.Graph.return_value.add_nodes_from = MagicMock()
         nx.Graph.return_value.add_edge = MagicMock()
@@ -71,7 +68,7 @@ class TestIntegration(unittest.TestCase):
         # InteractionFilter imports 'distance' from scipy.spatial
         # We need to make sure distance.euclidean returns a number
         # Since we mocked sys.modules['scipy.spatial'], getting it from there:
-        dist_mock = sys.modules['scipy.spatial'].distance
+        dist_mock = spatial_mock.distance
         dist_mock.euclidean.return_value = 10.0
 
         pose_mock = MockPoseDetector()
@@ -102,5 +99,71 @@ class TestIntegration(unittest.TestCase):
         
         self.assertTrue(triggered_mde, "MDE method should trigger on same depth")
 
+    def test_shared_detection_across_methods(self):
+        nx_mock.connected_components.return_value = [{1, 2}]
+        spatial_mock.distance.euclidean.return_value = 10.0
+
+        class CountingPoseDetector(MockPoseDetector):
+            calls = 0
+            def detect(self, frame, shared=None):
+                CountingPoseDetector.calls += 1
+                return super().detect(frame)
+
+        pose_mock = CountingPoseDetector()
+        filters = {
+            'hybrid': InteractionFilter(method='hybrid', pose_detector=pose_mock),
+            'mde': InteractionFilter(method='mde', pose_detector=pose_mock, depth_estimator=MockDepthEstimator()),
+        }
+        frame = np.zeros((500, 500, 3), dtype=np.uint8)
+
+        triggered = {method: False for method in filters}
+        for _ in range(70):
+            persons = pose_mock.detect(frame)
+            for method, f in filters.items():
+                res = f.process(frame, persons=persons)
+                triggered[method] |= res['triggers'] > 0
+
+        # One pose pass per frame, independent temporal state per method
+        self.assertEqual(CountingPoseDetector.calls, 70)
+        self.assertTrue(all(triggered.values()))
+        self.assertEqual(filters['hybrid'].frame_count, 70)
+        self.assertEqual(filters['mde'].frame_count, 70)
+
+    def test_mde_uses_cached_depth(self):
+        nx_mock.connected_components.return_value = [{1, 2}]
+
+        persons = MockPoseDetector().detect(None)
+        for person in persons.values():
+            person['depth'] = 0.5
+
+        # No depth estimator: replayed depths must be enough
+        f = InteractionFilter(method='mde', pose_detector=None, depth_estimator=None)
+        res = f.process(None, persons=persons)
+        self.assertEqual(res['z_metrics'], {1: 0.5, 2: 0.5})
+        self.assertEqual(len(res['interactions']), 1)
+
+    def test_mde_depth_only_for_overlapping_persons(self):
+        nx_mock.connected_components.return_value = [{1, 2}]
+        persons = MockPoseDetector().detect(None)
+        persons[3] = {'bbox': [400, 100, 450, 300], 'keypoints': np.ones((17, 3)), 'conf': 0.9}
+
+        class CountingDepthEstimator(MockDepthEstimator):
+            maps = 0
+            def get_depth_map(self, frame, shared=None):
+                CountingDepthEstimator.maps += 1
+                return super().get_depth_map(frame)
+
+        depth = CountingDepthEstimator()
+        f = InteractionFilter(method='mde', pose_detector=None, depth_estimator=depth)
+        res = f.process(None, persons=persons)
+        self.assertEqual(depth.queried, 2)  # Isolated person 3 gets no depth
+        self.assertEqual(set(res['z_metrics']), {1, 2})
+        self.assertEqual(res['overlaps'], {frozenset([1, 2])})
+
+        # Nobody overlaps: the depth model does not run at all
+        res = f.process(None, persons={1: persons[1], 3: persons[3]})
+        self.assertEqual(CountingDepthEstimator.maps, 1)
+        self.assertEqual(res['z_metrics'], {})
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import cv2
+import numpy as np
+from detectors.keyframe_tracker import KeyframePoseDetector
+
+rng = np.random.default_rng(0)
+BACKGROUND = cv2.GaussianBlur(rng.integers(0, 255, (360, 640, 3), dtype=np.uint8), (5, 5), 0)
+TEXTURES = [cv2.GaussianBlur(rng.integers(0, 255, (160, 60, 3), dtype=np.uint8), (3, 3), 0) for _ in range(3)]
+
+class SyntheticScene:
+    """Textured 'people' sliding over a textured background, with exact ground truth."""
+    def __init__(self, velocities):
+        self.velocities = velocities
+        self.texture_ids = list(range(len(velocities)))
+
+    def boxes(self, t):
+        return {pid: np.array([40 + 200 * pid + vx * t, 60 + vy * t, 100 + 200 * pid + vx * t, 220 + vy * t], dtype=np.float32)
+                for pid, (vx, vy) in enumerate(self.velocities)}
+
+    def frame(self, t):
+        frame = BACKGROUND.copy()
+        for pid, box in self.boxes(t).items():
+            x1, y1 = int(round(box[0])), int(round(box[1]))
+            frame[y1:y1 + 160, x1:x1 + 60] = TEXTURES[self.texture_ids[pid]]
+        return frame
+
+    def persons(self, t):
+        persons = {}
+        for pid, box in self.boxes(t).items():
+            kps = np.zeros((17, 3), dtype=np.float32)
+            kps[0] = [box[0] + 30, box[1] + 20, 0.9]  # nose
+            kps[1] = [box[0] + 22, box[1] + 12, 0.9]  # eyes
+            kps[2] = [box[0] + 38, box[1] + 12, 0.9]
+            persons[pid] = {'bbox': box, 'keypoints': kps, 'conf': 0.9}
+        return persons
+
+class GroundTruthDetector:
+    def __init__(self, scene):
+        self.scene = scene
+        self.t = 0
+        self.calls = 0
+
+    def detect(self, frame, shared=None):
+        self.calls += 1
+        return self.scene.persons(self.t)
+
+class TestKeyframeTracker(unittest.TestCase):
+    def run_scene(self, scene, frames, interval, events=None):
+        detector = GroundTruthDetector(scene)
+        tracker = KeyframePoseDetector(detector, interval=interval)
+        errors = []
+        for t in range(frames):
+            if events and t in events:
+                events[t](scene)
+            detector.t = t
+            persons = tracker.detect(scene.frame(t))
+            truth = scene.persons(t)
+            for pid, person in persons.items():
+                errors.append(np.abs(person['bbox'] - truth[pid]['bbox']).max())
+                errors.append(np.abs(person['keypoints'][:3, :2] - truth[pid]['keypoints'][:3, :2]).max())
+        return detector, tracker, np.array(errors)
+
+    def test_drift_bounded_between_keyframes(self):
+        scene = SyntheticScene([(3, 0), (-2, 1)])
+        detector, tracker, errors = self.run_scene(scene, frames=24, interval=6)
+
+        # Model ran only on keyframes, yet interpolated boxes stay within a couple of pixels
+        self.assertEqual(detector.calls, 4)
+        self.assertLess(errors.mean(), 1.0)
+        self.assertLess(errors.max(), 3.0)
+
+    def test_lost_track_forces_redetection(self):
+        scene = SyntheticScene([(3, 0), (0, 0)])
+
+        def swap_texture(s):
+            s.texture_ids[0] = 2  # Appearance change the flow cannot follow
+
+        detector, tracker, errors = self.run_scene(scene, frames=12, interval=20, events={5: swap_texture})
+        self.assertGreaterEqual(tracker.redetections, 1)
+        self.assertEqual(detector.calls, 1 + tracker.redetections)
+        self.assertLess(errors.max(), 3.0)
+
+if __name__ == '__main__':
+    unittest.main()
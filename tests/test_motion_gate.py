@@ -0,0 +1,57 @@
+import io
+import unittest
+from unittest.mock import patch
+import numpy as np
+from core.comparator import Comparator
+from detectors.motion_gate import MotionGate, GatedPoseDetector
+
+class CountingDetector:
+    def __init__(self):
+        self.calls = 0
+
+    def detect(self, frame, shared=None):
+        self.calls += 1
+        return {self.calls: {'bbox': [0, 0, 10, 10]}}
+
+def corridor(person_x=None):
+    frame = np.full((360, 640, 3), 80, dtype=np.uint8)
+    frame[:, ::32] = 200  # Static texture
+    if person_x is not None:
+        frame[100:300, person_x:person_x + 60] = 20
+    return frame
+
+class TestMotionGate(unittest.TestCase):
+    def test_static_scene_is_skipped(self):
+        gate = MotionGate(threshold=0.01, refresh_interval=1000)
+        self.assertTrue(gate.should_detect(corridor()))  # First frame always detects
+        noisy = corridor().astype(np.int16) + np.random.default_rng(0).integers(-3, 4, (360, 640, 3))
+        self.assertFalse(gate.should_detect(noisy.clip(0, 255).astype(np.uint8)))
+        self.assertTrue(gate.should_detect(corridor(person_x=300)))
+
+    def test_forced_refresh(self):
+        gate = MotionGate(threshold=0.01, refresh_interval=5)
+        decisions = [gate.should_detect(corridor()) for _ in range(11)]
+        self.assertEqual([i for i, d in enumerate(decisions) if d], [0, 5, 10])
+
+    def test_gated_detector_carries_detections_forward(self):
+        detector = CountingDetector()
+        gated = GatedPoseDetector(detector, MotionGate(threshold=0.01, refresh_interval=100))
+        frames = [corridor()] * 10 + [corridor(person_x=x) for x in range(100, 400, 60)]
+        results = [gated.detect(frame) for frame in frames]
+
+        self.assertEqual(detector.calls, 1 + 5)
+        self.assertEqual(gated.skipped, 9)
+        self.assertIs(results[5], results[0])  # Skipped frames reuse the previous detections
+
+    @patch('sys.stdout', new_callable=io.StringIO)
+    def test_report_shows_saved_calls(self, mock_stdout):
+        comparator = Comparator()
+        comparator.update('hybrid', True, False, False)
+        comparator.set_inference_stats(frames=100, inference_calls=25)
+        comparator.print_report()
+        output = mock_stdout.getvalue()
+        self.assertIn('Saved Inference Calls', output)
+        self.assertIn('75 (75.0%)', output)
+
+if __name__ == '__main__':
+    unittest.main()
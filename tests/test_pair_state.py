@@ -0,0 +1,210 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from core.comparator import Comparator
+from core.interaction_filter import InteractionFilter
+from core.pair_state import PairStateTable, TrackStateTable
+
+def make_person(x, ipd=10, conf=0.9):
+    kps = np.zeros((17, 3), dtype=np.float32)
+    kps[1] = [x, 50, conf]
+    kps[2] = [x + ipd, 50, conf]
+    return {'bbox': np.array([x - 20, 20, x + 40, 200], dtype=np.float32), 'keypoints': kps, 'conf': 0.9}
+
+class TestPairStateTable(unittest.TestCase):
+    def test_add_remove_reuses_slots(self):
+        table = PairStateTable(2)
+        table.add(frozenset([1, 2]), frame=1)
+        table.add(frozenset([3, 4]), frame=2)
+        data = table.remove(frozenset([1, 2]))
+        self.assertEqual(data, {'count': 1, 'start_frame': 1, 'triggered': False, 'last_seen': 1})
+        table.add(frozenset([5, 6]), frame=3)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.evictions, 0)
+
+    def test_eviction_of_stalest_pair(self):
+        table = PairStateTable(2)
+        table.add(frozenset([1, 2]), frame=1)
+        table.add(frozenset([3, 4]), frame=2)
+        table.last_seen[table.slots[frozenset([1, 2])]] = 5
+        evicted = table.add(frozenset([5, 6]), frame=6)
+        self.assertTrue(evicted['evicted'])
+        self.assertEqual(evicted['start_frame'], 2)
+        self.assertEqual(evicted['end_frame'], 2)
+        self.assertNotIn(frozenset([3, 4]), table)
+        self.assertEqual(table.evictions, 1)
+
+class TestBoundedMemory(unittest.TestCase):
+    def test_churning_ids_stay_bounded(self):
+        f = InteractionFilter(method='hybrid', max_active_pairs=4, miss_tolerance=0)
+        tmp = tempfile.mkdtemp()
+        sink = os.path.join(tmp, 'annotations.jsonl')
+        comparator = Comparator(max_annotations=50, annotation_sink=sink)
+
+        # A fresh pair of tracker IDs every 3 frames, for a long time
+        for i in range(3000):
+            base = (i // 3) * 2
+            res = f.process(None, persons={base: make_person(100), base + 1: make_person(120)})
+            comparator.record_frame('hybrid', res)
+            self.assertLessEqual(len(f.active_interactions), 4)
+            self.assertLessEqual(len(comparator.stats['hybrid']['annotations']), 50)
+
+        self.assertEqual(comparator.total_annotations('hybrid'), 999)
+        self.assertEqual(len(list(comparator.iter_annotations('hybrid'))), 999)
+        os.remove(sink)
+        os.rmdir(tmp)
+
+    def test_full_table_evicts_and_logs(self):
+        f = InteractionFilter(method='hybrid', max_active_pairs=1, miss_tolerance=5)
+        f.process(None, persons={1: make_person(100), 2: make_person(120)})
+        res = f.process(None, persons={3: make_person(400), 4: make_person(420)})
+        self.assertEqual(res['evicted_pairs'], 1)
+        self.assertEqual(len(res['ended_interactions']), 1)
+        self.assertTrue(res['ended_interactions'][0]['evicted'])
+
+    def test_pairs_seen_this_frame_are_not_evicted(self):
+        f = InteractionFilter(method='hybrid', max_active_pairs=2, trigger_frames=10, miss_tolerance=0)
+        comparator = Comparator()
+        persons = {}
+        for i, x in enumerate((100, 400, 700)):
+            persons[2 * i], persons[2 * i + 1] = make_person(x), make_person(x + 20)
+        for _ in range(30):
+            comparator.record_frame('hybrid', f.process(None, persons=persons))
+        data = comparator.stats['hybrid']
+        # The two tracked pairs trigger; the third is turned away every frame instead of churning the table
+        self.assertEqual(data['triggers'], 1)
+        self.assertEqual(sum(d['triggered'] for _, d in f.active_interactions.items()), 2)
+        self.assertEqual((data['evicted_pairs'], data['dropped_pairs']), (0, 30))
+        self.assertEqual(data['annotations'], [])
+
+    def test_eviction_keeps_current_frame_pairs(self):
+        table = PairStateTable(1)
+        table.add(frozenset([1, 2]), frame=3)
+        self.assertIsNone(table.add(frozenset([3, 4]), frame=3))
+        self.assertNotIn(frozenset([3, 4]), table)
+        self.assertEqual((table.evictions, table.dropped), (0, 1))
+
+    def test_drop_without_sink(self):
+        comparator = Comparator(max_annotations=2)
+        for i in range(5):
+            comparator.log_interaction('hybrid', i, i + 1, False)
+        # Only the overflow goes; the newest annotations stay
+        self.assertEqual([a['start_frame'] for a in comparator.iter_annotations('hybrid')], [3, 4])
+        self.assertEqual(comparator.stats['hybrid']['dropped_annotations'], 3)
+        self.assertEqual(comparator.total_annotations('hybrid'), 5)
+
+    def test_fresh_run_truncates_sink(self):
+        tmp = tempfile.TemporaryDirectory()
+        sink = os.path.join(tmp.name, 'annotations.jsonl')
+        for append in (False, False, True):
+            comparator = Comparator(max_annotations=1, annotation_sink=sink, append=append)
+            for i in range(3):
+                comparator.log_interaction('hybrid', i, i + 1, False)
+        # Two flushed per run; the second run started over and the third appended to it
+        with open(sink) as f:
+            self.assertEqual(len(f.readlines()), 4)
+        tmp.cleanup()
+
+class TestHysteresis(unittest.TestCase):
+    def run_frames(self, f, frames, comparator=None):
+        results = None
+        for persons in frames:
+            results = f.process(None, persons=persons)
+            if comparator is not None:
+                comparator.record_frame('hybrid', results)
+        return results
+
+    def test_short_gap_is_bridged(self):
+        f = InteractionFilter(method='hybrid', trigger_frames=4, miss_tolerance=3, ema_alpha=1.0)
+        comparator = Comparator()
+        together = {1: make_person(100), 2: make_person(120)}
+        apart = {1: make_person(100), 2: make_person(400)}
+        self.run_frames(f, [together] * 3 + [apart] * 2 + [together] * 3, comparator)
+        data = comparator.stats['hybrid']
+        self.assertEqual((data['triggers'], data['annotations']), (1, []))
+
+        # Longer than the tolerance: the interaction ends at the last frame it was seen
+        self.run_frames(f, [apart] * 4, comparator)
+        self.assertEqual(data['annotations'], [{'start_frame': 1, 'end_frame': 8, 'triggered': True,
+                                                'trigger_frame': 6, 'gaps': 1}])
+        self.assertEqual(data['merged_gaps'], 1)
+
+    def test_close_inside_tolerance_ends_at_last_seen(self):
+        f = InteractionFilter(method='hybrid', trigger_frames=4, miss_tolerance=3, ema_alpha=1.0)
+        comparator = Comparator()
+        together = {1: make_person(100), 2: make_person(120)}
+        apart = {1: make_person(100), 2: make_person(400)}
+        self.run_frames(f, [together] * 3 + [apart] * 2, comparator)
+        comparator.close_interactions('hybrid', f.active_interactions, f.frame_count)
+        self.assertEqual(comparator.stats['hybrid']['annotations'][0]['end_frame'], 3)
+
+    def test_skipped_frames_count_in_source_frames(self):
+        f = InteractionFilter(method='hybrid', trigger_frames=10, miss_tolerance=3, ema_alpha=1.0)
+        comparator = Comparator()
+        together = {1: make_person(100), 2: make_person(120)}
+        apart = {1: make_person(100), 2: make_person(400)}
+        # Every 5th source frame is processed; the tolerance of 3 frames rounds up to one sample
+        for index, persons in zip((5, 10, 15, 20, 25), [together] * 3 + [apart] * 2):
+            comparator.record_frame('hybrid', f.process(None, persons=persons, frame_index=index))
+        self.assertEqual(f.frame_count, 25)
+        self.assertEqual(comparator.stats['hybrid']['annotations'], [{'start_frame': 5, 'end_frame': 15, 'triggered': True,
+                                                                      'trigger_frame': 15}])
+
+    def test_one_missed_sample_is_bridged(self):
+        f = InteractionFilter(method='hybrid', trigger_frames=10, miss_tolerance=3, ema_alpha=1.0)
+        comparator = Comparator()
+        together = {1: make_person(100), 2: make_person(120)}
+        apart = {1: make_person(100), 2: make_person(400)}
+        for index, persons in zip((5, 10, 15, 20, 25), [together] * 3 + [apart] + [together]):
+            comparator.record_frame('hybrid', f.process(None, persons=persons, frame_index=index))
+        comparator.close_interactions('hybrid', f.active_interactions, 25)
+        self.assertEqual(comparator.stats['hybrid']['annotations'], [{'start_frame': 5, 'end_frame': 25, 'triggered': True,
+                                                                      'trigger_frame': 15, 'gaps': 1}])
+
+    def test_without_tolerance_gaps_fragment(self):
+        f = InteractionFilter(method='hybrid', trigger_frames=4, miss_tolerance=0, ema_alpha=1.0)
+        comparator = Comparator()
+        together = {1: make_person(100), 2: make_person(120)}
+        apart = {1: make_person(100), 2: make_person(400)}
+        self.run_frames(f, [together] * 3 + [apart] + [together] * 3 + [apart], comparator)
+        self.assertEqual(len(comparator.stats['hybrid']['annotations']), 2)
+        self.assertEqual(comparator.stats['hybrid']['merged_gaps'], 0)
+
+    def test_keypoint_dip_uses_smoothed_metric(self):
+        f = InteractionFilter(method='hybrid', miss_tolerance=2)
+        together = {1: make_person(100), 2: make_person(120)}
+        dip = {1: make_person(100), 2: make_person(120, conf=0.3)}  # Eyes under CONF_THRESHOLD
+        self.run_frames(f, [together] * 3)
+        res = self.run_frames(f, [dip])
+        self.assertEqual(res['interactions'], {frozenset([1, 2])})
+        self.assertEqual(res['z_metrics'][2], 0)
+        self.assertEqual(res['z_smoothed'][2], 10)
+
+    def test_exit_threshold_keeps_active_pairs(self):
+        f = InteractionFilter(method='hybrid', ratio_threshold=1.3, exit_ratio_threshold=1.45, ema_alpha=1.0)
+        borderline = {1: make_person(100, ipd=10), 2: make_person(120, ipd=13.8)}
+        self.assertEqual(self.run_frames(f, [borderline])['interactions'], set())
+        self.run_frames(f, [{1: make_person(100), 2: make_person(120)}])
+        self.assertEqual(self.run_frames(f, [borderline])['interactions'], {frozenset([1, 2])})
+
+class TestTrackStateTable(unittest.TestCase):
+    def test_ema_and_gaps(self):
+        tracks = TrackStateTable(2)
+        self.assertEqual(tracks.smooth(7, 10.0, frame=1, alpha=0.5, max_gap=2), 10.0)
+        self.assertEqual(tracks.smooth(7, 20.0, frame=2, alpha=0.5, max_gap=2), 15.0)
+        self.assertEqual(tracks.smooth(7, 0, frame=3, alpha=0.5, max_gap=2), 15.0)  # Bridged dropout
+        self.assertEqual(tracks.smooth(7, 0, frame=4, alpha=0.5, max_gap=2), 15.0)
+        self.assertEqual(tracks.smooth(7, 0, frame=5, alpha=0.5, max_gap=2), 0)  # Gap too long
+        self.assertEqual(tracks.smooth(7, 40.0, frame=6, alpha=0.5, max_gap=2), 40.0)  # EMA restarts
+
+    def test_lru_eviction(self):
+        tracks = TrackStateTable(2)
+        tracks.smooth(1, 1.0, frame=1, alpha=0.5, max_gap=0)
+        tracks.smooth(2, 2.0, frame=2, alpha=0.5, max_gap=0)
+        tracks.smooth(3, 3.0, frame=3, alpha=0.5, max_gap=0)
+        self.assertNotIn(1, tracks)
+        self.assertEqual(len(tracks), 2)
+
+if __name__ == '__main__':
+    unittest.main()
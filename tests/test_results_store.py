@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+import unittest
+from core.comparator import Comparator
+from core.results_store import ResultsWriter, ResultsStore, pa
+
+def frame_result(overlaps=0, interactions=0, triggers=0):
+    return {'overlaps': [None] * overlaps, 'interactions': [None] * interactions, 'triggers': triggers}
+
+class TestResultsStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def write_run(self, run_id, backend, frames=100, fps=30.0):
+        writer = ResultsWriter(self.tmp, run_id, ['hybrid', 'mde'], meta={'video': run_id}, backend=backend, batch_rows=16)
+        comparator = Comparator(on_interaction=writer.add_interaction)
+        for i in range(1, frames + 1):
+            overlapping = 20 <= i < 60
+            timings = {'decode': 0.002, 'detect': 0.010, 'filter': 0.001}
+            writer.add_frame(i, 'hybrid', frame_result(overlapping, overlapping, int(i == 50)), 2, timings)
+            writer.add_frame(i, 'mde', frame_result(overlapping, 0, 0), 2, timings)
+        comparator.log_interaction('hybrid', 20, 59, True, 50)
+        comparator.log_interaction('hybrid', 70, 72, False, gaps=1)
+        # Not visible until closed
+        self.assertNotIn(run_id, [meta['run_id'] for meta in ResultsStore(self.tmp).runs()])
+        writer.close({'fps': fps, 'total_frames': frames})
+        self.assertEqual(writer.tables['frames'].row_groups, 13)  # 200 rows in groups of 16
+        return writer
+
+    def check_backend(self, backend):
+        self.write_run('a', backend)
+        self.write_run('b', backend)
+        store = ResultsStore(self.tmp)
+        self.assertEqual([meta['run_id'] for meta in store.runs()], ['a', 'b'])
+
+        frames = store.read_table('a', 'frames', columns=['frame', 'method', 'triggers'])
+        self.assertEqual(len(frames['frame']), 200)
+        self.assertEqual(int(frames['triggers'].sum()), 1)
+        interactions = store.read_table('a', 'interactions')
+        self.assertEqual(interactions['start_frame'].tolist(), [20, 70])
+        self.assertEqual(interactions['trigger_frame'].tolist(), [50, -1])
+        self.assertEqual(interactions['gaps'].tolist(), [0, 1])
+
+        totals = store.aggregate()
+        hybrid = totals['hybrid']
+        self.assertEqual((hybrid['runs'], hybrid['frames'], hybrid['overlap_frames']), (2, 200, 80))
+        self.assertEqual((hybrid['trigger_frames'], hybrid['interactions'], hybrid['triggered_interactions']), (2, 4, 2))
+        self.assertAlmostEqual(hybrid['cost_reduction'], (1 - 2 / 80) * 100)
+        # 200 frames at 30 fps, 2 triggers
+        self.assertAlmostEqual(hybrid['triggers_per_hour'], 2 / (200 / 30 / 3600))
+        self.assertAlmostEqual(hybrid['detect_ms'], 10.0, places=3)
+        self.assertEqual(totals['mde']['trigger_frames'], 0)
+        self.assertEqual(store.aggregate(run_ids=['b'])['hybrid']['frames'], 100)
+
+    def test_numpy_backend(self):
+        self.check_backend('numpy')
+
+    @unittest.skipIf(pa is None, "pyarrow not installed")
+    def test_arrow_backend(self):
+        self.check_backend('arrow')
+
+    def check_resume(self, backend):
+        writer = ResultsWriter(self.tmp, 'run', ['hybrid'], backend=backend, batch_rows=16)
+        for i in range(1, 51):
+            writer.add_frame(i, 'hybrid', frame_result(), 1, {})
+        writer.add_interaction('hybrid', {'start_frame': 10, 'end_frame': 20, 'triggered': False})
+        state = writer.state_dict()  # Checkpoint at frame 50
+        for i in range(51, 61):  # Lost in the crash, redone after the resume
+            writer.add_frame(i, 'hybrid', frame_result(), 1, {})
+        writer.add_interaction('hybrid', {'start_frame': 55, 'end_frame': 58, 'triggered': False})
+        writer.tables['frames'].flush()
+        writer.abort(keep=True)
+
+        resumed = ResultsWriter(self.tmp, 'other', ['hybrid'], backend=backend, batch_rows=16, state=state)
+        self.assertEqual(resumed.final_path, writer.final_path)
+        for i in range(51, 101):
+            resumed.add_frame(i, 'hybrid', frame_result(), 1, {})
+        resumed.close()
+        store = ResultsStore(self.tmp)
+        self.assertEqual([meta['run_id'] for meta in store.runs()], ['run'])
+        self.assertEqual(store.read_table('run', 'frames', columns=['frame'])['frame'].tolist(), list(range(1, 101)))
+        self.assertEqual(store.read_table('run', 'interactions')['start_frame'].tolist(), [10])
+
+    def test_numpy_resume(self):
+        self.check_resume('numpy')
+
+    @unittest.skipIf(pa is None, "pyarrow not installed")
+    def test_arrow_resume(self):
+        self.check_resume('arrow')
+
+    def test_abort_leaves_nothing(self):
+        writer = ResultsWriter(self.tmp, 'run', ['hybrid'], backend='numpy')
+        writer.add_frame(1, 'hybrid', frame_result(), 0, {})
+        writer.abort()
+        self.assertEqual(os.listdir(self.tmp), [])
@@ -0,0 +1,131 @@
+import pickle
+import unittest
+import numpy as np
+from detectors.roi import RoiPoseDetector, parse_polygon
+from utils.frame_buffer import PAD_VALUE
+
+def person(x, y, w=40, h=100):
+    keypoints = np.zeros((17, 3), dtype=np.float32)
+    keypoints[:, 0] = x + w / 2
+    keypoints[:, 1] = y + h / 2
+    keypoints[:, 2] = 0.9
+    return {'bbox': np.array([x, y, x + w, y + h], dtype=np.float32), 'keypoints': keypoints}
+
+class SceneDetector:
+    """Returns people in the coordinates of whatever image it is given."""
+    def __init__(self, people):
+        self.people = people  # pid -> (x, y) in full-frame pixels
+        self.images = []
+        self.offset = (0, 0)
+
+    def detect(self, frame, shared=None):
+        self.images.append(frame)
+        ox, oy = self.offset
+        h, w = frame.shape[:2]
+        return {pid: person(x - ox, y - oy) for pid, (x, y) in self.people.items()
+                if 0 <= x - ox and x - ox + 40 <= w and 0 <= y - oy and y - oy + 100 <= h}
+
+class CropTracker(SceneDetector):
+    """Like SceneDetector, but starts a new track whenever a box jumps in image coordinates."""
+    def __init__(self, people):
+        super().__init__(people)
+        self.tracks = {}  # Track ID -> last box in image coordinates
+        self.next_id = 100
+
+    def detect(self, frame, shared=None):
+        tracked = {}
+        for person in super().detect(frame).values():
+            tid = next((t for t, box in self.tracks.items() if np.abs(box - person['bbox']).max() < 10), None)
+            if tid is None:
+                tid, self.next_id = self.next_id, self.next_id + 1
+            tracked[tid] = person
+        self.tracks = {tid: p['bbox'] for tid, p in tracked.items()}
+        return tracked
+
+def blank(h=480, w=640):
+    return np.full((h, w, 3), 60, dtype=np.uint8)
+
+class TestRoi(unittest.TestCase):
+    def test_parse_polygon(self):
+        np.testing.assert_array_equal(parse_polygon("10,20 100,20 100,200"), [[10, 20], [100, 20], [100, 200]])
+        with self.assertRaises(ValueError):
+            parse_polygon("10,20 100,20")
+
+    def test_polygon_crop_remaps_and_filters(self):
+        inner = SceneDetector({1: (200, 150), 2: (520, 300)})
+        polygon = parse_polygon("150,100 400,100 400,350 150,350")
+        roi = RoiPoseDetector(inner, polygons=[polygon], margin=0)
+        inner.offset = (128, 96)  # Polygon box quantised outward to the 32 px grid
+        persons = roi.detect(blank())
+
+        self.assertEqual(inner.images[0].shape[:2], (352 - 96, 416 - 128))
+        self.assertEqual(list(persons), [1])
+        np.testing.assert_allclose(persons[1]['bbox'], [200, 150, 240, 250])
+        np.testing.assert_allclose(persons[1]['keypoints'][0, :2], [220, 200])
+
+    def test_polygon_masks_outside_pixels(self):
+        inner = SceneDetector({})
+        roi = RoiPoseDetector(inner, polygons=[parse_polygon("0,0 256,0 0,256")], margin=0)
+        roi.detect(blank(h=256, w=256))
+        crop = inner.images[0]
+        self.assertEqual(crop[10, 10, 0], 60)
+        self.assertEqual(crop[250, 250, 0], PAD_VALUE)
+
+    def test_foot_point_outside_polygon_dropped(self):
+        # Box overlaps the polygon but the person stands below it
+        inner = SceneDetector({1: (200, 300)})
+        roi = RoiPoseDetector(inner, polygons=[parse_polygon("100,100 400,100 400,320 100,320")], margin=128)
+        inner.offset = (0, 0)
+        self.assertEqual(roi.detect(blank()), {})
+
+    def test_auto_region_falls_back_to_full_frame(self):
+        inner = SceneDetector({})
+        roi = RoiPoseDetector(inner, auto=True, refresh_interval=5)
+        frame = blank()
+        roi.detect(frame)
+        self.assertEqual(inner.images[-1].shape, frame.shape)  # Nothing active yet
+
+    def test_auto_region_follows_people(self):
+        inner = SceneDetector({1: (300, 200)})
+        roi = RoiPoseDetector(inner, auto=True, margin=32, refresh_interval=5)
+        roi.detect(blank())  # Full frame finds the person
+        inner.offset = (256, 160)
+        persons = roi.detect(blank())
+        self.assertLess(inner.images[-1].size, blank().size)
+        np.testing.assert_allclose(persons[1]['bbox'], [300, 200, 340, 300])
+
+    def test_auto_region_refreshes_every_frame(self):
+        inner = SceneDetector({1: (300, 200)})
+        roi = RoiPoseDetector(inner, auto=True, margin=32, refresh_interval=1)
+        roi.detect(blank())
+        inner.offset = (256, 160)
+        roi.detect(blank())
+        region = roi.region
+        roi.region = (0, 0, 64, 64)  # Stale crop; an interval of 1 re-derives it on the next frame
+        roi.detect(blank())
+        self.assertEqual(roi.region, region)
+
+    def test_ids_survive_crop_moves(self):
+        inner = CropTracker({1: (300, 200), 2: (60, 300)})
+        roi = RoiPoseDetector(inner, auto=True, margin=32, refresh_interval=1)
+        first = roi.detect(blank())  # Full frame
+        ids = {tuple(p['bbox']): pid for pid, p in first.items()}
+        inner.offset = (0, 160)  # Crop around both people: every box jumps, new inner tracks
+        moved = roi.detect(blank())
+        self.assertEqual({tuple(p['bbox']): pid for pid, p in moved.items()}, ids)
+        steady = roi.detect(blank())  # Same crop, inner tracks continue
+        self.assertEqual({tuple(p['bbox']): pid for pid, p in steady.items()}, ids)
+
+    def test_state_restores_crop_and_ids(self):
+        inner = CropTracker({1: (300, 200), 2: (60, 300)})
+        roi = RoiPoseDetector(inner, auto=True, margin=32, refresh_interval=30)
+        roi.detect(blank())
+        inner.offset = (0, 160)
+        ids = set(roi.detect(blank()))
+        resumed = RoiPoseDetector(inner, auto=True, margin=32, refresh_interval=30)
+        resumed.load_state_dict(pickle.loads(pickle.dumps(roi.state_dict())))
+        self.assertEqual(set(resumed.detect(blank())), ids)
+        self.assertEqual(resumed.region, roi.region)
+
+if __name__ == '__main__':
+    unittest.main()
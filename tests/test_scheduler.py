@@ -0,0 +1,85 @@
+import unittest
+from core.scheduler import DeadlineScheduler
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def result(overlaps=False):
+    return {'overlaps': {frozenset([1, 2])} if overlaps else set(), 'active_interactions': {}}
+
+def run(scheduler, clock, seconds, cost, activity):
+    """Drive the scheduler: every processed frame takes `cost` seconds; activity(sid) -> overlaps?"""
+    processed = {}
+    end = clock.now + seconds
+    while clock.now < end:
+        sid, wait = scheduler.next()
+        if sid is None:
+            clock.now += wait
+            continue
+        started = clock.now
+        clock.now += cost
+        scheduler.complete(sid, result(activity(sid)), started)
+        processed[sid] = processed.get(sid, 0) + 1
+    return processed
+
+class TestScheduler(unittest.TestCase):
+    def test_idle_streams_are_downsampled(self):
+        clock = FakeClock()
+        scheduler = DeadlineScheduler(active_fps=30, idle_fps=5, capacity_fps=1000, clock=clock)
+        scheduler.add_stream('busy', 30)
+        scheduler.add_stream('quiet', 30)
+        processed = run(scheduler, clock, 10, cost=0.001, activity=lambda sid: sid == 'busy')
+        self.assertAlmostEqual(processed['busy'] / 10, 30, delta=1.5)
+        self.assertAlmostEqual(processed['quiet'] / 10, 5, delta=1)
+        metrics = scheduler.metrics()
+        self.assertFalse(metrics['overloaded'])
+        self.assertEqual(metrics['streams']['quiet']['budget_fps'], 5)
+        self.assertAlmostEqual(metrics['streams']['busy']['effective_fps'], 30, delta=1)
+        self.assertEqual(metrics['streams']['busy']['slo_misses'], 0)
+
+    def test_overload_sheds_idle_first(self):
+        clock = FakeClock()
+        # 50 ms per frame: 20 fps of capacity for 2 active + 2 idle streams
+        scheduler = DeadlineScheduler(active_fps=30, idle_fps=5, min_fps=1, headroom=1.0, clock=clock)
+        for sid in ['a1', 'a2', 'i1', 'i2']:
+            scheduler.add_stream(sid, 30)
+        processed = run(scheduler, clock, 20, cost=0.05, activity=lambda sid: sid.startswith('a'))
+        metrics = scheduler.metrics()
+        self.assertTrue(metrics['overloaded'])
+        self.assertAlmostEqual(metrics['capacity_fps'], 20, delta=0.5)
+        streams = metrics['streams']
+        self.assertEqual(streams['i1']['budget_fps'], 1)
+        self.assertAlmostEqual(streams['a1']['budget_fps'], 9, delta=0.5)
+        # Total throughput stays at capacity and the active streams get most of it
+        self.assertAlmostEqual(sum(processed.values()) / 20, 20, delta=1)
+        self.assertGreater(processed['a1'], 5 * processed['i1'])
+        # Sustained overload sheds frames instead of falling ever further behind
+        self.assertLess(streams['a1']['slo_misses'], processed['a1'] * 0.2)
+
+    def test_missed_deadlines_are_dropped(self):
+        clock = FakeClock()
+        scheduler = DeadlineScheduler(active_fps=10, slo_ms=200, capacity_fps=1000, clock=clock)
+        scheduler.add_stream('cam', 10)
+        clock.now = 1.0  # Stalled for a second: 10 slots due, most past their deadline
+        sid, _ = scheduler.next()
+        self.assertEqual(sid, 'cam')
+        self.assertEqual(scheduler.metrics()['streams']['cam']['dropped'], 10)
+
+    def test_finished_streams_release_capacity(self):
+        clock = FakeClock()
+        scheduler = DeadlineScheduler(active_fps=30, idle_fps=5, capacity_fps=40, headroom=1.0, clock=clock)
+        scheduler.add_stream('a', 30)
+        scheduler.add_stream('b', 30)
+        self.assertAlmostEqual(scheduler.streams['a'].budget_fps, 20)
+        scheduler.finish_stream('b')
+        self.assertEqual(scheduler.streams['a'].budget_fps, 30)
+        clock.now = 5.0
+        scheduler.finish_stream('a')
+        self.assertEqual(scheduler.next(), (None, None))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+from core.comparator import Comparator
+from core.interaction_filter import InteractionFilter
+from core.sharding import plan_jobs, shard_result, merge_results, warmup_start
+
+def ann(start, end, triggered=False, trigger_frame=None):
+    return {'start_frame': start, 'end_frame': end, 'triggered': triggered, 'trigger_frame': trigger_frame}
+
+def result(video, start, frames, annotations, triggers=0):
+    comparator = Comparator()
+    comparator.stats['hybrid']['triggers'] = triggers
+    comparator.stats['hybrid']['overlap_frames'] = frames // 2
+    comparator.stats['hybrid']['annotations'] = annotations
+    comparator.set_processing_stats(None, None, 1.0, 30.0, frames)
+    comparator.set_inference_stats(frames, frames // 3)
+    return shard_result(comparator, {'video': video, 'start': start, 'end': start + frames}, 'w0')
+
+def make_person(x):
+    kps = np.zeros((17, 3), dtype=np.float32)
+    kps[1] = [x, 50, 0.9]
+    kps[2] = [x + 10, 50, 0.9]
+    return {'bbox': np.array([x - 20, 20, x + 40, 200], dtype=np.float32), 'keypoints': kps, 'conf': 0.9}
+
+def scene(i):
+    """Two pairs meeting on different schedules: interactions cross frames 100 and 200 with under 30 frames each side."""
+    persons = {1: make_person(100), 3: make_person(600)}
+    persons[2] = make_person(130 if (i // 40) % 2 == 0 else 400)
+    persons[4] = make_person(630 if (i // 25) % 3 else 900)
+    return persons
+
+def run_range(start, end):
+    """What main.py does for --start-frame/--end-frame: warm up, then report frames start + 1 to end."""
+    f = InteractionFilter(method='hybrid', trigger_frames=30)
+    comparator = Comparator(start_frame=start)
+    f.frame_count = warmup_start(start, [f])
+    for i in range(f.frame_count, end):
+        results = f.process(None, persons=scene(i))
+        if f.frame_count > start:
+            comparator.record_frame('hybrid', results)
+    comparator.close_interactions('hybrid', f.active_interactions, end)
+    comparator.set_processing_stats(None, None, 1.0, 30.0, end - start)
+    return shard_result(comparator, {'video': '/v/a.mp4', 'start': start, 'end': end}, 'w0')
+
+class TestSharding(unittest.TestCase):
+    def test_plan_jobs(self):
+        jobs = plan_jobs(['/v/a.mp4', '/v/b.mp4'], {'/v/a.mp4': 250}, shard_frames=100, args=['--method', 'mde'])
+        self.assertEqual([(p['video'], p['start'], p['end']) for _, p in jobs],
+                         [('/v/a.mp4', 0, 100), ('/v/a.mp4', 100, 200), ('/v/a.mp4', 200, 250), ('/v/b.mp4', 0, None)])
+        self.assertEqual(jobs[0][1]['args'], ['--method', 'mde'])
+        # Deterministic ids, distinct per arguments
+        again = plan_jobs(['/v/a.mp4'], {'/v/a.mp4': 250}, shard_frames=100, args=['--method', 'mde'])
+        self.assertEqual([job_id for job_id, _ in again], [job_id for job_id, _ in jobs[:3]])
+        other = plan_jobs(['/v/a.mp4'], {'/v/a.mp4': 250}, shard_frames=100)
+        self.assertNotEqual(other[0][0], jobs[0][0])
+
+    def test_merge_joins_cut_interactions(self):
+        results = [
+            result('/v/a.mp4', 100, 100, [ann(150, 200, True, 180)], triggers=1),
+            result('/v/a.mp4', 0, 100, [ann(10, 20), ann(90, 100)], triggers=0),
+            # Warmed up from frame 150: the interaction and its trigger were seen, but the trigger is not counted again
+            result('/v/a.mp4', 200, 100, [ann(150, 240, True, 180), ann(260, 270)], triggers=0),
+            result('/v/b.mp4', 0, 100, [ann(1, 5)]),
+        ]
+        comparator, joined = merge_results(results)
+        self.assertEqual(joined, 1)
+        data = comparator.stats['hybrid']
+        self.assertEqual(data['triggers'], 1)
+        self.assertEqual(data['overlap_frames'], 200)
+        spans = [(a['video'], a['start_frame'], a['end_frame'], a['triggered']) for a in data['annotations']]
+        self.assertEqual(spans, [('/v/a.mp4', 10, 20, False), ('/v/a.mp4', 90, 100, False),
+                                 ('/v/a.mp4', 150, 240, True), ('/v/a.mp4', 260, 270, False), ('/v/b.mp4', 1, 5, False)])
+        # The joined interaction keeps its first trigger
+        self.assertEqual(data['annotations'][2]['trigger_frame'], 180)
+        self.assertEqual(comparator.processing_stats['total_frames'], 400)
+        self.assertEqual(comparator.processing_stats['inference_calls'], 132)
+
+    def test_warmup_start(self):
+        f = InteractionFilter(method='hybrid', trigger_frames=30, miss_tolerance=5)
+        self.assertEqual(warmup_start(0, [f]), 0)
+        self.assertEqual(warmup_start(20, [f]), 0)
+        self.assertEqual(warmup_start(100, [f, InteractionFilter(method='mde', trigger_frames=60)]), 35)
+
+    def test_sharded_run_matches_whole_video(self):
+        whole, _ = merge_results([run_range(0, 300)])
+        sharded, joined = merge_results([run_range(start, start + 100) for start in (0, 100, 200)])
+        self.assertEqual(joined, 2)
+        expected, data = whole.stats['hybrid'], sharded.stats['hybrid']
+        for key in ('triggers', 'overlap_frames', 'interactions'):
+            self.assertEqual(data[key], expected[key], key)
+        spans = lambda d: [(a['start_frame'], a['end_frame'], a['triggered'], a['trigger_frame']) for a in d['annotations']]
+        self.assertEqual(spans(data), spans(expected))
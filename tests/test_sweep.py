@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from core.sweep import grid_search, random_search, replay, run_sweep
+from detectors.detection_cache import DetectionCache
+
+def make_person(x, head_size):
+    kps = np.zeros((17, 3), dtype=np.float32)
+    kps[1] = [x, 50, 0.9]              # left eye
+    kps[2] = [x + head_size, 50, 0.9]  # right eye
+    return {'bbox': np.array([x - 20, 20, x + 40, 200], dtype=np.float32), 'keypoints': kps, 'conf': 0.9}
+
+class TestSweep(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp()
+        video = os.path.join(cls.tmp, 'clip.mp4')
+        with open(video, 'wb') as f:
+            f.write(b'clip')
+        cache = DetectionCache(os.path.join(cls.tmp, 'cache'), max_bytes=0)
+        writer = cache.writer(video, 30.0, model_path=video)
+        for i in range(150):
+            if 10 <= i < 100:
+                # Overlapping pair whose head sizes differ by a ratio of 1.2
+                persons = {1: make_person(100, 10), 2: make_person(130, 12)}
+            else:
+                persons = {1: make_person(100, 10), 2: make_person(400, 10)}
+            writer.append(persons)
+        writer.close()
+        cls.cached = cache.lookup(video, model_path=video)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp)
+
+    def test_search_spaces(self):
+        space = {'ratio_threshold': [1.1, 1.5], 'dwell_sec': [1.0, 2.0, 4.0]}
+        self.assertEqual(len(grid_search(space)), 6)
+        samples = random_search(space, 10)
+        self.assertEqual(len(samples), 10)
+        self.assertTrue(all(1.1 <= s['ratio_threshold'] <= 1.5 for s in samples))
+
+    def test_replay_thresholds(self):
+        strict = replay(self.cached, 'hybrid', {'ratio_threshold': 1.1, 'dwell_sec': 1.0})
+        loose = replay(self.cached, 'hybrid', {'ratio_threshold': 1.3, 'dwell_sec': 1.0})
+        self.assertEqual(strict.stats['hybrid']['triggers'], 0)
+        self.assertEqual(loose.stats['hybrid']['triggers'], 1)
+        self.assertEqual(loose.stats['hybrid']['overlap_frames'], 90)
+
+    def test_run_sweep_parallel(self):
+        configs = grid_search({'ratio_threshold': [1.1, 1.3], 'dwell_sec': [1.0, 5.0]})
+        labels = [(11, 100)]
+        rows, front = run_sweep(self.cached, 'hybrid', configs, labels, workers=2)
+        self.assertEqual(len(rows), 4)
+        recalled = [r for r in rows if r['recall'] == 1.0]
+        self.assertEqual([(r['ratio_threshold'], r['dwell_sec']) for r in recalled], [(1.3, 1.0)])
+        self.assertEqual(front[-1]['recall'], 1.0)
+
+    def test_mde_requires_cached_depth(self):
+        with self.assertRaises(ValueError):
+            run_sweep(self.cached, 'mde', [{}], labels=[], workers=1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import threading
+import unittest
+from unittest.mock import patch
+import numpy as np
+from utils import thread_budget
+from utils.geometry import box_depths
+from utils.thread_budget import ThreadBudget
+
+class TestThreadBudget(unittest.TestCase):
+    def test_split_per_stream(self):
+        budget = ThreadBudget(streams=1, cores=16)
+        self.assertEqual((budget.cores, budget.workers, budget.torch_threads), (16, 4, 12))
+        budget = ThreadBudget(streams=4, cores=16)
+        self.assertEqual((budget.cores, budget.workers, budget.torch_threads), (4, 1, 3))
+        # Never below one thread, even with more streams than cores
+        budget = ThreadBudget(streams=8, cores=4)
+        self.assertEqual((budget.cores, budget.workers, budget.torch_threads), (1, 1, 1))
+
+    def test_apply_sets_library_threads(self):
+        with patch('torch.set_num_threads') as torch_threads, patch('cv2.setNumThreads') as cv2_threads:
+            budget = ThreadBudget(streams=2, cores=8).apply()
+        torch_threads.assert_called_once_with(budget.torch_threads)
+        cv2_threads.assert_called_once_with(budget.cv2_threads)
+
+    def test_configure_replaces_shared_executor(self):
+        with patch('torch.set_num_threads'), patch('cv2.setNumThreads'):
+            first = thread_budget.configure(cores=8)
+            pool = thread_budget.executor()
+            self.assertIs(pool, first.executor)
+            second = thread_budget.configure(cores=8)
+        self.assertIsNot(thread_budget.executor(), pool)
+        second.shutdown()
+        thread_budget._budget = None
+        self.assertIsNone(thread_budget.executor())
+
+    def test_box_depths_on_pool(self):
+        depth = np.random.default_rng(0).uniform(0, 5, (200, 300)).astype(np.float32)
+        boxes = [[x, 10, x + 40, 150] for x in range(0, 250, 20)]
+        budget = ThreadBudget(cores=8, workers=3)
+        seen = set()
+        original = np.median
+        def median(a, *args, **kwargs):
+            seen.add(threading.current_thread().name)
+            return original(a, *args, **kwargs)
+        with patch('numpy.median', median):
+            pooled = box_depths(depth, boxes, executor=budget.executor)
+        budget.shutdown()
+        np.testing.assert_allclose(pooled, box_depths(depth, boxes))
+        self.assertTrue(all(name.startswith('budget') for name in seen))
+
+if __name__ == '__main__':
+    unittest.main()
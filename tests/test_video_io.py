@@ -0,0 +1,120 @@
+import os
+import tempfile
+import time
+import unittest
+from fractions import Fraction
+from unittest.mock import patch
+import cv2
+import numpy as np
+from utils import video_io
+from utils.frame_buffer import FrameRing
+from utils.video_io import OpenCVReader, ThreadedWriter, open_reader, open_writer
+
+def write_clip(path, frames=6, width=320, height=240):
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 10, (width, height))
+    for i in range(frames):
+        out.write(np.full((height, width, 3), i * 40, dtype=np.uint8))
+    out.release()
+
+class RecordingWriter:
+    def __init__(self, delay=0.0, fail_at=None):
+        self.frames = []
+        self.delay = delay
+        self.fail_at = fail_at
+        self.released = False
+
+    def write(self, frame):
+        if len(self.frames) == self.fail_at:
+            raise RuntimeError("encoder failed")
+        time.sleep(self.delay)
+        self.frames.append(int(frame[0, 0, 0]))
+
+    def release(self):
+        self.released = True
+
+class TestVideoIO(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.clip = os.path.join(self.tmp.name, "clip.mp4")
+        write_clip(self.clip)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_opencv_reader_downscales_into_ring(self):
+        reader = OpenCVReader(self.clip, decode_width=161)
+        self.assertEqual((reader.width, reader.height), (160, 120))
+        ring = FrameRing(reader.height, reader.width, 2)
+        frames = []
+        while True:
+            ret, frame = ring.read(reader)
+            if not ret:
+                break
+            self.assertTrue(any(frame is buf or np.shares_memory(frame, buf) for buf in ring.buffers))
+            frames.append(int(frame[60, 80, 0]))
+        reader.release()
+        self.assertEqual(len(frames), 6)
+        self.assertLess(abs(frames[-1] - 200), 8)
+
+    def test_auto_falls_back_to_opencv(self):
+        with patch.object(video_io, 'av', None):
+            reader = open_reader(self.clip, backend='auto')
+            self.assertIsInstance(reader, OpenCVReader)
+            reader.release()
+            with self.assertRaises(ImportError):
+                open_reader(self.clip, backend='pyav')
+            with self.assertRaises(ImportError):
+                open_writer(os.path.join(self.tmp.name, "out.mp4"), 10, (320, 240), encoder='x264')
+
+    def test_frame_rate_keeps_ntsc_rates(self):
+        self.assertEqual(video_io._frame_rate(30000 / 1001), Fraction(30000, 1001))
+        self.assertEqual(video_io._frame_rate(25.0), 25)
+        self.assertEqual(video_io._frame_rate(0), 30)
+
+    def test_threaded_writer_keeps_order(self):
+        inner = RecordingWriter(delay=0.002)
+        writer = ThreadedWriter(inner, queue_size=2)
+        for i in range(20):
+            writer.write(np.full((4, 4, 3), i, dtype=np.uint8))
+        writer.release()
+        self.assertEqual(inner.frames, list(range(20)))
+        self.assertTrue(inner.released)
+
+    def test_threaded_writer_bounded_by_ring(self):
+        # A slow encoder must never see a ring buffer the decoder has already reused
+        ring = FrameRing(4, 4, 4)
+        inner = RecordingWriter(delay=0.005)
+        writer = ThreadedWriter(inner, queue_size=ring.size - 2)
+        for i in range(12):
+            frame = ring.next()
+            frame[:] = i
+            writer.write(frame)
+        writer.release()
+        self.assertEqual(inner.frames, list(range(12)))
+
+    def test_threaded_writer_surfaces_errors(self):
+        writer = ThreadedWriter(RecordingWriter(fail_at=1), queue_size=1)
+        with self.assertRaises(RuntimeError):
+            for i in range(10):
+                writer.write(np.zeros((4, 4, 3), dtype=np.uint8))
+            writer.release()
+
+    @unittest.skipIf(video_io.av is None, "PyAV not installed")
+    def test_pyav_round_trip(self):
+        path = os.path.join(self.tmp.name, "x264.mp4")
+        reader = open_reader(self.clip, backend='pyav', decode_width=160)
+        writer = open_writer(path, reader.fps, (reader.width, reader.height), encoder='x264')
+        count = 0
+        while True:
+            ret, frame = reader.read()
+            if not ret:
+                break
+            writer.write(frame)
+            count += 1
+        reader.release()
+        writer.release()
+        self.assertEqual(count, 6)
+        self.assertEqual(int(cv2.VideoCapture(path).get(cv2.CAP_PROP_FRAME_WIDTH)), 160)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import numpy as np
+from utils.visualization import OverlayRenderer, draw_detections, draw_interactions, draw_status
+
+def crowd(n, width=1280, height=720, seed=0):
+    """People on a grid so no two overlays overlap."""
+    rng = np.random.default_rng(seed)
+    persons = {}
+    cols = width // 120
+    for i in range(n):
+        x, y = 20 + (i % cols) * 120, 40 + (i // cols) * 200
+        keypoints = np.zeros((17, 3), dtype=np.float32)
+        keypoints[:, 0] = rng.uniform(x, x + 60, 17)
+        keypoints[:, 1] = rng.uniform(y, y + 150, 17)
+        keypoints[:, 2] = rng.uniform(0, 1, 17)
+        persons[i + 1] = {'bbox': np.array([x, y, x + 60, y + 150], dtype=np.float32), 'keypoints': keypoints}
+    return {
+        'persons': persons,
+        'z_metrics': {pid: rng.uniform() for pid in persons},
+        'groups': [[1, 2], [3, 4, 5]],
+        'interactions': [(1, 2), (3, 4)],
+    }
+
+def reference(frame, results, frame_count=7):
+    draw_detections(frame, results['persons'], results.get('z_metrics'), results.get('groups'))
+    draw_interactions(frame, results['interactions'], results['persons'])
+    draw_status(frame, frame_count, 30, 'hybrid', 3)
+    return frame
+
+class TestOverlayRenderer(unittest.TestCase):
+    def setUp(self):
+        self.background = np.random.default_rng(1).integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+
+    def test_matches_draw_functions(self):
+        results = crowd(20)
+        expected = reference(self.background.copy(), results)
+        renderer = OverlayRenderer(every=1, scale=1.0)
+        for _ in range(2):  # Second pass uses the cached colour map
+            frame = self.background.copy()
+            out = renderer.render(frame, results, 7, 30, 'hybrid', 3)
+            self.assertIs(out, frame)
+            np.testing.assert_array_equal(out, expected)
+
+    def test_every_nth_frame(self):
+        results = crowd(3)
+        renderer = OverlayRenderer(every=3, scale=1.0)
+        drawn = []
+        for frame_count in range(1, 8):
+            frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+            renderer.render(frame, results, frame_count, 30, 'hybrid', 0)
+            drawn.append(bool(frame[190, 20:80].any()))  # Bottom edge of the first box
+        self.assertEqual(drawn, [True, False, False, True, False, False, True])
+
+    def test_reduced_resolution(self):
+        results = crowd(6)
+        renderer = OverlayRenderer(every=1, scale=0.5, ring_size=2)
+        self.assertEqual(renderer.output_size(1280, 720), (640, 360))
+        frame = self.background.copy()
+        out = renderer.render(frame, results, 1, 30, 'hybrid', 0)
+        self.assertEqual(out.shape, (360, 640, 3))
+        np.testing.assert_array_equal(frame, self.background)  # Input left untouched
+        # First person's group box (green) at half its full-size coordinates, within a pixel
+        green = (out == [0, 255, 0]).all(axis=2)
+        # (keypoints are drawn over parts of the edges)
+        self.assertGreater(green[94:97, 10:41].mean(axis=1).max(), 0.5)  # Bottom edge, y = 190 / 2
+        self.assertGreater(green[20:96, 9:12].mean(axis=0).max(), 0.5)  # Left edge, x = 20 / 2
+        # Frames rotate through a ring so a queued frame is not overwritten
+        second = renderer.render(self.background.copy(), results, 2, 30, 'hybrid', 0)
+        self.assertFalse(np.shares_memory(out, second))
+
+if __name__ == '__main__':
+    unittest.main()
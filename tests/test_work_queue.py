@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from core.work_queue import SQLiteBroker, BrokerServer, Worker, open_broker
+
+class TestSQLiteBroker(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.broker = SQLiteBroker(os.path.join(self.tmp, 'jobs.db'), max_attempts=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_claim_complete(self):
+        self.broker.put('a', {'n': 1})
+        self.broker.put('a', {'n': 2})  # Idempotent: the first payload stays
+        self.assertEqual(self.broker.claim('w1'), ('a', {'n': 1}))
+        self.assertIsNone(self.broker.claim('w2'))
+        self.assertTrue(self.broker.heartbeat('a', 'w1'))
+        self.assertFalse(self.broker.heartbeat('a', 'w2'))
+        self.broker.complete('a', 'w1', {'frames': 10})
+        self.broker.complete('a', 'w2', {'frames': 99})  # Late duplicate is ignored
+        self.assertEqual(self.broker.results(), {'a': {'frames': 10}})
+        self.assertEqual(self.broker.counts(), {'pending': 0, 'running': 0, 'done': 1, 'failed': 0})
+
+    def test_expired_lease_and_retries(self):
+        self.broker.put('a', {})
+        self.assertIsNotNone(self.broker.claim('w1', lease_sec=0.01))
+        time.sleep(0.05)
+        # The silent worker lost the job; its heartbeats no longer count
+        self.assertEqual(self.broker.claim('w2')[0], 'a')
+        self.assertFalse(self.broker.heartbeat('a', 'w1'))
+        self.broker.fail('a', 'w2', 'boom')
+        # Two claims used up both attempts
+        self.assertIsNone(self.broker.claim('w3'))
+        self.assertEqual(self.broker.errors(), {'a': 'boom'})
+
+    def test_failed_job_is_retried(self):
+        self.broker.put('a', {})
+        self.broker.claim('w1')
+        self.broker.fail('a', 'w1', 'boom')
+        self.assertEqual(self.broker.counts()['pending'], 1)
+        self.assertEqual(self.broker.claim('w2')[0], 'a')
+
+class TestWorkers(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'jobs.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def run_workers(self, broker_url, count, handler):
+        workers = [Worker(open_broker(broker_url), handler, worker_id=f"w{i}", heartbeat_sec=0.01, poll_sec=0.01)
+                   for i in range(count)]
+        threads = [threading.Thread(target=worker.run) for worker in workers]
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return workers, time.time() - start
+
+    def test_flaky_handler_is_retried(self):
+        broker = SQLiteBroker(self.path)
+        for i in range(6):
+            broker.put(f"job{i}", {'n': i})
+        calls = []
+
+        def handler(payload):
+            calls.append(payload['n'])
+            if calls.count(payload['n']) == 1 and payload['n'] % 2:
+                raise RuntimeError("transient")
+            return {'square': payload['n'] ** 2}
+
+        workers, _ = self.run_workers(self.path, 2, handler)
+        self.assertEqual(broker.results(), {f"job{i}": {'square': i * i} for i in range(6)})
+        self.assertEqual(sum(w.failed for w in workers), 3)
+
+    def test_tcp_broker_and_scaling(self):
+        server = BrokerServer(SQLiteBroker(self.path), ('127.0.0.1', 0))
+        server.start()
+        try:
+            client = open_broker(server.url)
+            handler = lambda payload: time.sleep(0.05) or {'n': payload['n']}
+            timings = {}
+            for count in (1, 4):
+                for i in range(16):
+                    client.put(f"{count}-{i}", {'n': i})
+                workers, timings[count] = self.run_workers(server.url, count, handler)
+                self.assertEqual(sum(w.completed for w in workers), 16)
+            self.assertEqual(len(client.results()), 32)
+            # Jobs spread over the workers: four finish in well under half the time of one
+            self.assertLess(timings[4], timings[1] / 2)
+        finally:
+            server.shutdown()
+            server.server_close()
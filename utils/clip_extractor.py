@@ -0,0 +1,144 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+import config
+from utils.video_io import open_writer
+
+class Clip:
+    def __init__(self, start, end, path):
+        self.start = start  # First and last frame (1-based, inclusive)
+        self.end = end
+        self.path = path
+        self.writer = None
+        self.written = start - 1  # Last frame handed to the writer
+        self.closed = False
+
+class ClipExtractor:
+    """
+    Writes a short clip around every trigger instead of the whole video.
+    Output frames go into a pre-roll ring of copies (JPEG-encoded once the raw
+    ring would exceed `max_preroll_mb`); a trigger at frame t opens a clip
+    covering [t - pre, t + post], starting with the buffered frames.
+    A trigger whose window overlaps (or touches) the latest clip extends that
+    clip instead of starting a new one. Clips are encoded on writer threads
+    and finished in the background.
+
+    trigger() is called from the processing loop and add() from wherever the
+    output frames are produced (in order); a lock keeps the two consistent.
+    """
+    def __init__(self, output_dir, fps, size, pre_sec=None, post_sec=None, encoder=None, max_preroll_mb=None):
+        self.output_dir = output_dir
+        self.fps = fps
+        self.size = size  # (width, height)
+        self.encoder = encoder or 'mp4v'
+        if self.encoder == 'none':
+            raise ValueError("Clips need a real encoder ('mp4v' or 'x264')")
+        self.pre = int(round((config.CLIP_PRE_SEC if pre_sec is None else pre_sec) * fps))
+        self.post = int(round((config.CLIP_POST_SEC if post_sec is None else post_sec) * fps))
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Frames queued on a clip writer are ring slots held by reference, so the
+        # ring also covers the writer queue and the frame being encoded
+        self.ring_size = self.pre + config.WRITER_QUEUE_SIZE + 3
+        max_preroll_mb = config.CLIP_PREROLL_MAX_MB if max_preroll_mb is None else max_preroll_mb
+        self.jpeg = self.ring_size * size[0] * size[1] * 3 > max_preroll_mb * 2 ** 20
+        if self.jpeg:
+            self.ring = [None] * self.ring_size  # Encoded frames; decoded into fresh arrays for the writer
+        else:
+            self.ring = np.empty((self.ring_size, size[1], size[0], 3), dtype=np.uint8)
+        self.ring_index = np.full(self.ring_size, -1, dtype=np.int64)
+        self.last_frame = 0
+
+        self.clips = []
+        self._lock = threading.Lock()
+        self._closer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clip-close")
+
+    def trigger(self, frame_index):
+        """Register a trigger at `frame_index`; returns the path of the clip covering it."""
+        with self._lock:
+            start, end = max(1, frame_index - self.pre), frame_index + self.post
+            latest = self.clips[-1] if self.clips else None
+            if latest is not None and not latest.closed and start <= latest.end + 1:
+                latest.end = max(latest.end, end)
+                return latest.path
+            path = os.path.join(self.output_dir, f"clip_{start:08d}.mp4")
+            self.clips.append(Clip(start, end, path))
+            return path
+
+    def clip_for(self, frame_index):
+        """Path of the clip containing `frame_index`, or None."""
+        with self._lock:
+            for clip in reversed(self.clips):
+                if clip.start <= frame_index <= clip.end:
+                    return clip.path
+                if clip.end < frame_index:
+                    return None
+        return None
+
+    def state_dict(self):
+        """Clip windows for checkpoints (the pre-roll frames themselves are not saved)."""
+        with self._lock:
+            return {'clips': [(clip.start, clip.end, clip.path, clip.closed) for clip in self.clips]}
+
+    def load_state_dict(self, state):
+        """
+        Restore clip windows, so clip_for() and trigger merging see clips from
+        before a resume. A clip still open at the checkpoint is rewritten from
+        the frames after it: the ones before are no longer buffered.
+        """
+        with self._lock:
+            self.clips = []
+            for start, end, path, closed in state['clips']:
+                clip = Clip(start, end, path)
+                clip.closed = closed
+                self.clips.append(clip)
+
+    def add(self, frame, frame_index):
+        """Buffer one output frame and feed it (plus any pre-roll) to the open clip."""
+        with self._lock:
+            slot = frame_index % self.ring_size
+            if self.jpeg:
+                self.ring[slot] = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, config.CLIP_JPEG_QUALITY])[1]
+            else:
+                np.copyto(self.ring[slot], frame)
+            self.ring_index[slot] = frame_index
+            self.last_frame = frame_index
+
+            # Only the latest two clips can still be open (a new clip starts past the previous one's merge window)
+            for clip in self.clips[-2:]:
+                if clip.closed or clip.start > frame_index:
+                    continue
+                self._write_through(clip, min(frame_index, clip.end))
+                # Past the point where a new trigger could still merge into it
+                if frame_index > clip.end + self.pre:
+                    self._close(clip)
+
+    def _write_through(self, clip, last):
+        if clip.written >= last:
+            return
+        if clip.writer is None:
+            clip.writer = open_writer(clip.path, self.fps, self.size, encoder=self.encoder)
+        for index in range(clip.written + 1, last + 1):
+            slot = index % self.ring_size
+            if self.ring_index[slot] == index:  # Frames before the stream began are simply absent
+                clip.writer.write(cv2.imdecode(self.ring[slot], cv2.IMREAD_COLOR) if self.jpeg else self.ring[slot])
+        clip.written = last
+
+    def _close(self, clip):
+        clip.closed = True
+        clip.end = min(clip.end, max(clip.written, clip.start))
+        if clip.writer is not None:
+            clip.writer.drain()  # Queued frames reference ring slots that are about to be reused
+            self._closer.submit(clip.writer.release)
+
+    def close(self):
+        """Finish every clip (truncated at the last frame seen) and wait for the encoders."""
+        with self._lock:
+            for clip in self.clips:
+                if not clip.closed:
+                    self._write_through(clip, min(self.last_frame, clip.end))
+                    self._close(clip)
+        self._closer.shutdown(wait=True)
+        return [clip.path for clip in self.clips if clip.writer is not None]
@@ -0,0 +1,99 @@
+import cv2
+import numpy as np
+
+PAD_VALUE = 114  # Ultralytics letterbox grey
+
+def bucket_shape(height, width, buckets):
+    """
+    Canonical model input (h, w) for a frame size: the bucket closest in aspect
+    ratio, i.e. the one a letterbox pads least. Every frame of a stream then
+    reaches the models with the same input shape.
+    """
+    aspect = np.log(width / height)
+    return tuple(min(buckets, key=lambda b: abs(np.log(b[1] / b[0]) - aspect)))
+
+class FrameRing:
+    """
+    Preallocated ring of frame buffers that the decoder writes into.
+    A buffer is reused `size` frames later, so anything still holding a frame
+    (e.g. an asynchronous writer queue) must be shorter than the ring.
+    """
+    def __init__(self, height, width, size=4):
+        self.buffers = np.empty((size, height, width, 3), dtype=np.uint8)
+        self.size = size
+        self.index = 0
+
+    def next(self):
+        buf = self.buffers[self.index]
+        self.index = (self.index + 1) % self.size
+        return buf
+
+    def read(self, cap):
+        """
+        Decode the next frame from a cv2.VideoCapture into the ring.
+        Returns (ret, frame) like cap.read().
+        """
+        return cap.read(self.next())
+
+class Letterbox:
+    """
+    Geometry of an aspect-preserving resize of a (h, w) frame into `shape`.
+    """
+    def __init__(self, frame_shape, shape):
+        h, w = frame_shape
+        self.height, self.width = h, w
+        self.shape = shape
+        self.scale = min(shape[0] / h, shape[1] / w)
+        self.new_h, self.new_w = int(round(h * self.scale)), int(round(w * self.scale))
+        self.pad_y = (shape[0] - self.new_h) // 2
+        self.pad_x = (shape[1] - self.new_w) // 2
+
+    def content(self, image):
+        """View of `image` (model input or output) without the padding."""
+        return image[..., self.pad_y:self.pad_y + self.new_h, self.pad_x:self.pad_x + self.new_w]
+
+    def to_frame(self, xy):
+        """Map (..., 2+) model-space x/y coordinates back to frame pixels, in place."""
+        xy[..., 0] = (xy[..., 0] - self.pad_x) * (self.width / self.new_w)
+        xy[..., 1] = (xy[..., 1] - self.pad_y) * (self.height / self.new_h)
+        return xy
+
+class SharedInput:
+    """
+    Per-frame cache of letterboxed model inputs: pose and depth share one
+    resize when their input shapes agree, and every resize lands in a buffer
+    reused across frames instead of a fresh allocation.
+    """
+    def __init__(self):
+        self.frame = None
+        self._buffers = {}  # (frame shape, shape) -> (buffer, Letterbox)
+        self._ready = set()  # shapes already resized for the current frame
+
+    def set_frame(self, frame):
+        self.frame = frame
+        self._ready.clear()
+
+    def letterboxed(self, shape):
+        """
+        BGR uint8 frame letterboxed into `shape` (h, w), with its Letterbox geometry.
+        INTER_AREA when shrinking, INTER_CUBIC when enlarging.
+        """
+        frame_shape = self.frame.shape[:2]
+        key = (frame_shape, tuple(shape))
+        entry = self._buffers.get(key)
+        if entry is None:
+            box = Letterbox(frame_shape, shape)
+            # Padding is filled once; later resizes only overwrite the content area.
+            # A frame that already has the input shape is used as-is.
+            buf = None if key[1] == frame_shape else np.full((shape[0], shape[1], 3), PAD_VALUE, dtype=np.uint8)
+            entry = self._buffers[key] = (buf, box)
+        buf, box = entry
+        if buf is None:
+            return self.frame, box
+        if key not in self._ready:
+            interpolation = cv2.INTER_AREA if box.scale < 1 else cv2.INTER_CUBIC
+            cv2.resize(self.frame, (box.new_w, box.new_h),
+                       dst=buf[box.pad_y:box.pad_y + box.new_h, box.pad_x:box.pad_x + box.new_w],
+                       interpolation=interpolation)
+            self._ready.add(key)
+        return buf, box
@@ -1,3 +1,5 @@
+import numpy as np
+
 def bboxes_overlap(bb1, bb2):
     """
     Check if two bounding boxes overlap.
@@ -18,3 +20,64 @@ def get_bbox_center(bbox):
     x_center = int((bbox[0] + bbox[2]) / 2)
     y_center = int((bbox[1] + bbox[3]) / 2)
     return (x_center, y_center)
+
+def overlapping_pairs(bboxes):
+    """
+    Index pairs (i, j), i < j, of overlapping boxes, same rule as bboxes_overlap
+    (touching counts), computed for all boxes at once.
+    bboxes: (N, 4) array of [x1, y1, x2, y2]
+    """
+    b = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    overlap = ((b[:, None, 2] >= b[None, :, 0]) & (b[None, :, 2] >= b[:, None, 0]) &
+               (b[:, None, 3] >= b[None, :, 1]) & (b[None, :, 3] >= b[:, None, 1]))
+    i, j = np.triu_indices(len(b), 1)
+    keep = overlap[i, j]
+    return list(zip(i[keep].tolist(), j[keep].tolist()))
+
+def box_iou(a, b):
+    """
+    Pairwise IoU of (N, 4) and (M, 4) [x1, y1, x2, y2] boxes, as an (N, M) array.
+    """
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    iw = np.clip(np.minimum(a[:, None, 2], b[None, :, 2]) - np.maximum(a[:, None, 0], b[None, :, 0]), 0, None)
+    ih = np.clip(np.minimum(a[:, None, 3], b[None, :, 3]) - np.maximum(a[:, None, 1], b[None, :, 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+def box_depths(depth_map, bboxes, stat='median', executor=None):
+    """
+    Depth statistic inside each box of a depth map.
+    stat: 'median' (one np.median per box, spread over `executor` if given) or
+    'mean' (summed-area table: one pass over the map, then O(1) per box).
+    Boxes are truncated to ints and clipped to the map; empty boxes give 0.0.
+    """
+    boxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4).astype(np.int64)
+    h, w = depth_map.shape
+    x1 = np.clip(boxes[:, 0], 0, w)
+    y1 = np.clip(boxes[:, 1], 0, h)
+    x2 = np.clip(boxes[:, 2], 0, w)
+    y2 = np.clip(boxes[:, 3], 0, h)
+    valid = (x1 < x2) & (y1 < y2)
+    depths = np.zeros(len(boxes), dtype=np.float64)
+    if not valid.any():
+        return depths
+
+    if stat == 'mean':
+        table = np.zeros((h + 1, w + 1), dtype=np.float64)
+        np.cumsum(np.cumsum(depth_map, axis=0, dtype=np.float64), axis=1, out=table[1:, 1:])
+        x1, y1, x2, y2 = x1[valid], y1[valid], x2[valid], y2[valid]
+        sums = table[y2, x2] - table[y1, x2] - table[y2, x1] + table[y1, x1]
+        depths[valid] = sums / ((x2 - x1) * (y2 - y1))
+    elif stat == 'median':
+        index = np.flatnonzero(valid)
+        median = lambda i: np.median(depth_map[y1[i]:y2[i], x1[i]:x2[i]])
+        # np.median partitions without holding the GIL, so many boxes can share a pool
+        values = executor.map(median, index) if executor is not None and len(index) > 4 else map(median, index)
+        depths[index] = list(values)
+    else:
+        raise ValueError(f"Unknown depth statistic '{stat}' (choose from median, mean)")
+    return depths
@@ -0,0 +1,72 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import config
+
+def available_cores():
+    """Cores this process may run on (respects affinity / container CPU sets)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS
+        return os.cpu_count() or 1
+
+class ThreadBudget:
+    """
+    One process's share of the node's cores, split between PyTorch intra-op
+    threads (inference) and a shared thread pool for GIL-releasing work
+    (drawing, depth aggregation). OpenCV gets as many threads as the pool, since
+    its kernels mostly run from pool threads or the decoder.
+    With several streams (processes) per node, each gets cores // streams, so
+    together they do not oversubscribe the CPU.
+    """
+    def __init__(self, streams=1, cores=None, workers=None, torch_threads=None):
+        self.cores = max(1, (cores or available_cores()) // max(1, streams))
+        workers = workers or config.THREAD_POOL_WORKERS
+        self.workers = workers or max(1, min(4, self.cores // 4))
+        self.torch_threads = torch_threads or max(1, self.cores - self.workers)
+        self.cv2_threads = self.workers
+        self._executor = None
+
+    def apply(self):
+        """Set the thread counts process-wide."""
+        import torch
+        torch.set_num_threads(self.torch_threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:  # Only allowed before torch starts parallel work
+            pass
+        cv2.setNumThreads(self.cv2_threads)
+        return self
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="budget")
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __repr__(self):
+        return (f"ThreadBudget(cores={self.cores}, torch_threads={self.torch_threads}, "
+                f"cv2_threads={self.cv2_threads}, workers={self.workers})")
+
+_budget = None
+
+def configure(streams=1, cores=None, workers=None):
+    """Create and apply this process's budget, replacing any previous one."""
+    global _budget
+    if _budget is not None:
+        _budget.shutdown()
+    _budget = ThreadBudget(streams=streams, cores=cores, workers=workers).apply()
+    return _budget
+
+def get_budget():
+    """The process budget; None until configure() is called."""
+    return _budget
+
+def executor():
+    """Shared thread pool of the configured budget, or None (run inline)."""
+    return _budget.executor if _budget is not None else None
@@ -0,0 +1,258 @@
+import itertools
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+from fractions import Fraction
+import cv2
+import numpy as np
+import config
+
+try:
+    import av
+except ImportError:  # PyAV is optional; OpenCV is the fallback backend
+    av = None
+
+BACKENDS = ['auto', 'pyav', 'opencv']
+ENCODERS = ['mp4v', 'x264', 'none']
+
+def _scaled_size(width, height, decode_width):
+    """Output size for decode-time downscaling (never upscales, keeps even dimensions)."""
+    if not decode_width or decode_width >= width:
+        return width, height
+    return decode_width // 2 * 2, max(2, int(round(height * decode_width / width)) // 2 * 2)
+
+def _frame_rate(fps):
+    """Exact stream rate for a float fps (29.97 -> 30000/1001), 30 if unknown."""
+    return Fraction(fps).limit_denominator(1001) if fps and fps > 0 else Fraction(30)
+
+class OpenCVReader:
+    """
+    cv2.VideoCapture behind the reader interface: read(buf) -> (ret, frame).
+    Downscaling happens after decode, into the caller's buffer.
+    """
+    def __init__(self, path, decode_width=None):
+        self.cap = cv2.VideoCapture(path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.source_width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.source_height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.width, self.height = _scaled_size(self.source_width, self.source_height, decode_width)
+        self._scaled = (self.width, self.height) != (self.source_width, self.source_height)
+        self._decoded = None
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self, buf=None):
+        if not self._scaled:
+            return self.cap.read(buf)
+        ret, self._decoded = self.cap.read(self._decoded)
+        if not ret:
+            return False, None
+        frame = cv2.resize(self._decoded, (self.width, self.height), dst=buf, interpolation=cv2.INTER_AREA)
+        return True, frame
+
+    def seek(self, frame_index):
+        """Continue decoding at `frame_index` (0-based)."""
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+
+    def release(self):
+        self.cap.release()
+
+class PyAVReader:
+    """
+    FFmpeg decode through PyAV with frame-level threading.
+    Downscaling and BGR conversion run in swscale as part of decode.
+    """
+    def __init__(self, path, decode_width=None, threads=None):
+        self.container = av.open(path)
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = 'AUTO'
+        threads = config.DECODE_THREADS if threads is None else threads
+        if threads:
+            self.stream.thread_count = threads
+        self.fps = float(self.stream.average_rate or self.stream.guessed_rate or 30)
+        self.source_width = self.stream.codec_context.width
+        self.source_height = self.stream.codec_context.height
+        self.total_frames = self.stream.frames
+        self.width, self.height = _scaled_size(self.source_width, self.source_height, decode_width)
+        self._frames = self.container.decode(self.stream)
+        self._open = True
+
+    def isOpened(self):
+        return self._open
+
+    def read(self, buf=None):
+        try:
+            decoded = next(self._frames)
+        except StopIteration:
+            self._open = False
+            return False, None
+        image = decoded.to_ndarray(width=self.width, height=self.height, format='bgr24')
+        if buf is None:
+            return True, image
+        np.copyto(buf, image)
+        return True, buf
+
+    def seek(self, frame_index):
+        """
+        Continue decoding at `frame_index` (0-based): seek to the keyframe before
+        it, then decode and drop frames up to it.
+        """
+        time_base = self.stream.time_base
+        self.container.seek(int(frame_index / self.fps / time_base), stream=self.stream, backward=True)
+        self._frames = self.container.decode(self.stream)
+        self._open = True
+        for decoded in self._frames:
+            if decoded.pts is not None and round(float(decoded.pts * time_base) * self.fps) >= frame_index:
+                self._frames = itertools.chain([decoded], self._frames)
+                return
+        self._open = False
+
+    def release(self):
+        if self.container is not None:
+            self.container.close()
+            self.container = None
+        self._open = False
+
+class OpenCVWriter:
+    def __init__(self, path, fps, size, fourcc='mp4v'):
+        self.out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+
+    def write(self, frame):
+        self.out.write(frame)
+
+    def release(self):
+        self.out.release()
+
+class PyAVWriter:
+    """libx264 encode through PyAV (yuv420p, preset/CRF from config unless given)."""
+    def __init__(self, path, fps, size, preset=None, crf=None):
+        self.container = av.open(path, mode='w')
+        self.stream = self.container.add_stream('libx264', rate=_frame_rate(fps))
+        self.stream.width, self.stream.height = size
+        self.stream.pix_fmt = 'yuv420p'
+        self.stream.options = {'preset': preset or config.X264_PRESET,
+                               'crf': str(config.X264_CRF if crf is None else crf)}
+        self.stream.thread_type = 'AUTO'
+
+    def write(self, frame):
+        packet = self.stream.encode(av.VideoFrame.from_ndarray(frame, format='bgr24'))
+        self.container.mux(packet)
+
+    def release(self):
+        self.container.mux(self.stream.encode())  # Flush delayed frames
+        self.container.close()
+
+class NullWriter:
+    """Discards frames: for runs where only the report and annotations matter."""
+    def write(self, frame):
+        pass
+
+    def release(self):
+        pass
+
+class ThreadedWriter:
+    """
+    Runs a writer's encode on its own thread behind a bounded queue.
+    Frames are queued by reference, not copied: with a FrameRing of size N the
+    queue must hold at most N - 2 frames (one is being decoded, one is being
+    processed), or the decoder would overwrite a frame before it is encoded.
+    """
+    def __init__(self, writer, queue_size=None):
+        self.writer = writer
+        self.queue = queue.Queue(maxsize=queue_size or config.WRITER_QUEUE_SIZE)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="video-writer", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            frame = self.queue.get()
+            try:
+                if frame is None:
+                    return
+                if self.error is None:
+                    self.writer.write(frame)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def write(self, frame):
+        if self.error is not None:
+            raise self.error
+        self.queue.put(frame)
+
+    def drain(self):
+        """Block until every queued frame has been encoded."""
+        self.queue.join()
+        if self.error is not None:
+            raise self.error
+
+    def release(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.writer.release()
+        if self.error is not None:
+            raise self.error
+
+def open_reader(path, backend=None, decode_width=None, threads=None):
+    """
+    Open `path` for decoding. backend: 'pyav', 'opencv' or 'auto'
+    (PyAV when installed, otherwise OpenCV).
+    """
+    backend = backend or config.VIDEO_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown video backend '{backend}' (choose from {', '.join(BACKENDS)})")
+    if backend == 'pyav' and av is None:
+        raise ImportError("The 'pyav' backend needs PyAV: pip install av")
+    if backend == 'pyav' or (backend == 'auto' and av is not None):
+        return PyAVReader(path, decode_width=decode_width, threads=threads)
+    return OpenCVReader(path, decode_width=decode_width)
+
+def open_writer(path, fps, size, encoder=None, threaded=True, queue_size=None, preset=None):
+    """
+    Open an output writer. encoder: 'mp4v' (OpenCV), 'x264' (PyAV/libx264) or
+    'none'. Encoding runs on its own thread unless `threaded` is False.
+    """
+    encoder = encoder or config.VIDEO_ENCODER
+    if encoder not in ENCODERS:
+        raise ValueError(f"Unknown encoder '{encoder}' (choose from {', '.join(ENCODERS)})")
+    if encoder == 'none':
+        return NullWriter()
+    if encoder == 'x264':
+        if av is None:
+            raise ImportError("The 'x264' encoder needs PyAV: pip install av")
+        writer = PyAVWriter(path, fps, size, preset=preset)
+    else:
+        writer = OpenCVWriter(path, fps, size)
+    return ThreadedWriter(writer, queue_size) if threaded else writer
+
+def concat_videos(paths, output_path):
+    """
+    Join segments into one file without re-encoding (ffmpeg concat demuxer).
+    Returns False when ffmpeg is not available or fails; the segments are kept then.
+    """
+    if len(paths) == 1:
+        os.replace(paths[0], output_path)
+        return True
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        return False
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as listing:
+        for path in paths:
+            listing.write(f"file '{os.path.abspath(path)}'\n")
+    try:
+        result = subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                                 '-i', listing.name, '-c', 'copy', output_path], capture_output=True)
+    finally:
+        os.remove(listing.name)
+    if result.returncode != 0:
+        return False
+    for path in paths:
+        os.remove(path)
+    return True
@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
+import config
 from utils.geometry import get_bbox_center
+from utils.frame_buffer import FrameRing
 
 # BGR Colors
 COLORS = [
@@ -42,7 +44,7 @@ def draw_detections(frame, persons, z_metrics=None, groups=None):
                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
         
         # Draw Keypoints (simplified)
-        for kp in data['keypoints']:
+        for kp in data['keypoints'] if data['keypoints'] is not None else []:
             if kp[2] > 0.5: # confidence check if available, or just existence
                  cv2.circle(frame, (int(kp[0]), int(kp[1])), 3, (0, 255, 255), -1)
 
@@ -64,3 +66,105 @@ def draw_status(frame, frame_count, fps, method_name, vlm_triggers):
     cv2.putText(frame, f"Frame: {frame_count}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
     cv2.putText(frame, f"Method: {method_name}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
     cv2.putText(frame, f"VLM Triggers: {vlm_triggers}", (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+
+KEYPOINT_COLOR = (0, 255, 255)
+
+def _circle_offsets(radius):
+    """Pixel offsets of a filled cv2.circle, so many keypoints can be stamped at once."""
+    size = 2 * radius + 1
+    stamp = np.zeros((size, size), dtype=np.uint8)
+    cv2.circle(stamp, (radius, radius), radius, 255, -1)
+    dy, dx = np.nonzero(stamp)
+    return dy - radius, dx - radius
+
+class OverlayRenderer:
+    """
+    Drop-in for draw_detections + draw_interactions + draw_status with the
+    per-person Python work batched: boxes and keypoints are converted to ints
+    in one array operation, confident keypoints are stamped with one masked
+    assignment, and the group-colour map is only rebuilt when groups change.
+    Optionally draws detections only every `every` frames (status stays on
+    every frame) and renders into a `scale`-sized copy of the frame, which is
+    then what gets encoded.
+    """
+    def __init__(self, every=None, scale=None, ring_size=None):
+        self.every = max(1, every or config.OVERLAY_EVERY)
+        self.scale = scale or config.OVERLAY_SCALE
+        self.ring_size = ring_size or config.FRAME_RING_SIZE
+        self._groups_key = None
+        self._person_colors = {}
+        self._kp_dy, self._kp_dx = _circle_offsets(3)
+        self._ring = None
+
+    def output_size(self, width, height):
+        """(width, height) of the frames render() returns."""
+        if self.scale == 1.0:
+            return width, height
+        return max(2, int(width * self.scale) // 2 * 2), max(2, int(height * self.scale) // 2 * 2)
+
+    def _colors(self, groups):
+        key = tuple(tuple(group) for group in groups) if groups else ()
+        if key != self._groups_key:
+            self._groups_key = key
+            self._person_colors = {pid: COLORS[i % len(COLORS)] for i, group in enumerate(key) for pid in group}
+        return self._person_colors
+
+    def _canvas(self, frame):
+        if self.scale == 1.0:
+            return frame
+        width, height = self.output_size(frame.shape[1], frame.shape[0])
+        if self._ring is None or self._ring.buffers.shape[1:3] != (height, width):
+            # Output frames may sit in the writer queue, so they rotate through a ring like decoded frames
+            self._ring = FrameRing(height, width, self.ring_size)
+        return cv2.resize(frame, (width, height), dst=self._ring.next(), interpolation=cv2.INTER_AREA)
+
+    def _draw_detections(self, canvas, persons, z_metrics, groups, scale):
+        person_colors = self._colors(groups)
+        pids = list(persons)
+        boxes = (np.array([persons[pid]['bbox'][:4] for pid in pids], dtype=np.float64).astype(np.int64) * scale).astype(np.int64).tolist()
+        for pid, (x1, y1, x2, y2) in zip(pids, boxes):
+            color = person_colors.get(pid, (255, 0, 0))  # Default Blue
+            cv2.rectangle(canvas, (x1, y1), (x2, y2), color, max(1, round(2 * scale)))
+            label = f"ID: {pid}"
+            if z_metrics and pid in z_metrics:
+                label += f" Z:{z_metrics[pid]:.2f}"
+            cv2.putText(canvas, label, (x1, y1 - int(10 * scale)), cv2.FONT_HERSHEY_SIMPLEX, 0.5 * scale, color, max(1, round(2 * scale)))
+
+        # Keypoints: stamp every confident point in one assignment
+        kps = [np.asarray(persons[pid]['keypoints'], dtype=np.float32).reshape(-1, 3)
+               for pid in pids if persons[pid]['keypoints'] is not None]
+        kps = np.concatenate(kps) if kps else np.zeros((0, 3), dtype=np.float32)
+        kps = kps[kps[:, 2] > 0.5]
+        if len(kps):
+            h, w = canvas.shape[:2]
+            xs = (kps[:, 0].astype(np.int64) * scale).astype(np.int64)[:, None] + self._kp_dx
+            ys = (kps[:, 1].astype(np.int64) * scale).astype(np.int64)[:, None] + self._kp_dy
+            inside = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+            if canvas.flags.c_contiguous:
+                canvas.reshape(-1, 3)[ys[inside] * w + xs[inside]] = KEYPOINT_COLOR
+            else:
+                canvas[ys[inside], xs[inside]] = KEYPOINT_COLOR
+
+    def render(self, frame, results, frame_count, fps, method_name, vlm_triggers):
+        """
+        Draw one frame's overlay. Returns the frame to encode: `frame` itself
+        (drawn in place) at scale 1, otherwise a downscaled copy.
+        """
+        canvas = self._canvas(frame)
+        scale = canvas.shape[1] / frame.shape[1]
+        persons = results['persons']
+        if persons and (frame_count - 1) % self.every == 0:
+            self._draw_detections(canvas, persons, results.get('z_metrics'), results.get('groups'), scale)
+            for id1, id2 in results['interactions']:
+                if id1 in persons and id2 in persons:
+                    pt1 = get_bbox_center(persons[id1]['bbox'])
+                    pt2 = get_bbox_center(persons[id2]['bbox'])
+                    cv2.line(canvas, (int(pt1[0] * scale), int(pt1[1] * scale)), (int(pt2[0] * scale), int(pt2[1] * scale)),
+                             (0, 255, 0), max(1, round(3 * scale)))
+        if scale == 1.0:
+            draw_status(canvas, frame_count, fps, method_name, vlm_triggers)
+        else:
+            font_scale, thickness = 0.7 * scale, max(1, round(2 * scale))
+            for row, text in enumerate([f"Frame: {frame_count}", f"Method: {method_name}", f"VLM Triggers: {vlm_triggers}"]):
+                cv2.putText(canvas, text, (int(10 * scale), int(30 * (row + 1) * scale)), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (0, 0, 255), thickness)
+        return canvas